@@ -4,6 +4,12 @@ import cv2
 import numpy as np
 import os
 import re
+import sys
+from pytesseract import Output
+
+# Page sources (images, multi-page TIFFs, PDFs) live in segmentation/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'segmentation'))
+from page_source import iter_pages, load_image
 
 # --- IMPORTANT CONFIGURATION ---
 # 1. Set the path to your Tesseract executable.
@@ -12,17 +18,27 @@ import re
 #    Example for macOS/Linux: r'/usr/local/bin/tesseract' (or wherever it's installed)
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-# 2. Set the path to your image file.
+# 2. Set the path to your image or PDF file.
 #    Place your log sheet image in the same directory as this script, or provide the full path.
+#    PDFs and multi-page TIFFs are rasterized page by page at PDF_DPI; outputs of page N
+#    are prefixed log_sheet_p000N_ when there is more than one page.
 image_path = 'scan1_page-0001.jpg'
+PDF_DPI = 200
+
+# 3. Choose the extraction mode.
+#    'text' (default) runs sparse-text OCR and splits lines on whitespace to guess columns.
+#    'grid' (opt-in) runs a single page-level OCR pass and maps each word onto the detected table grid.
+EXTRACTION_MODE = 'text'
 
 def preprocess_image(image_path):
     """
-    Loads an image and applies pre-processing to improve OCR and line detection accuracy.
+    Loads an image (path or decoded BGR page) and applies pre-processing to
+    improve OCR and line detection accuracy.
     """
     print("Preprocessing image for better OCR accuracy...")
-    image = cv2.imread(image_path)
-    if image is None:
+    try:
+        image = load_image(image_path)
+    except ValueError:
         raise FileNotFoundError(f"Image not found at path: {image_path}")
 
     # Convert to grayscale and apply a binary threshold
@@ -57,30 +73,26 @@ def detect_lines(image):
     
     return horizontal_lines, vertical_lines
 
-def extract_table_cells(horizontal_lines, vertical_lines, image):
+def distinct_positions(positions, min_gap=10):
+    """
+    Sorts line coordinates and drops duplicates that lie within min_gap pixels
+    of the previously kept line.
+    """
+    distinct = []
+    for value in sorted(positions):
+        if not distinct or value - distinct[-1] > min_gap:
+            distinct.append(value)
+    return distinct
+
+def extract_table_cells(horizontal_lines, vertical_lines, image, output_prefix='log_sheet'):
     """
     Uses the detected lines to find table cells and extracts text from each cell.
     """
     print("Extracting table cells and running OCR...")
     
-    # Sort lines to find distinct horizontal and vertical coordinates
-    horizontal_y = sorted([y for x, y, w, h in horizontal_lines])
-    vertical_x = sorted([x for x, y, w, h in vertical_lines])
-    
-    # Filter out duplicate lines (close to each other)
-    distinct_horizontal_y = []
-    if horizontal_y:
-        distinct_horizontal_y.append(horizontal_y[0])
-        for y in horizontal_y[1:]:
-            if y - distinct_horizontal_y[-1] > 10:
-                distinct_horizontal_y.append(y)
-    
-    distinct_vertical_x = []
-    if vertical_x:
-        distinct_vertical_x.append(vertical_x[0])
-        for x in vertical_x[1:]:
-            if x - distinct_vertical_x[-1] > 10:
-                distinct_vertical_x.append(x)
+    # Find distinct horizontal and vertical coordinates
+    distinct_horizontal_y = distinct_positions([y for x, y, w, h in horizontal_lines])
+    distinct_vertical_x = distinct_positions([x for x, y, w, h in vertical_lines])
 
     # Now, iterate through the distinct lines to find the cells
     cell_data = []
@@ -123,33 +135,133 @@ def extract_table_cells(horizontal_lines, vertical_lines, image):
     df = pd.DataFrame(cell_data, columns=clean_headers)
 
     # Save header, footer, and main table data
-    with open('log_sheet_header.txt', 'w', encoding='utf-8') as f:
+    with open(f'{output_prefix}_header.txt', 'w', encoding='utf-8') as f:
         f.write('\n'.join(header_text))
-    print("Header data saved to 'log_sheet_header.txt'")
+    print(f"Header data saved to '{output_prefix}_header.txt'")
     
-    with open('log_sheet_footer.txt', 'w', encoding='utf-8') as f:
+    with open(f'{output_prefix}_footer.txt', 'w', encoding='utf-8') as f:
         f.write('\n'.join(footer_text))
-    print("Footer data saved to 'log_sheet_footer.txt'")
+    print(f"Footer data saved to '{output_prefix}_footer.txt'")
     
-    csv_output_path = 'log_sheet_data.csv'
+    csv_output_path = f'{output_prefix}_data.csv'
     df.to_csv(csv_output_path, index=False)
     print(f"Main table data successfully saved to '{csv_output_path}'")
 
 
+def assign_words_to_grid(ocr_data, row_bounds, col_bounds, min_confidence=0):
+    """
+    Assigns each OCR word box to a table cell with a sorted interval lookup.
+
+    A word belongs to the cell whose row/column interval contains its centre.
+    Words above the first or below the last horizontal line are returned
+    separately as header and footer text.
+
+    Returns:
+        tuple: (cells as a list of rows of strings, header words, footer words)
+    """
+    row_bounds = np.asarray(row_bounds)
+    col_bounds = np.asarray(col_bounds)
+    n_rows = max(len(row_bounds) - 1, 0)
+    n_cols = max(len(col_bounds) - 1, 0)
+    cell_words = [[[] for _ in range(n_cols)] for _ in range(n_rows)]
+    header_words, footer_words = [], []
+
+    texts = np.asarray(ocr_data['text'], dtype=object)
+    conf = np.asarray(ocr_data['conf'], dtype=float)
+    left = np.asarray(ocr_data['left'])
+    top = np.asarray(ocr_data['top'])
+    width = np.asarray(ocr_data['width'])
+    height = np.asarray(ocr_data['height'])
+
+    valid = np.array([bool(str(t).strip()) for t in texts]) & (conf >= min_confidence)
+    if n_rows == 0 or n_cols == 0:
+        return cell_words, list(texts[valid]), footer_words
+
+    centre_x = left + width / 2
+    centre_y = top + height / 2
+
+    # searchsorted gives, for every word at once, the interval index it falls into
+    row_idx = np.searchsorted(row_bounds, centre_y, side='right') - 1
+    col_idx = np.searchsorted(col_bounds, centre_x, side='right') - 1
+
+    # Words come back from Tesseract in reading order, which is kept within each cell
+    for i in np.flatnonzero(valid):
+        word = str(texts[i]).strip()
+        r, c = row_idx[i], col_idx[i]
+        if r < 0:
+            header_words.append(word)
+        elif r >= n_rows:
+            footer_words.append(word)
+        elif 0 <= c < n_cols:
+            cell_words[r][c].append(word)
+
+    cells = [[' '.join(words) for words in row] for row in cell_words]
+    return cells, header_words, footer_words
+
+def extract_table_cells_grid(horizontal_lines, vertical_lines, image, config='--psm 11', output_prefix='log_sheet'):
+    """
+    Extracts the table with one page-level OCR pass.
+
+    Runs image_to_data once and maps every word box onto the grid formed by
+    the detected lines, so the whole table costs a single Tesseract call
+    instead of per-cell or per-line OCR.
+    """
+    print("Running a single page-level OCR pass and mapping words onto the grid...")
+
+    row_bounds = distinct_positions([y for x, y, w, h in horizontal_lines])
+    col_bounds = distinct_positions([x for x, y, w, h in vertical_lines])
+
+    if len(row_bounds) < 2 or len(col_bounds) < 2:
+        raise ValueError("Not enough table lines detected to build a grid.")
+
+    ocr_data = pytesseract.image_to_data(image, config=config, output_type=Output.DICT)
+    cells, header_words, footer_words = assign_words_to_grid(ocr_data, row_bounds, col_bounds)
+
+    headers = [f"Col{i+1}" for i in range(len(col_bounds) - 1)]
+    df = pd.DataFrame(cells, columns=headers)
+
+    # Save header, footer, and main table data
+    with open(f'{output_prefix}_header.txt', 'w', encoding='utf-8') as f:
+        f.write(' '.join(header_words))
+    print(f"Header data saved to '{output_prefix}_header.txt'")
+
+    with open(f'{output_prefix}_footer.txt', 'w', encoding='utf-8') as f:
+        f.write(' '.join(footer_words))
+    print(f"Footer data saved to '{output_prefix}_footer.txt'")
+
+    csv_output_path = f'{output_prefix}_data.csv'
+    df.to_csv(csv_output_path, index=False)
+    print(f"Main table data ({len(row_bounds) - 1} rows x {len(col_bounds) - 1} columns) "
+          f"successfully saved to '{csv_output_path}'")
+    return df
+
+def process_page(image, output_prefix='log_sheet'):
+    preprocessed_img = preprocess_image(image)
+    
+    if EXTRACTION_MODE == 'grid':
+        horizontal_lines, vertical_lines = detect_lines(preprocessed_img)
+        extract_table_cells_grid(horizontal_lines, vertical_lines, preprocessed_img, output_prefix=output_prefix)
+        return
+    
+    # We will use a different OCR mode that is better for sparse text
+    config = '--psm 11'
+    full_text = pytesseract.image_to_string(preprocessed_img, config=config)
+    
+    parse_and_export_data_from_text(full_text, output_prefix=output_prefix)
+
 def main():
     try:
-        preprocessed_img = preprocess_image(image_path)
-        
-        # We will use a different OCR mode that is better for sparse text
-        config = '--psm 11'
-        full_text = pytesseract.image_to_string(preprocessed_img, config=config)
-        
-        parse_and_export_data_from_text(full_text)
+        # One page in memory at a time; the next page is rasterized while this one is OCR'd
+        for page in iter_pages(image_path, dpi=PDF_DPI):
+            output_prefix = 'log_sheet' if page.count == 1 else f'log_sheet_p{page.index + 1:04d}'
+            if page.count > 1:
+                print(f"--- Page {page.index + 1}/{page.count} ---")
+            process_page(page.image, output_prefix)
         
     except Exception as e:
         print(f"An error occurred: {e}")
 
-def parse_and_export_data_from_text(ocr_text):
+def parse_and_export_data_from_text(ocr_text, output_prefix='log_sheet'):
     """
     This function is a fallback to a text-based parsing method
     if the image preprocessing fails.
@@ -190,15 +302,15 @@ def parse_and_export_data_from_text(ocr_text):
     df = pd.DataFrame(parsed_data, columns=clean_headers)
     
     # Save header, footer, and main table data
-    with open('log_sheet_header.txt', 'w', encoding='utf-8') as f:
+    with open(f'{output_prefix}_header.txt', 'w', encoding='utf-8') as f:
         f.write('\n'.join(header_text))
-    print("Header data saved to 'log_sheet_header.txt'")
+    print(f"Header data saved to '{output_prefix}_header.txt'")
     
-    with open('log_sheet_footer.txt', 'w', encoding='utf-8') as f:
+    with open(f'{output_prefix}_footer.txt', 'w', encoding='utf-8') as f:
         f.write('\n'.join(footer_text))
-    print("Footer data saved to 'log_sheet_footer.txt'")
+    print(f"Footer data saved to '{output_prefix}_footer.txt'")
     
-    csv_output_path = 'log_sheet_data.csv'
+    csv_output_path = f'{output_prefix}_data.csv'
     df.to_csv(csv_output_path, index=False)
     print(f"Main table data successfully saved to '{csv_output_path}'")
     
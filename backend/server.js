@@ -1006,7 +1006,8 @@ app.post('/api/export-to-excel', async (req, res) => {
         console.log(`Processing segment ${i + 1}/${selectedSegments.length}:`, segment.url);
 
         // Create Python process to handle this segment
-        const result = await runPythonWorkflow(segmentImagePath, baseOutputDir, modelsDir);
+        // cache_key lets workflow.py open the raw crop from the page cache
+        const result = await runPythonWorkflow(segmentImagePath, baseOutputDir, modelsDir, segment.cache_key);
         
         exportResults.push({
           segmentIndex,
@@ -1057,7 +1058,7 @@ app.post('/api/export-to-excel', async (req, res) => {
 });
 
 // Helper function to run Python workflow
-function runPythonWorkflow(segmentImagePath, outputDir, modelsDir) {
+function runPythonWorkflow(segmentImagePath, outputDir, modelsDir, cacheKey) {
   return new Promise((resolve, reject) => {
     const workflowPath = path.join(__dirname, "..",'segmentation', 'Segmentation_Studio', 'workflow.py');
     
@@ -1066,6 +1067,7 @@ function runPythonWorkflow(segmentImagePath, outputDir, modelsDir) {
       segmentImagePath,
       outputDir,
       modelsDir,
+      cacheKey,
       workflowExists: fsSync.existsSync(workflowPath)
     });
     
@@ -1079,7 +1081,8 @@ function runPythonWorkflow(segmentImagePath, outputDir, modelsDir) {
       workflowPath,
       segmentImagePath,
       outputDir,
-      modelsDir
+      modelsDir,
+      ...(cacheKey ? [cacheKey] : [])
     ]);
 
     let stdout = '';
@@ -4,13 +4,25 @@ import sys
 import cv2
 import numpy as np
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
-from ultralytics import YOLO
 import os
 
-# Suppress YOLO verbose output
+# Suppress YOLO verbose output (read by ultralytics when it is first imported)
 os.environ['YOLO_VERBOSE'] = 'False'
 
+# Shared pipeline helpers live one level up in segmentation/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from crop_encoding import parse_encoding
+from page_cache import PageCache
+from page_source import DEFAULT_DPI, DOCUMENT_EXTENSIONS, REDUCED_MIN_SIDE, DualResolutionImage, iter_pages, load_image
+
+# Each request starts a fresh interpreter, so heavy modules (ultralytics/torch,
+# PIL) are imported inside the functions that use them; see
+# benchmarks/bench_startup.py for the startup budget.
+
+# Segment crops are shown in the browser; workflow.py reads the raw crop from
+# the page cache, so the JPEG only needs to look right
+SEGMENT_ENCODING = "jpeg"
+
 # ----------------- Predefined Colors -----------------
 CLASS_COLORS = {
     "title": (255, 0, 0),
@@ -30,9 +42,22 @@ CLASS_COLORS = {
 def get_color_for_class(class_name: str):
     return CLASS_COLORS.get(class_name, (255, 255, 255))
 
-def draw_segmentation_preview(image_path, results, output_path, confidence_threshold=0.1):
-    """Draw boxes + labels on preview image"""
-    image = cv2.imread(str(image_path))
+def load_model(model_path):
+    """Load a YOLO model, importing ultralytics on first use."""
+    from ultralytics import YOLO
+    return YOLO(str(model_path), verbose=False)
+
+def draw_segmentation_preview(image, results, output_path, confidence_threshold=0.1, to_full=None):
+    """
+    Draw boxes + labels on preview image (image: path or decoded BGR page).
+
+    When the detections were made on a reduced image, pass that image and
+    to_full (mapping a reduced xyxy box to full resolution) so the returned
+    bboxes are in full-resolution pixels.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = load_image(image)
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     pil_image = Image.fromarray(image_rgb)
     draw = ImageDraw.Draw(pil_image)
@@ -71,16 +96,44 @@ def draw_segmentation_preview(image_path, results, output_path, confidence_thres
             detected_objects.append({
                 "label": label,
                 "confidence": conf,
-                "bbox": xyxy.tolist()
+                "bbox": to_full(box.xyxy[0].cpu().numpy()) if to_full else xyxy.tolist()
             })
 
     pil_image.save(str(output_path), "JPEG", quality=90)
     return detected_objects
 
-def segment_image(model_path, image_path, output_dir, confidence_threshold=0.1, generate_preview=True, url_prefix="/segments/"):
+def segment_image(model_path, image_path, output_dir, confidence_threshold=0.1, generate_preview=True, url_prefix="/segments/",
+                  image=None, model=None, name_prefix="", min_side=REDUCED_MIN_SIDE, cache=None, upload_id=None,
+                  encoding=SEGMENT_ENCODING, cache_page=False):
+    """
+    Detect and crop the layout segments of one page.
+
+    Detection and the preview use a reduced decode of the page (long side at
+    least min_side); the full-resolution page is decoded only for the crops.
+
+    image: optional already decoded BGR page (e.g. a PDF page from
+    page_source.iter_pages); image_path then only names the preview.
+    model: optional loaded model, reused across pages.
+    name_prefix: prepended to segment ids and filenames (keeps pages of one
+    document apart).
+    cache: optional PageCache; every crop is stored under upload_id
+    (default: the image name) and each segment gets a "cache_key" that
+    workflow.py opens instead of the segment JPEG, as long as the JPEG is
+    unchanged.
+    cache_page: also cache the decoded page, so segmenting the same,
+    unchanged image file again memory-maps it instead of decoding it (a
+    24 MP photo is ~72 MB as raw pixels, so this is off by default).
+    encoding: segment crop encoding, see crop_encoding.parse_encoding.
+    """
     try:
-        model = YOLO(str(model_path), verbose=False)
-        results = model(str(image_path), conf=confidence_threshold, verbose=False)
+        encoding = parse_encoding(encoding)
+        model = model or load_model(model_path)
+        upload_id = upload_id or Path(image_path).stem
+        page_key = f"{name_prefix}page"
+        if cache is not None and cache_page and image is None:
+            image = cache.load(upload_id, page_key, source=str(image_path))
+        page = DualResolutionImage(str(image_path) if image is None else image, min_side=min_side)
+        results = model(page.reduced, conf=confidence_threshold, verbose=False)
 
         Path(output_dir).mkdir(parents=True, exist_ok=True)
 
@@ -92,10 +145,9 @@ def segment_image(model_path, image_path, output_dir, confidence_threshold=0.1,
         if generate_preview and results:
             preview_filename = f"preview_{Path(image_path).stem}.jpg"
             preview_path = Path(output_dir) / preview_filename
-            detected_objects = draw_segmentation_preview(image_path, results, preview_path)
+            detected_objects = draw_segmentation_preview(page.reduced, results, preview_path, to_full=page.to_full)
 
         # ----------------- Segments -----------------
-        img = cv2.imread(str(image_path))
         for i, r in enumerate(results):
             if not hasattr(r, "boxes") or r.boxes is None:
                 continue
@@ -107,7 +159,8 @@ def segment_image(model_path, image_path, output_dir, confidence_threshold=0.1,
 
                 cls_id = int(box.cls[0].item())
                 label = r.names[cls_id]
-                xyxy = box.xyxy[0].cpu().numpy().astype(int)
+                # Full-resolution pixels
+                xyxy = np.array(page.to_full(box.xyxy[0].cpu().numpy()))
 
                 print(f"➡️ Detected {label} ({conf:.2f}) at {xyxy.tolist()} "
                       f"| Mask: {'Yes' if r.masks is not None else 'No'}", file=sys.stderr)
@@ -115,31 +168,39 @@ def segment_image(model_path, image_path, output_dir, confidence_threshold=0.1,
                 if xyxy[2] <= xyxy[0] or xyxy[3] <= xyxy[1]:
                     continue
 
+                cropped = page.crop(*xyxy)
                 if r.masks is not None and len(r.masks.data) > j:
                     mask = r.masks.data[j].cpu().numpy().astype("uint8") * 255
-                    mask_resized = cv2.resize(mask, (img.shape[1], img.shape[0]))
-                    segmented = cv2.bitwise_and(img, img, mask=mask_resized)
-                    cropped = segmented[xyxy[1]:xyxy[3], xyxy[0]:xyxy[2]]
-                else:
-                    cropped = img[xyxy[1]:xyxy[3], xyxy[0]:xyxy[2]]
+                    mask_resized = cv2.resize(mask, page.size)
+                    # Masked within the crop only, not across the whole page
+                    region_mask = mask_resized[max(0, xyxy[1]):xyxy[3], max(0, xyxy[0]):xyxy[2]]
+                    cropped = cv2.bitwise_and(cropped, cropped, mask=region_mask)
 
                 if cropped.size == 0:
                     continue
 
-                segment_filename = f"{label}_{i}_{j}_{conf:.2f}.jpg"
+                segment_filename = encoding.filename(f"{name_prefix}{label}_{i}_{j}_{conf:.2f}")
                 segment_path = Path(output_dir) / segment_filename
-                cv2.imwrite(str(segment_path), cropped)
+                encoding.write(segment_path, cropped)
 
+                segment_id = f"{name_prefix}{label}_{i}_{j}"
                 segments.append({
-                    "id": f"{label}_{i}_{j}",
+                    "id": segment_id,
                     "label": label,
                     "confidence": conf,
                     "bbox": xyxy.tolist(),
                     # ✅ return relative URL, not full path
                     "url": f"{url_prefix}{segment_filename}",
-                    "filename": segment_filename
+                    "filename": segment_filename,
+                    "cache_key": (cache.store(upload_id, segment_id, cropped, source=str(segment_path))
+                                  if cache is not None else None)
                 })
 
+        if cache is not None:
+            if cache_page and page.path and page.full_loaded and not isinstance(page.full, np.memmap):
+                cache.store(upload_id, page_key, page.full, source=page.path)
+            cache.evict_expired()
+
         return {
             "segments": segments,
             "preview": {
@@ -160,21 +221,78 @@ def segment_image(model_path, image_path, output_dir, confidence_threshold=0.1,
             }
         }
 
+def segment_document(model_path, document_path, output_dir, confidence_threshold=0.1, generate_preview=True,
+                     url_prefix="/segments/", dpi=DEFAULT_DPI, cache=None, upload_id=None,
+                     encoding=SEGMENT_ENCODING):
+    """
+    Segment every page of a PDF or multi-page TIFF.
+
+    Pages are rasterized one at a time (the next one while the current page is
+    in inference) and the model is loaded once. Segments of page N are
+    prefixed "p000N_"; the top-level "segments" and "preview" follow
+    segment_image's format, with per-page results under "pages".
+    """
+    upload_id = upload_id or Path(document_path).stem
+    pages = []
+    try:
+        model = load_model(model_path)
+        for page in iter_pages(str(document_path), dpi=dpi, prefetch=1):
+            prefix = f"p{page.index + 1:04d}_" if page.count > 1 else ""
+            result = segment_image(model_path, page.name, output_dir, confidence_threshold, generate_preview,
+                                   url_prefix, image=page.image, model=model, name_prefix=prefix,
+                                   cache=cache, upload_id=upload_id, encoding=encoding)
+            result["page"] = page.index + 1
+            pages.append(result)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}", file=sys.stderr)
+
+    return {
+        "segments": [segment for page in pages for segment in page["segments"]],
+        "preview": pages[0]["preview"] if pages else {"url": None, "filename": None, "detected_objects": []},
+        "pages": pages
+    }
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", required=True, help="Path to YOLOv8 model (.pt)")
-    parser.add_argument("--image", required=True, help="Path to input image")
+    parser.add_argument("--image", required=True, help="Path to input image, PDF or multi-page TIFF")
     parser.add_argument("--output", default="output", help="Directory to save results")
     parser.add_argument("--no-preview", action="store_true", help="Skip preview")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="Rasterization resolution for PDF pages")
+    parser.add_argument("--upload-id", help="Page cache key for this upload (default: the input file name)")
+    parser.add_argument("--cache-dir", help="Page cache directory (default: $FIELDVIZ_PAGE_CACHE or the temp dir)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not store the crops in the page cache")
+    parser.add_argument("--cache-page", action="store_true",
+                        help="Also cache the decoded page for re-segmenting the same file")
+    parser.add_argument("--encoding", default=SEGMENT_ENCODING,
+                        help="Segment crop encoding: jpeg[:1-100], png[:0-9], webp[:1-100] (lossless without a "
+                             f"level) or raw (default: {SEGMENT_ENCODING})")
     args = parser.parse_args()
 
     Path(args.output).mkdir(parents=True, exist_ok=True)
-    result = segment_image(
-        args.model,
-        args.image,
-        args.output,
-        generate_preview=not args.no_preview
-    )
+    cache = None if args.no_cache else PageCache(args.cache_dir)
+    if args.image.lower().endswith(DOCUMENT_EXTENSIONS):
+        result = segment_document(
+            args.model,
+            args.image,
+            args.output,
+            generate_preview=not args.no_preview,
+            dpi=args.dpi,
+            cache=cache,
+            upload_id=args.upload_id,
+            encoding=args.encoding
+        )
+    else:
+        result = segment_image(
+            args.model,
+            args.image,
+            args.output,
+            generate_preview=not args.no_preview,
+            cache=cache,
+            upload_id=args.upload_id,
+            encoding=args.encoding,
+            cache_page=args.cache_page
+        )
 
     # ✅ Clean JSON only
     print(json.dumps(result, indent=2))
@@ -1,23 +1,107 @@
+import asyncio
 import cv2
 import os
-from ultralytics import YOLO
-import random
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as OpenpyxlImage
-from PIL import Image
-import io
 import numpy as np
-import pytesseract
 import sys
 import json
-import shutil
 from pathlib import Path
 
+# Shared pipeline helpers live one level up in segmentation/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from array_ocr import ocr_array
+from crop_encoding import CROP_EXTENSIONS, parse_encoding
+from ocr_scheduler import AsyncOCRScheduler
+from page_cache import PageCache
+from page_source import DEFAULT_DPI, DOCUMENT_EXTENSIONS, DualResolutionImage, iter_pages
+from result_writers import WRITERS, write_cells
+
+# Each export starts a fresh interpreter, so heavy modules (ultralytics/torch,
+# openpyxl, PIL, pytesseract) are imported inside the functions that use them;
+# see benchmarks/bench_startup.py for the startup budget.
+
 # Configure Tesseract path
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+_tesseract_configured = False
+
+# Table outputs: the Excel workbook is one view; jsonl/parquet/arrow hold one
+# record per cell (see result_writers.py) and are written only when asked for
+EXCEL_FORMAT = "xlsx"
+RESULT_FORMATS = (EXCEL_FORMAT,)
+
+# Column and row crops are read back and OCR'd within the export, so they are
+# written uncompressed by default: ~25x cheaper to encode and decode than
+# PNG, ~3x the bytes (benchmarks/bench_encode.py). Use e.g. "png" to keep
+# exports small.
+CROP_ENCODING = "raw"
+
+
+def configure_tesseract():
+    """Point pytesseract (the OCR fallback without tesserocr) at TESSERACT_CMD, once."""
+    global _tesseract_configured
+    if not _tesseract_configured:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        _tesseract_configured = True
+
+
+def load_model(model_path):
+    """Load a YOLO model, importing ultralytics on first use."""
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def class_colors_for(class_names, seed):
+    """Stable random BGR color per class name."""
+    import random
+    rng = random.Random(seed)
+    return {
+        cls: (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+        for cls in class_names
+    }
+
+def load_models(models_dir):
+    """
+    Load the column and row detection models from models_dir.
+    
+    Returns:
+        tuple: (column_model, row_model)
+    """
+    column_model_path = os.path.join(models_dir, "column_detect.pt")
+    row_model_path = os.path.join(models_dir, "row_detect.pt")
+    
+    # Verify model files exist
+    if not os.path.exists(column_model_path):
+        raise FileNotFoundError(f"Column detection model not found: {column_model_path}")
+    if not os.path.exists(row_model_path):
+        raise FileNotFoundError(f"Row detection model not found: {row_model_path}")
+    
+    return load_model(column_model_path), load_model(row_model_path)
+
+
+def load_cached_segment(cache_key, selected_image_path, cache=None):
+    """
+    Memory-map the raw crop that segment.py cached for the selected segment.
+    
+    Returns None (decode the JPEG instead) when the crop is not cached or the
+    segment image changed since it was cached.
+    """
+    try:
+        return (cache or PageCache()).load_key(cache_key, source=selected_image_path)
+    except Exception as e:
+        print(f"⚠️ Page cache lookup failed, decoding the segment image: {e}")
+        return None
 
-def process_selected_segments(selected_image_path, output_dir, models_dir):
+
+def check_result_formats(formats):
+    """Raise ValueError for formats that are neither Excel nor a registered writer."""
+    unknown = [f for f in formats if f != EXCEL_FORMAT and f not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown result format(s) {unknown}, expected any of "
+                         f"{[EXCEL_FORMAT] + sorted(WRITERS)}")
+
+
+def process_selected_segments(selected_image_path, output_dir, models_dir, image=None, models=None, export_name=None,
+                              formats=RESULT_FORMATS, page_number=1, crop_encoding=CROP_ENCODING):
     """
     Process a single selected segment image through column and row segmentation,
     then generate Excel output.
@@ -26,16 +110,26 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
         selected_image_path (str): Path to the selected segment image
         output_dir (str): Base output directory for all results
         models_dir (str): Directory containing the model files
+        image (np.ndarray): Optional already decoded BGR page (e.g. a PDF page
+            from page_source.iter_pages); selected_image_path then only names it
+        models (tuple): Optional (column_model, row_model) reused across pages
+        export_name (str): Output folder name under output_dir (default export_<timestamp>)
+        formats (tuple): Table outputs to write: "xlsx" and/or result_writers formats
+        page_number (int): Page recorded on each cell (1 for single images)
+        crop_encoding (str): Encoding of the column and row crops, see crop_encoding.parse_encoding
     
     Returns:
         dict: Status and paths of generated files
     """
     
     try:
+        check_result_formats(formats)
+        crop_encoding = parse_encoding(crop_encoding)
+        
         # Create timestamped output directories
         import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_output = os.path.join(output_dir, f"export_{timestamp}")
+        base_output = os.path.join(output_dir, export_name or f"export_{timestamp}")
         
         column_output_dir = os.path.join(base_output, "column_segment")
         row_output_dir = os.path.join(base_output, "row_segments")
@@ -46,15 +140,8 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
         os.makedirs(row_output_dir, exist_ok=True)
         os.makedirs(excel_output_dir, exist_ok=True)
         
-        # Model paths
-        column_model_path = os.path.join(models_dir, "column_detect.pt")
-        row_model_path = os.path.join(models_dir, "row_detect.pt")
-        
-        # Verify model files exist
-        if not os.path.exists(column_model_path):
-            raise FileNotFoundError(f"Column detection model not found: {column_model_path}")
-        if not os.path.exists(row_model_path):
-            raise FileNotFoundError(f"Row detection model not found: {row_model_path}")
+        # Load the column and row models unless the caller keeps them resident
+        column_model, row_model = models or load_models(models_dir)
         
         print(f"🔄 Processing selected image: {selected_image_path}")
         print(f"📁 Output directory: {base_output}")
@@ -64,25 +151,17 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
         
         # Define classes and colors for columns
         class_names = [f"c_{i}" for i in range(1, 34)]  # c_1 … c_33
-        random.seed(42)
-        class_colors = {
-            cls: (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-            for cls in class_names
-        }
-        
-        # Load column detection model
-        column_model = YOLO(column_model_path)
+        class_colors = class_colors_for(class_names, seed=42)
         
-        # Read input image
-        img = cv2.imread(selected_image_path)
-        if img is None:
-            raise ValueError(f"Could not read image: {selected_image_path}")
+        # Column detection runs at full resolution with imgsz from the full
+        # size (33 narrow columns); the reduced decode only backs the preview
+        page = DualResolutionImage(selected_image_path if image is None else image)
         
-        h, w = img.shape[:2]
+        w, h = page.size
         
         # Run column detection
         results = column_model(
-            selected_image_path,
+            page.full,
             conf=0.15,
             iou=0.3,
             imgsz=max(640, max(w, h)),
@@ -95,8 +174,11 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
         print(f"📊 Image dimensions: {w}x{h}")
         print(f"🔍 Total column detections found: {len(results[0].boxes) if results[0].boxes is not None else 0}")
         
-        # Process column results
-        annotated_img = img.copy()
+        # Column bbox (segment pixels) per saved crop, carried to the cell records
+        column_boxes = {}
+        
+        # Process column results (annotated on the reduced view)
+        annotated_img = page.reduced.copy()
         detection_count = 0
         
         for result in results:
@@ -124,7 +206,7 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
                     x1, y1, x2, y2 = map(int, box.xyxy[0])
                     
                     box_w, box_h = x2 - x1, y2 - y1
-                    img_area = img.shape[0] * img.shape[1]
+                    img_area = w * h
                     box_area = box_w * box_h
                     
                     # Filter out too small or too large boxes
@@ -138,16 +220,18 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
                     detection_count += 1
                     
                     # Save segmented column
-                    crop = img[y1:y2, x1:x2]
-                    save_path = os.path.join(column_output_dir, f"{label}_conf{confidence:.2f}.png")
-                    cv2.imwrite(save_path, crop)
+                    crop = page.crop(x1, y1, x2, y2)
+                    save_name = crop_encoding.filename(f"{label}_conf{confidence:.2f}")
+                    crop_encoding.write(os.path.join(column_output_dir, save_name), crop)
+                    column_boxes[save_name] = (max(0, x1), max(0, y1), min(w, x2), min(h, y2))
                     
                     # Draw bounding box
                     color = class_colors.get(label, (0, 255, 255))
-                    cv2.rectangle(annotated_img, (x1, y1), (x2, y2), color, 2)
+                    rx1, ry1, rx2, ry2 = page.to_reduced((x1, y1, x2, y2))
+                    cv2.rectangle(annotated_img, (rx1, ry1), (rx2, ry2), color, 2)
                     display_label = f"{label} ({confidence:.2f})"
                     cv2.putText(
-                        annotated_img, display_label, (x1, y1 - 10),
+                        annotated_img, display_label, (rx1, ry1 - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2
                     )
         
@@ -158,25 +242,20 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
         cv2.imwrite(annotated_path, annotated_img)
         
         # Rename column crops sequentially
-        rename_columns_sequentially(column_output_dir, prefix="c_", total_columns=33)
+        renamed = rename_columns_sequentially(column_output_dir, prefix="c_", total_columns=33)
+        column_boxes = {os.path.splitext(renamed.get(name, name))[0]: box for name, box in column_boxes.items()}
+        cell_geometry = {}
         
         # ======================= STEP 2: ROW SEGMENTATION =======================
         print("🔄 Starting Row Segmentation...")
         
         # Define classes and colors for rows
         row_class_names = [f"r_{i}" for i in range(1, 25)]  # r_1 ... r_24
-        random.seed(123)
-        row_class_colors = {
-            cls: (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-            for cls in row_class_names
-        }
-        
-        # Load row detection model
-        row_model = YOLO(row_model_path)
+        row_class_colors = class_colors_for(row_class_names, seed=123)
         
         # Process each column image for row detection
         for file_name in os.listdir(column_output_dir):
-            if not (file_name.lower().endswith((".png", ".jpg", ".jpeg")) and file_name.startswith("c_")):
+            if not (file_name.lower().endswith(CROP_EXTENSIONS) and file_name.startswith("c_")):
                 continue
             
             image_path = os.path.join(column_output_dir, file_name)
@@ -187,9 +266,9 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
             
             h, w = img.shape[:2]
             
-            # Run row detection
+            # Run row detection on the decoded crop (not re-read from the path)
             results = row_model(
-                image_path,
+                img,
                 conf=0.15,
                 iou=0.3,
                 imgsz=max(640, max(w, h)),
@@ -248,10 +327,12 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
             save_dir = os.path.join(row_output_dir, base_name)
             os.makedirs(save_dir, exist_ok=True)
             
+            row_boxes = {}
             for idx, (y1, x1, x2, y2, label, conf) in enumerate(row_detections, start=1):
                 crop = img[y1:y2, x1:x2]
-                save_path = os.path.join(save_dir, f"{label}_conf{conf:.2f}.png")
-                cv2.imwrite(save_path, crop)
+                save_name = crop_encoding.filename(f"{label}_conf{conf:.2f}")
+                crop_encoding.write(os.path.join(save_dir, save_name), crop)
+                row_boxes[save_name] = ((x1, y1, x2, y2), conf)
                 
                 # Annotate
                 color = row_class_colors.get(label, (0, 255, 255))
@@ -266,17 +347,28 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
             print(f"✅ {row_detection_count} valid rows saved for {file_name}")
             
             # Rename rows sequentially
-            rename_rows_sequentially(save_dir, prefix="r_", total_rows=24)
+            renamed = rename_rows_sequentially(save_dir, prefix="r_", total_rows=24)
+            
+            # Row bbox in segment pixels (offset by the column's position) and detection confidence
+            cx1, cy1 = column_boxes.get(base_name, (0, 0, 0, 0))[:2]
+            for name, ((x1, y1, x2, y2), conf) in row_boxes.items():
+                row_name = os.path.splitext(renamed.get(name, name))[0]
+                cell_geometry[(base_name, row_name)] = {
+                    'bbox': [cx1 + x1, cy1 + y1, cx1 + x2, cy1 + y2],
+                    'row_confidence': conf
+                }
         
-        # ======================= STEP 3: EXCEL GENERATION =======================
-        print("🔄 Starting Excel Generation...")
+        # ======================= STEP 3: TABLE OUTPUTS =======================
+        print(f"🔄 Writing table outputs: {', '.join(formats)}")
         
-        excel_file_path = generate_excel_from_segments(row_output_dir, excel_output_dir)
+        output_paths = export_table_from_segments(row_output_dir, excel_output_dir, formats=formats,
+                                                  geometry=cell_geometry, page_number=page_number)
         
         return {
             "status": "success",
             "message": "Excel export completed successfully",
-            "excel_path": excel_file_path,
+            "excel_path": output_paths.get(EXCEL_FORMAT),
+            "outputs": output_paths,
             "output_dir": base_output,
             "column_segments": detection_count,
             "timestamp": timestamp
@@ -291,16 +383,68 @@ def process_selected_segments(selected_image_path, output_dir, models_dir):
         }
 
 
+def process_document_pages(document_path, output_dir, models_dir, dpi=DEFAULT_DPI, formats=RESULT_FORMATS,
+                           crop_encoding=CROP_ENCODING):
+    """
+    Run process_selected_segments on every page of a PDF or multi-page TIFF.
+    
+    Pages are rasterized one at a time (the next one while the current page is
+    in inference) and both models are loaded once. Each page is exported to
+    export_<timestamp>/<document>_p000N/.
+    
+    Returns:
+        dict: Overall status, the first page's result fields and per-page results under "pages"
+    """
+    import datetime
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    try:
+        models = load_models(models_dir)
+        pages = []
+        for page in iter_pages(document_path, dpi=dpi, prefetch=1):
+            print(f"📄 Page {page.index + 1}/{page.count}")
+            result = process_selected_segments(page.name, output_dir, models_dir, image=page.image, models=models,
+                                               export_name=os.path.join(f"export_{timestamp}", page.name),
+                                               formats=formats, page_number=page.index + 1,
+                                               crop_encoding=crop_encoding)
+            result["page"] = page.index + 1
+            pages.append(result)
+    except Exception as e:
+        print(f"❌ Error in process_document_pages: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error processing document: {str(e)}",
+            "excel_path": None
+        }
+    
+    if not pages:
+        return {"status": "error", "message": f"No pages in document: {document_path}", "excel_path": None}
+    
+    failed = [page for page in pages if page["status"] != "success"]
+    return {
+        **pages[0],
+        "status": "error" if failed else "success",
+        "message": f"{len(pages) - len(failed)}/{len(pages)} pages exported",
+        "output_dir": os.path.join(output_dir, f"export_{timestamp}"),
+        "column_segments": sum(page.get("column_segments", 0) for page in pages),
+        "pages": pages
+    }
+
+
 def rename_columns_sequentially(folder, prefix="c_", total_columns=33):
     """
     Renames all files starting with prefix (e.g., c_) in sequential order.
+    
+    Returns:
+        dict: old file name -> new file name
     """
     files = [f for f in os.listdir(folder) if f.startswith(prefix)]
     files.sort()
+    renamed = {}
     
     if not files:
         print("⚠️ No column files found to rename.")
-        return
+        return renamed
     
     for idx, old_name in enumerate(files, start=1):
         if idx > total_columns:
@@ -313,21 +457,27 @@ def rename_columns_sequentially(folder, prefix="c_", total_columns=33):
         if os.path.exists(new_path):
             os.remove(new_path)
         os.rename(old_path, new_path)
+        renamed[old_name] = new_name
         print(f"🔄 Renamed {old_name} ➝ {new_name}")
     
     print(f"✅ Renamed {min(len(files), total_columns)} columns sequentially")
+    return renamed
 
 
 def rename_rows_sequentially(folder, prefix="r_", total_rows=24):
     """
     Renames all files starting with prefix (e.g., r_) in sequential order.
+    
+    Returns:
+        dict: old file name -> new file name
     """
     files = [f for f in os.listdir(folder) if f.startswith(prefix)]
     files.sort()
+    renamed = {}
     
     if not files:
         print(f"⚠️ No row files found in {folder}")
-        return
+        return renamed
     
     for idx, old_name in enumerate(files, start=1):
         if idx > total_rows:
@@ -340,124 +490,260 @@ def rename_rows_sequentially(folder, prefix="r_", total_rows=24):
         if os.path.exists(new_path):
             os.remove(new_path)
         os.rename(old_path, new_path)
+        renamed[old_name] = new_name
     
     print(f"   ✅ Renamed {min(len(files), total_rows)} rows sequentially")
+    return renamed
+
 
+DIGITS_OCR_CONFIG = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.'
 
-def ocr_digits_only(image_path):
+
+def ocr_digits_only(image):
     """
     Perform OCR restricted to digits and '.' sign only.
+
+    Accepts a crop path or a grayscale/BGR NumPy array; arrays are handed to
+    the engine as raw buffers.
     """
     try:
-        custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.'
-        text = pytesseract.image_to_string(Image.open(image_path), config=custom_config)
-        text = text.strip()
-        return text
+        configure_tesseract()
+        if not isinstance(image, np.ndarray):
+            image = cv2.imread(str(image), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise ValueError("could not read image")
+        return ocr_array(image, config=DIGITS_OCR_CONFIG)
     except Exception as e:
-        print(f"⚠️ OCR failed on {image_path}: {e}")
+        label = "array" if isinstance(image, np.ndarray) else image
+        print(f"⚠️ OCR failed on {label}: {e}")
         return ""
 
 
-def generate_excel_from_segments(row_segments_dir, excel_output_dir):
+def collect_row_cells(row_segments_dir):
     """
-    Generate Excel file from row segments with OCR and image insertion.
+    List every row crop under row_segments_dir as a cell to OCR.
+
+    Returns:
+        tuple: (sorted column folder names, list of cell dicts with
+        column/row indices and the crop path)
     """
-    # Create new Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Table Data"
-    
-    # Get all column folders from row_segments directory
     column_folders = []
     for item in os.listdir(row_segments_dir):
         item_path = os.path.join(row_segments_dir, item)
         if os.path.isdir(item_path) and item.startswith('c_'):
             column_folders.append(item)
-    
+
     # Sort column folders numerically
     column_folders.sort(key=lambda x: int(x.split('_')[1]) if len(x.split('_')) > 1 and x.split('_')[1].isdigit() else 0)
-    
-    max_cols = len(column_folders)
+
+    cells = []
+    for col_idx, column_name in enumerate(column_folders, 1):
+        column_path = os.path.join(row_segments_dir, column_name)
+        if not os.path.exists(column_path):
+            print(f"  ⚠️ Column folder not found: {column_path}")
+            continue
+
+        row_files = [f for f in os.listdir(column_path) if f.lower().endswith(CROP_EXTENSIONS)]
+        for row_file in row_files:
+            row_name = os.path.splitext(row_file)[0]
+            if not row_name.startswith('r_'):
+                continue
+
+            row_parts = row_name.split('_')
+            if len(row_parts) > 1 and row_parts[1].isdigit():
+                cells.append({
+                    'column_name': column_name,
+                    'column': col_idx,
+                    'row_name': row_name,
+                    'row': int(row_parts[1]),
+                    'image_path': os.path.join(column_path, row_file)
+                })
+            else:
+                print(f"  ⚠️ Invalid row format: {row_name}")
+
+    return column_folders, cells
+
+
+async def ocr_cells_async(cells, scheduler):
+    """
+    OCR all cells through a shared AsyncOCRScheduler and store the text on each cell.
+
+    Long-running workers can await this for several jobs on one event loop;
+    the scheduler's concurrency limit then applies across all of them.
+    """
+    texts = await scheduler.ocr_many(
+        (cell['image_path'], DIGITS_OCR_CONFIG) for cell in cells
+    )
+    for cell in cells:
+        cell['ocr_text'] = texts.get(cell['image_path'], "")
+    return cells
+
+
+def create_ocr_scheduler(ocr_concurrency=None, ocr_timeout=10.0, ocr_retries=1):
+    """Create a scheduler that uses the configured Tesseract executable."""
+    return AsyncOCRScheduler(
+        tesseract_cmd=TESSERACT_CMD,
+        max_concurrency=ocr_concurrency,
+        timeout=ocr_timeout,
+        retries=ocr_retries
+    )
+
+
+def attach_cell_fields(cells, geometry=None, page_number=1):
+    """
+    Add the result-writer fields to OCR'd cells: page, value (None without
+    an OCR result), and the row's bbox in segment pixels and row detector
+    confidence (row_confidence, not an OCR confidence) from
+    geometry[(column_name, row_name)], when known.
+    """
+    geometry = geometry or {}
+    for cell in cells:
+        info = geometry.get((cell['column_name'], cell['row_name']), {})
+        cell['page'] = page_number
+        cell['value'] = cell.get('ocr_text') or None
+        cell['bbox'] = info.get('bbox')
+        cell['row_confidence'] = info.get('row_confidence')
+    return cells
+
+
+async def export_table_from_segments_async(row_segments_dir, output_dir, formats=RESULT_FORMATS, geometry=None,
+                                           page_number=1, scheduler=None):
+    """
+    OCR every row crop once and write the cells in each requested format:
+    "xlsx" (the workbook, with crop images for unreadable cells) and any
+    result_writers format ("jsonl", "parquet", "arrow"), all named table_data.*.
+
+    Cell OCR runs concurrently with per-cell timeouts instead of one blocking
+    Tesseract call after another.
+
+    Returns:
+        dict: format -> output path
+    """
+    check_result_formats(formats)
+    scheduler = scheduler or create_ocr_scheduler()
+
+    column_folders, cells = collect_row_cells(row_segments_dir)
+    print(f"📊 Found {len(column_folders)} columns: {column_folders}")
+    print(f"🔄 Running OCR on {len(cells)} cells (concurrency={scheduler.max_concurrency}, "
+          f"timeout={scheduler.timeout}s)")
+
+    await ocr_cells_async(cells, scheduler)
+    print(f"📈 OCR stats: {scheduler.stats}")
+
+    # Table order: column by column, rows top to bottom
+    cells.sort(key=lambda cell: (cell['column'], cell['row']))
+    attach_cell_fields(cells, geometry, page_number)
+
+    paths = write_cells(cells, [f for f in formats if f != EXCEL_FORMAT], output_dir)
+    for fmt, path in paths.items():
+        print(f"✅ {fmt} saved: {path}")
+    if EXCEL_FORMAT in formats:
+        paths[EXCEL_FORMAT] = write_excel_from_cells(column_folders, cells, output_dir)
+    return paths
+
+
+def export_table_from_segments(row_segments_dir, output_dir, formats=RESULT_FORMATS, geometry=None, page_number=1,
+                               ocr_concurrency=None, ocr_timeout=10.0):
+    """Synchronous export_table_from_segments_async on a private event loop."""
+    scheduler = create_ocr_scheduler(ocr_concurrency=ocr_concurrency, ocr_timeout=ocr_timeout)
+    try:
+        return asyncio.run(export_table_from_segments_async(row_segments_dir, output_dir, formats, geometry,
+                                                            page_number, scheduler))
+    finally:
+        scheduler.close()
+
+
+async def generate_excel_from_segments_async(row_segments_dir, excel_output_dir, scheduler=None):
+    """
+    Async entry point for Excel generation: cell OCR runs concurrently with
+    per-cell timeouts instead of one blocking Tesseract call after another.
+    """
+    paths = await export_table_from_segments_async(row_segments_dir, excel_output_dir, formats=(EXCEL_FORMAT,),
+                                                   scheduler=scheduler)
+    return paths[EXCEL_FORMAT]
+
+
+def generate_excel_from_segments(row_segments_dir, excel_output_dir, ocr_concurrency=None, ocr_timeout=10.0):
+    """
+    Generate Excel file from row segments with OCR and image insertion.
+    """
+    scheduler = create_ocr_scheduler(ocr_concurrency=ocr_concurrency, ocr_timeout=ocr_timeout)
+    try:
+        return asyncio.run(generate_excel_from_segments_async(row_segments_dir, excel_output_dir, scheduler))
+    finally:
+        scheduler.close()
+
+
+def write_excel_from_cells(column_folders, cells, excel_output_dir):
+    """
+    Write OCR'd cells to an Excel workbook, inserting the crop image for
+    cells without a valid OCR result.
+    """
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image as OpenpyxlImage
+    from PIL import Image
+
+    # Create new Excel workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Table Data"
+
     row_height = 25
     col_width = 20
     temp_images = []
-    
-    print(f"📊 Found {max_cols} columns: {column_folders}")
-    
-    # Process each column
+
     for col_idx, column_name in enumerate(column_folders, 1):
-        column_path = os.path.join(row_segments_dir, column_name)
-        
         # Set column width
         ws.column_dimensions[ws.cell(row=1, column=col_idx).column_letter].width = col_width
-        
+
         # Add column header
         ws.cell(row=1, column=col_idx, value=column_name.upper())
-        
-        print(f"🔄 Processing column: {column_name}")
-        
-        # Get all row images in this column folder
-        if os.path.exists(column_path):
-            row_files = [f for f in os.listdir(column_path) if f.endswith(('.png', '.jpg'))]
-            
-            # Process each row image
-            for row_file in row_files:
-                row_name = os.path.splitext(row_file)[0]
-                if row_name.startswith('r_'):
-                    try:
-                        # Extract row number
-                        row_parts = row_name.split('_')
-                        if len(row_parts) > 1 and row_parts[1].isdigit():
-                            row_num = int(row_parts[1])
-                            excel_row = row_num + 1  # +1 because row 1 is header
-                            
-                            # Set row height
-                            ws.row_dimensions[excel_row].height = row_height
-                            
-                            image_path = os.path.join(column_path, row_file)
-                            
-                            # Perform OCR
-                            ocr_text = ocr_digits_only(image_path)
-                            
-                            if ocr_text:
-                                # Write OCR result into Excel cell
-                                ws.cell(row=excel_row, column=col_idx, value=ocr_text)
-                                print(f"  🔢 OCR extracted '{ocr_text}' from {row_name}")
-                            else:
-                                # Fallback: insert image into Excel
-                                try:
-                                    pil_img = Image.open(image_path)
-                                    
-                                    # Resize image to fit in cell
-                                    max_width = 150
-                                    max_height = 80
-                                    pil_img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                                    
-                                    # Save resized image temporarily
-                                    temp_img_path = os.path.join(excel_output_dir, f"temp_{column_name}_{row_name}.png")
-                                    pil_img.save(temp_img_path)
-                                    temp_images.append(temp_img_path)
-                                    
-                                    img = OpenpyxlImage(temp_img_path)
-                                    cell_ref = ws.cell(row=excel_row, column=col_idx).coordinate
-                                    img.anchor = cell_ref
-                                    ws.add_image(img)
-                                    
-                                    print(f"  🖼️ Inserted image for {row_name} (no valid OCR)")
-                                
-                                except Exception as e:
-                                    print(f"  ⚠️ Error processing image {row_file}: {e}")
-                                    ws.cell(row=excel_row, column=col_idx, value=f"Image: {row_name}")
-                        
-                    except ValueError as e:
-                        print(f"  ⚠️ Invalid row format: {row_name} - {e}")
+
+    for cell in cells:
+        col_idx = cell['column']
+        column_name = cell['column_name']
+        row_name = cell['row_name']
+        image_path = cell['image_path']
+        ocr_text = cell.get('ocr_text', "")
+        excel_row = cell['row'] + 1  # +1 because row 1 is header
+
+        # Set row height
+        ws.row_dimensions[excel_row].height = row_height
+
+        if ocr_text:
+            # Write OCR result into Excel cell
+            ws.cell(row=excel_row, column=col_idx, value=ocr_text)
+            print(f"  🔢 OCR extracted '{ocr_text}' from {column_name}/{row_name}")
         else:
-            print(f"  ⚠️ Column folder not found: {column_path}")
-    
+            # Fallback: insert image into Excel
+            try:
+                pil_img = Image.open(image_path)
+
+                # Resize image to fit in cell
+                max_width = 150
+                max_height = 80
+                pil_img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+                # Save resized image temporarily
+                temp_img_path = os.path.join(excel_output_dir, f"temp_{column_name}_{row_name}.png")
+                pil_img.save(temp_img_path)
+                temp_images.append(temp_img_path)
+
+                img = OpenpyxlImage(temp_img_path)
+                cell_ref = ws.cell(row=excel_row, column=col_idx).coordinate
+                img.anchor = cell_ref
+                ws.add_image(img)
+
+                print(f"  🖼️ Inserted image for {column_name}/{row_name} (no valid OCR)")
+
+            except Exception as e:
+                print(f"  ⚠️ Error processing image {image_path}: {e}")
+                ws.cell(row=excel_row, column=col_idx, value=f"Image: {row_name}")
+
     # Save Excel file
     excel_file_path = os.path.join(excel_output_dir, "table_data.xlsx")
     wb.save(excel_file_path)
-    
+
     # Clean up temporary images
     print("🧹 Cleaning up temporary files...")
     for temp_img_path in temp_images:
@@ -466,7 +752,7 @@ def generate_excel_from_segments(row_segments_dir, excel_output_dir):
                 os.remove(temp_img_path)
         except Exception as e:
             print(f"  ⚠️ Could not remove temp file {temp_img_path}: {e}")
-    
+
     print(f"✅ Excel file saved: {excel_file_path}")
     return excel_file_path
 
@@ -476,14 +762,29 @@ def main():
     """
     Main function to handle command line arguments and process segments.
     Expected arguments: selected_image_path, output_dir, models_dir
+    [cache_key] [--formats xlsx,jsonl,parquet] (selected_image_path may also
+    be a PDF or multi-page TIFF; cache_key is the segment's "cache_key" from
+    segment.py)
     """
-    if len(sys.argv) != 4:
-        print("Usage: python workflow.py <selected_image_path> <output_dir> <models_dir>")
-        sys.exit(1)
+    import argparse
+    parser = argparse.ArgumentParser(description="Column/row segmentation and table export of a selected segment")
+    parser.add_argument("selected_image_path")
+    parser.add_argument("output_dir")
+    parser.add_argument("models_dir")
+    parser.add_argument("cache_key", nargs="?", help="Page cache key of the segment (from segment.py)")
+    parser.add_argument("--formats", default=",".join(RESULT_FORMATS),
+                        help=f"Comma-separated table outputs: {EXCEL_FORMAT}, {', '.join(sorted(WRITERS))} "
+                             f"(default: {','.join(RESULT_FORMATS)})")
+    parser.add_argument("--crop-encoding", default=CROP_ENCODING,
+                        help=f"Column/row crop encoding: png[:0-9], jpeg[:1-100], webp[:1-100] (lossless without "
+                             f"a level) or raw (default: {CROP_ENCODING})")
+    args = parser.parse_args()
     
-    selected_image_path = sys.argv[1]
-    output_dir = sys.argv[2]
-    models_dir = sys.argv[3]
+    selected_image_path = args.selected_image_path
+    output_dir = args.output_dir
+    models_dir = args.models_dir
+    cache_key = args.cache_key
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
     
     # Verify input image exists
     if not os.path.exists(selected_image_path):
@@ -494,8 +795,17 @@ def main():
         print(json.dumps(result))
         sys.exit(1)
     
-    # Process the selected segments
-    result = process_selected_segments(selected_image_path, output_dir, models_dir)
+    # Process the selected segments, page by page for documents
+    if selected_image_path.lower().endswith(DOCUMENT_EXTENSIONS):
+        result = process_document_pages(selected_image_path, output_dir, models_dir, formats=formats,
+                                        crop_encoding=args.crop_encoding)
+    else:
+        # The raw crop from the page cache skips the JPEG decode (and its compression loss)
+        image = load_cached_segment(cache_key, selected_image_path) if cache_key else None
+        if image is not None:
+            print(f"♻️ Using cached segment: {cache_key}")
+        result = process_selected_segments(selected_image_path, output_dir, models_dir, image=image,
+                                           formats=formats, crop_encoding=args.crop_encoding)
     
     # Output result as JSON for easy parsing by Node.js
     print(json.dumps(result))
@@ -504,7 +814,8 @@ def main():
         print("\n" + "="*60)
         print("📋 EXCEL EXPORT COMPLETED SUCCESSFULLY!")
         print("="*60)
-        print(f"📄 Excel file: {result['excel_path']}")
+        for fmt, path in result.get("outputs", {}).items():
+            print(f"📄 {fmt}: {path}")
         print(f"📁 Output directory: {result['output_dir']}")
         print(f"🔢 Column segments: {result['column_segments']}")
         print("="*60)
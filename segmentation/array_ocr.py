@@ -0,0 +1,152 @@
+# array_ocr.py
+# NumPy-native OCR: hands raw image buffers to Tesseract without PNG
+# encoding, temp files or PIL round trips
+
+import atexit
+import queue
+import shlex
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# tesserocr wraps the Tesseract C++ API and accepts raw buffers via SetImageBytes.
+# pytesseract is kept as a fallback; it still writes a temp file per call.
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Idle tesserocr APIs per (lang, config); every API ever created is kept in
+# _all_apis so release_apis() can End() them
+_idle_apis: Dict[Tuple[str, str], queue.SimpleQueue] = {}
+_all_apis = []
+_api_lock = threading.Lock()
+
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """
+    Split a pytesseract-style config string into (psm, oem, variables).
+
+    Example: '--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.'
+    """
+    tokens = shlex.split(config or '', posix=not sys.platform.startswith('win'))
+    psm, oem, variables = None, None, {}
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '--psm' and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif token == '--oem' and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 1
+        elif token == '-c' and i + 1 < len(tokens) and '=' in tokens[i + 1]:
+            key, value = tokens[i + 1].split('=', 1)
+            variables[key] = value
+            i += 1
+        i += 1
+
+    return psm, oem, variables
+
+
+def _create_api(config: str, lang: str):
+    """A tesserocr API configured for this config string (loads the traineddata)."""
+    psm, oem, variables = parse_tesseract_config(config)
+    kwargs = {'lang': lang}
+    if psm is not None:
+        kwargs['psm'] = psm
+    if oem is not None:
+        kwargs['oem'] = oem
+    api = tesserocr.PyTessBaseAPI(**kwargs)
+    for name, value in variables.items():
+        api.SetVariable(name, value)
+    with _api_lock:
+        _all_apis.append(api)
+    return api
+
+
+def _checkout_api(config: str, lang: str):
+    """
+    Take an idle API for (lang, config), creating one if all are in use.
+
+    Tesseract variables persist on an API instance, so APIs are pooled per
+    (lang, config). The API itself is not thread-safe: a checked-out API
+    belongs to one caller until _return_api(). APIs outlive the threads that
+    used them, so short-lived thread pools do not reload the traineddata.
+    """
+    key = (lang, config)
+    with _api_lock:
+        idle = _idle_apis.setdefault(key, queue.SimpleQueue())
+    try:
+        return idle.get_nowait()
+    except queue.Empty:
+        return _create_api(config, lang)
+
+
+def _return_api(config: str, lang: str, api):
+    idle = _idle_apis.get((lang, config))
+    if idle is not None:  # None once release_apis() has run
+        idle.put(api)
+
+
+def release_apis():
+    """End() every pooled API (called at interpreter exit)."""
+    with _api_lock:
+        apis = list(_all_apis)
+        _all_apis.clear()
+        _idle_apis.clear()
+    for api in apis:
+        api.End()
+
+
+atexit.register(release_apis)
+
+
+def to_ocr_buffer(image: np.ndarray) -> np.ndarray:
+    """
+    Return a C-contiguous uint8 buffer Tesseract can read directly.
+
+    Grayscale arrays are passed through untouched; BGR arrays (OpenCV order)
+    are reordered to RGB, which is what Tesseract expects for 3 channels.
+    """
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    if image.ndim == 3:
+        if image.shape[2] == 1:
+            image = image[:, :, 0]
+        elif image.shape[2] == 4:
+            image = image[:, :, 2::-1]
+        else:
+            image = image[:, :, ::-1]
+
+    return np.ascontiguousarray(image)
+
+
+def ocr_array(image: np.ndarray, config: str = '', lang: str = 'eng') -> str:
+    """
+    OCR a grayscale or BGR NumPy array.
+
+    With tesserocr installed the buffer goes straight to SetImageBytes with
+    its width, height and bytes-per-line; otherwise pytesseract is used.
+    """
+    buffer = to_ocr_buffer(image)
+    if buffer.size == 0:
+        return ""
+
+    if TESSEROCR_AVAILABLE:
+        height, width = buffer.shape[:2]
+        bytes_per_pixel = 1 if buffer.ndim == 2 else buffer.shape[2]
+        api = _checkout_api(config, lang)
+        try:
+            api.SetImageBytes(buffer.tobytes(), width, height, bytes_per_pixel, buffer.strides[0])
+            return api.GetUTF8Text().strip()
+        finally:
+            _return_api(config, lang, api)
+
+    import pytesseract
+    return pytesseract.image_to_string(buffer, lang=lang, config=config).strip()
@@ -0,0 +1,297 @@
+# batch_process.py
+# Parallel batch entry point: processes a directory or glob of pages
+# across a process pool, one resident extractor per worker. Pages of PDFs
+# and multi-page TIFFs are fanned out to the workers individually.
+#
+# Usage:
+#   python batch_process.py "../sample_input/combined_log_images/*.jpg" --pipeline improved --output batch_output
+#   python batch_process.py "uploads/*.pdf" --pipeline fixed --dpi 200 --max-pages-per-document 2
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from page_executor import PageExecutor
+from page_source import DEFAULT_DPI, DOCUMENT_EXTENSIONS, iter_pages, page_count
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp')
+INPUT_EXTENSIONS = IMAGE_EXTENSIONS + DOCUMENT_EXTENSIONS
+PIPELINES = ('generic', 'fixed', 'improved')
+
+# Per-worker state, created once by the pool initializer
+_worker = {}
+
+
+def collect_inputs(source: str) -> List[str]:
+    """Expand a directory or glob pattern into a sorted list of page images and documents."""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(INPUT_EXTENSIONS))
+
+
+def create_extractor(pipeline: str, reuse_alignment: bool = False, visualize: str = 'off'):
+    """Import the pipeline module and build its extractor (done once per worker)."""
+    if pipeline == 'generic':
+        from generic_doc_segmentataion import DocumentSegmentationSystem
+        return DocumentSegmentationSystem()
+    if pipeline == 'fixed':
+        from fixed_template_segmentation import DocumentSectionExtractor
+        return DocumentSectionExtractor(reuse_alignment=reuse_alignment, visualize=visualize)
+    if pipeline == 'improved':
+        from improved_extraction import ImprovedDocumentExtractor
+        return ImprovedDocumentExtractor(use_original_dimensions=True, visualize=visualize)
+    raise ValueError(f"Unknown pipeline '{pipeline}', expected one of {PIPELINES}")
+
+
+def wait_for_renders():
+    """Wait for this worker's overlay render processes, if visualization is on."""
+    if _worker.get('visualize', 'off') != 'off':
+        from visualization import wait_for_pending
+        wait_for_pending()
+
+
+def init_worker(pipeline: str, verbose: bool, reuse_alignment: bool = False, visualize: str = 'off'):
+    """Pool initializer: cv2, pytesseract and the extractor are loaded once per process."""
+    _worker['pipeline'] = pipeline
+    _worker['verbose'] = verbose
+    _worker['visualize'] = visualize
+    with quiet_unless(verbose):
+        _worker['extractor'] = create_extractor(pipeline, reuse_alignment, visualize)
+
+
+@contextlib.contextmanager
+def quiet_unless(verbose: bool):
+    """Silence the extractors' per-step console output in worker processes."""
+    if verbose:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def capture_source(input_path: str) -> str:
+    """
+    Alignment reuse scope of an input: pages of a document share the
+    document, page images share their directory (one capture session).
+    """
+    path = os.path.abspath(input_path)
+    return path if path.lower().endswith(DOCUMENT_EXTENSIONS) else os.path.dirname(path)
+
+
+def process_page(input_path: str, output_dir: str, image: Optional[np.ndarray] = None,
+                 page: Optional[int] = None) -> Dict:
+    """
+    Run the worker's extractor on one page and return a compact, JSON-safe summary.
+
+    image is an already decoded page of a multi-page document; page is its
+    1-based number.
+    """
+    pipeline = _worker['pipeline']
+    extractor = _worker['extractor']
+    start = time.perf_counter()
+    alignment_reused = None
+
+    try:
+        with quiet_unless(_worker['verbose']):
+            if pipeline == 'generic':
+                # Streams each section to disk as it is OCR'd
+                sections = extractor.process_document(input_path, output_dir=output_dir, image=image)['total_sections']
+            elif pipeline == 'fixed':
+                results = extractor.process_document(input_path, output_dir, image=image,
+                                                     capture_source=capture_source(input_path))
+                sections = results['total_sections']
+                if results['alignment_cache'] is not None:
+                    alignment_reused = results['alignment_reused']
+            else:
+                sections = extractor.process_document(input_path, output_dir, image=image)['sections_extracted']
+            
+            # Overlays render in their own process; at most one per worker at a time
+            wait_for_renders()
+
+        return {
+            'input': input_path,
+            'page': page,
+            'output_dir': output_dir,
+            'status': 'success',
+            'sections': sections,
+            'alignment_reused': alignment_reused,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+    except Exception as e:
+        return {
+            'input': input_path,
+            'page': page,
+            'output_dir': output_dir,
+            'status': 'error',
+            'message': str(e),
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+
+def output_name(input_path: str) -> str:
+    """
+    Output directory name for an input file: its stem and a short hash of its
+    absolute path, so a.jpg and a.png, or same-named files from different
+    directories, never share a directory.
+    """
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    digest = hashlib.sha1(os.path.abspath(input_path).encode('utf-8')).hexdigest()[:8]
+    return f"{stem}_{digest}"
+
+
+def process_input_page(input_path: str, page: int, output_root: str, dpi: int = DEFAULT_DPI) -> Dict:
+    """
+    Process one page of an input file: a page image (page 0), or one page of
+    a PDF / multi-page TIFF, rasterized in this worker.
+
+    Outputs go to <output_root>/<output_name>/, and pages of multi-page
+    documents to <output_root>/<output_name>_p0001/ etc.
+    """
+    name = output_name(input_path)
+    if not input_path.lower().endswith(DOCUMENT_EXTENSIONS):
+        return process_page(input_path, os.path.join(output_root, name))
+
+    try:
+        document_page = next(iter_pages(input_path, dpi=dpi, prefetch=0, first=page, last=page + 1))
+    except Exception as e:
+        # The document could not be opened or the page failed to rasterize
+        return {'input': input_path, 'page': page + 1, 'status': 'error', 'message': str(e), 'seconds': 0.0}
+    if document_page.count > 1:
+        name = f"{name}_p{page + 1:04d}"
+    return process_page(input_path, os.path.join(output_root, name), document_page.image, page + 1)
+
+
+def count_input_pages(input_path: str) -> int:
+    """Pages to schedule for an input file (1 for images and unreadable documents)."""
+    if not input_path.lower().endswith(DOCUMENT_EXTENSIONS):
+        return 1
+    try:
+        return page_count(input_path)
+    except Exception:
+        # Scheduled as a single page; the worker reports the error
+        return 1
+
+
+def run_batch(inputs: List[str], pipeline: str, output_root: str, workers: int, verbose: bool = False,
+              reuse_alignment: bool = False, visualize: str = 'off', dpi: int = DEFAULT_DPI,
+              max_pages_per_document: Optional[int] = None) -> Dict:
+    """
+    Process all pages of all inputs in a process pool and write a consolidated summary.
+
+    Pages of PDFs and multi-page TIFFs are fanned out to the workers
+    individually, round-robin across documents; max_pages_per_document caps
+    how many pages of one document are in flight, so a large upload cannot
+    occupy every worker. Results are collected in input and page order.
+
+    Each page's outputs go to <output_root>/<output_name>[_p0001]/ (see
+    process_input_page); the combined summary, which records every page's
+    output_dir, is written to <output_root>/batch_summary.json.
+    """
+    os.makedirs(output_root, exist_ok=True)
+    start = time.perf_counter()
+    documents = [(path, count_input_pages(path)) for path in inputs]
+    total = sum(count for _, count in documents)
+    workers = max(1, min(workers, total))
+    results = {path: [] for path in inputs}
+
+    def failed_page(input_path: str, page: int, error: Exception) -> Dict:
+        # e.g. a worker killed by the OS; the remaining pages still get reported
+        return {'input': input_path, 'page': page + 1, 'status': 'error', 'message': str(error), 'seconds': 0.0}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(pipeline, verbose, reuse_alignment, visualize)) as pool:
+        executor = PageExecutor(pool, partial(process_input_page, output_root=output_root, dpi=dpi),
+                                max_in_flight=workers, max_per_document=max_pages_per_document,
+                                on_error=failed_page)
+        for done, (path, page, result) in enumerate(executor.map(documents), 1):
+            results[path].append(result)
+            status = "✓" if result['status'] == 'success' else "❌"
+            page_note = f" p{page + 1}" if result.get('page') else ""
+            print(f"  {status} [{done}/{total}] {os.path.basename(path)}{page_note} ({result['seconds']:.1f}s)")
+
+    elapsed = time.perf_counter() - start
+    pages = [page for path in inputs for page in results[path]]
+    succeeded = sum(1 for page in pages if page['status'] == 'success')
+    reuse_checked = [page['alignment_reused'] for page in pages if page.get('alignment_reused') is not None]
+
+    summary = {
+        'pipeline': pipeline,
+        'workers': workers,
+        'max_pages_per_document': max_pages_per_document,
+        'total_pages': len(pages),
+        'succeeded': succeeded,
+        'failed': len(pages) - succeeded,
+        'elapsed_seconds': round(elapsed, 2),
+        'pages_per_minute': round(len(pages) / elapsed * 60, 2) if elapsed > 0 else None,
+        'alignment_hit_rate': round(sum(reuse_checked) / len(reuse_checked), 3) if reuse_checked else None,
+        'pages': pages
+    }
+
+    summary_path = os.path.join(output_root, 'batch_summary.json')
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+    return summary
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-process a directory or glob of log sheet images and PDFs")
+    parser.add_argument("source", help="Directory or glob pattern, e.g. '../sample_input/combined_log_images/*.jpg'")
+    parser.add_argument("--pipeline", choices=PIPELINES, default='improved')
+    parser.add_argument("--output", default="batch_output", help="Directory for per-page outputs and the summary")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--verbose", action="store_true", help="Show the extractors' per-page output")
+    parser.add_argument("--reuse-alignment", action="store_true",
+                        help="Fixed pipeline: reuse the alignment of the worker's previous page from the same "
+                             "document or image directory when the sheet has not moved (fixed-mount capture)")
+    parser.add_argument("--visualize", choices=('off', 'process'), default='off',
+                        help="Fixed/improved pipelines: render section overlays in separate processes")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="Rasterization resolution for PDF pages")
+    parser.add_argument("--max-pages-per-document", type=positive_int, default=None,
+                        help="Pages of one PDF/TIFF processed at the same time (default: no limit; documents "
+                             "are always interleaved page by page)")
+    args = parser.parse_args()
+
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        print(f"❌ No images found for: {args.source}")
+        sys.exit(1)
+
+    print(f"🚀 Processing {len(inputs)} files with the '{args.pipeline}' pipeline on up to {args.workers} workers")
+
+    summary = run_batch(inputs, args.pipeline, args.output, args.workers, args.verbose, args.reuse_alignment,
+                        args.visualize, args.dpi, args.max_pages_per_document)
+
+    print("=" * 60)
+    print(f"✅ {summary['succeeded']}/{summary['total_pages']} pages processed in {summary['elapsed_seconds']}s "
+          f"({summary['pages_per_minute']} pages/minute)")
+    if summary['alignment_hit_rate'] is not None:
+        print(f"♻️ Alignment reuse hit rate: {summary['alignment_hit_rate']:.0%}")
+    print(f"📁 Summary: {os.path.join(args.output, 'batch_summary.json')}")
+
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench_alignment.py
+# Boundary detection time and corner agreement: full resolution vs downscaled + cornerSubPix
+#
+# Usage: python benchmarks/bench_alignment.py ["../sample_input/combined_log_images/*.jpg"] [--pipeline improved]
+
+import argparse
+import contextlib
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from document_alignment import DETECTION_MAX_SIDE
+
+
+def create_extractor(pipeline: str, detection_max_side):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if pipeline == 'fixed':
+            from fixed_template_segmentation import DocumentSectionExtractor
+            return DocumentSectionExtractor(detection_max_side=detection_max_side)
+        from improved_extraction import ImprovedDocumentExtractor
+        return ImprovedDocumentExtractor(detection_max_side=detection_max_side)
+
+
+def detect(extractor, image):
+    method = getattr(extractor, 'detect_document_boundary_improved', None) or extractor.detect_document_boundary
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        corners = method(image)
+        return corners, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-resolution and downscaled boundary detection")
+    parser.add_argument("pattern", nargs="?", default="../sample_input/combined_log_images/*.jpg")
+    parser.add_argument("--pipeline", choices=('fixed', 'improved'), default='improved')
+    parser.add_argument("--max-side", type=int, default=DETECTION_MAX_SIDE)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.pattern))[:args.limit]
+    if not paths:
+        print(f"❌ No images found for: {args.pattern}")
+        sys.exit(1)
+
+    full = create_extractor(args.pipeline, None)
+    fast = create_extractor(args.pipeline, args.max_side)
+
+    print(f"\n📊 BOUNDARY DETECTION ({args.pipeline}, downscaled to {args.max_side}px)")
+    print("=" * 72)
+    print(f"{'image':<12} {'size':>11} {'full (s)':>10} {'fast (s)':>10} {'speedup':>9} {'max corner diff':>16}")
+    print("-" * 72)
+
+    totals = [0.0, 0.0]
+    for path in paths:
+        image = cv2.imread(path)
+        reference, full_seconds = detect(full, image)
+        corners, fast_seconds = detect(fast, image)
+        diff = float(np.abs(reference - corners).max())
+        totals[0] += full_seconds
+        totals[1] += fast_seconds
+
+        h, w = image.shape[:2]
+        print(f"{os.path.basename(path):<12} {f'{w}x{h}':>11} {full_seconds:>10.3f} {fast_seconds:>10.3f} "
+              f"{full_seconds / fast_seconds:>8.1f}x {diff:>14.1f}px")
+
+    print("-" * 72)
+    print(f"{'total':<12} {'':>11} {totals[0]:>10.3f} {totals[1]:>10.3f} {totals[0] / totals[1]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
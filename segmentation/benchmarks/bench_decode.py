@@ -0,0 +1,129 @@
+# bench_decode.py
+# Per-page decode time and peak RSS of segment.py's image handling: one
+# full-resolution decode vs a reduced decode for detection plus full-resolution
+# crops on demand. The detector itself is left out; a fixed table-sized box
+# stands in for its output. Each mode runs in a fresh process so peak RSS is
+# measured separately.
+#
+# Usage: python benchmarks/bench_decode.py ["../sample_input/combined_log_images/*.jpg"]
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_source import REDUCED_MIN_SIDE, DualResolutionImage
+
+# Stand-in detection: the main table of a log sheet, as (x1, y1, x2, y2) page ratios
+TABLE_BOX = (0.05, 0.15, 0.95, 0.85)
+
+
+def draw_preview(image, boxes, output_path):
+    """The same work as segment.draw_segmentation_preview: RGB copy, PIL boxes, JPEG q90."""
+    from PIL import Image, ImageDraw
+    pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(pil_image)
+    for box in boxes:
+        draw.rectangle([(box[0], box[1]), (box[2], box[3])], outline=(0, 0, 255), width=3)
+    pil_image.save(output_path, "JPEG", quality=90)
+
+
+def run_full(path: str, output_dir: str) -> dict:
+    start = time.perf_counter()
+    image = cv2.imread(path)
+    decode = time.perf_counter() - start
+
+    h, w = image.shape[:2]
+    box = [int(TABLE_BOX[0] * w), int(TABLE_BOX[1] * h), int(TABLE_BOX[2] * w), int(TABLE_BOX[3] * h)]
+    draw_preview(image, [box], os.path.join(output_dir, 'preview_full.jpg'))
+    cv2.imwrite(os.path.join(output_dir, 'table_full.jpg'), image[box[1]:box[3], box[0]:box[2]])
+    return {'decode_ms': decode * 1000, 'total_ms': (time.perf_counter() - start) * 1000}
+
+
+def run_dual(path: str, output_dir: str) -> dict:
+    start = time.perf_counter()
+    page = DualResolutionImage(path)
+    reduced = page.reduced
+    decode = time.perf_counter() - start
+
+    h, w = reduced.shape[:2]
+    box = [TABLE_BOX[0] * w, TABLE_BOX[1] * h, TABLE_BOX[2] * w, TABLE_BOX[3] * h]
+    draw_preview(reduced, [[int(v) for v in box]], os.path.join(output_dir, 'preview_dual.jpg'))
+
+    full_start = time.perf_counter()
+    crop = page.crop(*page.to_full(box))
+    decode += time.perf_counter() - full_start
+    cv2.imwrite(os.path.join(output_dir, 'table_dual.jpg'), crop)
+    return {'decode_ms': decode * 1000, 'detection_decode_ms': (full_start - start) * 1000,
+            'total_ms': (time.perf_counter() - start) * 1000, 'factor': page.factor}
+
+
+def warm_up():
+    """Pay one-off costs (PIL import, cv2 codec initialization) before timing either mode."""
+    from PIL import Image
+    cv2.imdecode(cv2.imencode('.jpg', np.zeros((8, 8, 3), np.uint8))[1], cv2.IMREAD_COLOR)
+
+
+def child(mode: str, path: str, output_dir: str):
+    warm_up()
+    result = (run_full if mode == 'full' else run_dual)(path, output_dir)
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def measure(mode: str, path: str, output_dir: str) -> dict:
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, path, output_dir],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        child(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Full decode vs reduced decode with full-resolution crops on demand")
+    parser.add_argument("pattern", nargs="?", default="../sample_input/combined_log_images/*.jpg")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--output", default="bench_decode_output")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.pattern))[:args.limit]
+    if not paths:
+        print(f"❌ No images found for: {args.pattern}")
+        sys.exit(1)
+    os.makedirs(args.output, exist_ok=True)
+
+    print(f"\n📊 PAGE DECODE (reduced long side >= {REDUCED_MIN_SIDE}px)")
+    print("=" * 86)
+    print(f"{'image':<12} {'factor':>6} {'full decode':>12} {'detect decode':>14} {'dual decode':>12} "
+          f"{'full RSS':>9} {'dual RSS':>9}")
+    print("-" * 86)
+
+    totals = {'full': [0.0, 0.0], 'dual': [0.0, 0.0]}
+    for path in paths:
+        full = measure('full', path, args.output)
+        dual = measure('dual', path, args.output)
+        for mode, result in (('full', full), ('dual', dual)):
+            totals[mode][0] += result['total_ms']
+            totals[mode][1] = max(totals[mode][1], result['peak_rss_mb'])
+        print(f"{os.path.basename(path)[:12]:<12} {dual['factor']:>6} {full['decode_ms']:>10.1f}ms "
+              f"{dual['detection_decode_ms']:>12.1f}ms {dual['decode_ms']:>10.1f}ms "
+              f"{full['peak_rss_mb']:>7.0f}MB {dual['peak_rss_mb']:>7.0f}MB")
+
+    print("-" * 86)
+    print(f"Page time (decode + preview + table crop): full {totals['full'][0] / len(paths):.0f} ms, "
+          f"dual {totals['dual'][0] / len(paths):.0f} ms per page")
+    print(f"Peak RSS: full {totals['full'][1]:.0f} MB, dual {totals['dual'][1]:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
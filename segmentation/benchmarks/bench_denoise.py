@@ -0,0 +1,67 @@
+# bench_denoise.py
+# Per-mode timing and OCR-agreement report for the denoise modes
+#
+# Usage: python benchmarks/bench_denoise.py [--image ../sample_input/doc1.jpg] [--output denoise_report.json]
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import pytesseract
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from array_ocr import ocr_array
+from denoise import DENOISE_MODES, compare_denoise_modes
+from improved_extraction import ImprovedDocumentExtractor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare denoise modes on a sample sheet")
+    parser.add_argument("--image", default="../sample_input/doc1.jpg")
+    parser.add_argument("--baseline", default="nlmeans", choices=DENOISE_MODES)
+    parser.add_argument("--output", default=None, help="Optional path for a JSON copy of the report")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    if image is None:
+        print(f"❌ Could not load image: {args.image}")
+        sys.exit(1)
+
+    # Section regions come from the improved template on the aligned page
+    extractor = ImprovedDocumentExtractor(use_original_dimensions=True, denoise_mode='none')
+    aligned, _ = extractor.align_document(image)
+    bboxes = [section['bbox'] for section in extractor.extract_sections_accurate(aligned)]
+    gray = cv2.cvtColor(aligned, cv2.COLOR_BGR2GRAY)
+
+    try:
+        pytesseract.get_tesseract_version()
+        ocr_available = True
+    except Exception:
+        ocr_available = False
+        print("⚠️ Tesseract not available - reporting timings only")
+
+    def ocr_fn(crop):
+        return ocr_array(crop, config='--psm 6') if ocr_available else ""
+
+    report = compare_denoise_modes(gray, bboxes, ocr_fn, baseline=args.baseline)
+
+    h, w = gray.shape[:2]
+    print(f"\n📊 DENOISE REPORT ({w}x{h} page, {len(bboxes)} OCR regions, baseline={args.baseline})")
+    print("=" * 64)
+    print(f"{'mode':<20} {'page (s)':>10} {'regions (s)':>12} {'OCR agreement':>15}")
+    print("-" * 64)
+    for entry in report:
+        agreement = entry['ocr_agreement'] if ocr_available and entry['ocr_agreement'] is not None else '-'
+        print(f"{entry['mode']:<20} {entry['page_seconds']:>10.3f} {entry['regions_seconds']:>12.3f} {agreement:>15}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'image': args.image, 'baseline': args.baseline,
+                       'ocr_available': ocr_available, 'modes': report}, f, indent=2)
+        print(f"\n✓ Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_encode.py
+# Encode time vs bytes on disk for the crop encodings of crop_encoding.py,
+# on the crops one export writes: the table segment (segment.py), its
+# column crops and their row crops (workflow.py). The columns and rows are
+# a fixed grid over the table box standing in for the detectors' output.
+# Decode time is reported too, since workflow.py reads the column crops back
+# and OCR reads every row crop.
+#
+# Usage: python benchmarks/bench_encode.py ["../sample_input/combined_log_images/*.jpg"] [--encodings png,png:6,raw]
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crop_encoding import parse_encoding
+
+DEFAULT_ENCODINGS = 'png,png:1,png:3,png:6,png:9,jpeg,jpeg:90,webp,webp:90,raw'
+
+# Stand-in detections: table box as page ratios, then an even column x row grid
+TABLE_BOX = (0.05, 0.15, 0.95, 0.85)
+COLUMNS = 33
+ROWS = 24
+
+
+def export_crops(page: np.ndarray) -> Dict[str, List[np.ndarray]]:
+    """The table crop, its column crops and their row crops."""
+    h, w = page.shape[:2]
+    table = page[int(TABLE_BOX[1] * h):int(TABLE_BOX[3] * h), int(TABLE_BOX[0] * w):int(TABLE_BOX[2] * w)]
+    th, tw = table.shape[:2]
+    columns = [np.ascontiguousarray(table[:, tw * c // COLUMNS:tw * (c + 1) // COLUMNS]) for c in range(COLUMNS)]
+    rows = [np.ascontiguousarray(column[th * r // ROWS:th * (r + 1) // ROWS]) for column in columns
+            for r in range(ROWS)]
+    return {'segment': [np.ascontiguousarray(table)], 'columns': columns, 'rows': rows}
+
+
+def measure(encoding, crops: List[np.ndarray]) -> Dict[str, float]:
+    """Total encode ms, bytes and decode ms over crops (best of 2 passes for the timings)."""
+    encode_s = decode_s = float('inf')
+    for _ in range(2):
+        start = time.perf_counter()
+        buffers = [encoding.encode(crop) for crop in crops]
+        encode_s = min(encode_s, time.perf_counter() - start)
+        start = time.perf_counter()
+        for buffer in buffers:
+            cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+        decode_s = min(decode_s, time.perf_counter() - start)
+    return {'encode_ms': encode_s * 1000, 'bytes': sum(len(b) for b in buffers), 'decode_ms': decode_s * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop encoding: encode time vs bytes on disk")
+    parser.add_argument("pattern", nargs="?", default="../sample_input/combined_log_images/*.jpg")
+    parser.add_argument("--encodings", default=DEFAULT_ENCODINGS, help="Comma-separated crop encodings")
+    parser.add_argument("--limit", type=int, default=1)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.pattern))[:args.limit]
+    if not paths:
+        print(f"❌ No images found for: {args.pattern}")
+        sys.exit(1)
+    encodings = [parse_encoding(spec) for spec in args.encodings.split(',')]
+
+    pages = [export_crops(cv2.imread(path)) for path in paths]
+    kinds = list(pages[0])
+    print(f"\n📊 CROP ENCODING ({len(paths)} sheets; per sheet: 1 segment, {COLUMNS} columns, "
+          f"{COLUMNS * ROWS} rows)")
+    print("=" * 92)
+    print(f"{'encoding':<10} {'lossless':>8} " + " ".join(f"{kind + ' ms':>11} {kind + ' MB':>11}" for kind in kinds)
+          + f" {'decode ms':>10}")
+    print("-" * 92)
+
+    for encoding in encodings:
+        totals = {kind: {'encode_ms': 0.0, 'bytes': 0, 'decode_ms': 0.0} for kind in kinds}
+        for crops in pages:
+            for kind in kinds:
+                for key, value in measure(encoding, crops[kind]).items():
+                    totals[kind][key] += value
+        n = len(pages)
+        decode = sum(t['decode_ms'] for t in totals.values()) / n
+        print(f"{str(encoding):<10} {'yes' if encoding.lossless else 'no':>8} "
+              + " ".join(f"{t['encode_ms'] / n:>11.1f} {t['bytes'] / n / 1e6:>11.2f}" for t in totals.values())
+              + f" {decode:>10.1f}")
+
+    print("-" * 92)
+    print("Times and sizes are per sheet; decode is the read-back of all three crop kinds.")
+
+
+if __name__ == "__main__":
+    main()
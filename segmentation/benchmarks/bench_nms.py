@@ -0,0 +1,102 @@
+# bench_nms.py
+# Benchmark of vectorized NMS against the original pairwise remove_overlapping_sections loop
+#
+# Usage: python benchmarks/bench_nms.py [--sizes 1000 5000 20000 50000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from box_ops import nms_keep_indices
+
+
+def legacy_keep_indices(boxes, scores, overlap_threshold=0.5):
+    """The original O(n^2) pairwise loop, kept as the reference implementation."""
+    def calculate_iou(box1, box2):
+        x1, y1, w1, h1 = box1
+        x2, y2, w2, h2 = box2
+
+        left = max(x1, x2)
+        top = max(y1, y2)
+        right = min(x1 + w1, x2 + w2)
+        bottom = min(y1 + h1, y2 + h2)
+
+        if left < right and top < bottom:
+            intersection = (right - left) * (bottom - top)
+            union = w1 * h1 + w2 * h2 - intersection
+            return intersection / union if union > 0 else 0
+        return 0
+
+    order = sorted(range(len(boxes)), key=lambda i: scores[i], reverse=True)
+    kept = []
+    for i in order:
+        if all(calculate_iou(boxes[i], boxes[k]) <= overlap_threshold for k in kept):
+            kept.append(i)
+    return kept
+
+
+def synthetic_boxes(n, page_width=3500, page_height=2500, seed=0):
+    """
+    Synthetic dense handwritten-page layout: mostly small word-sized boxes,
+    clustered duplicates (as produced by the three detectors) and a few large
+    table-sized boxes. Scores use the detectors' discrete confidence levels.
+    """
+    rng = np.random.default_rng(seed)
+    n_base = max(n // 3, 1)
+
+    x = rng.integers(0, page_width - 200, n_base)
+    y = rng.integers(0, page_height - 100, n_base)
+    w = rng.integers(20, 200, n_base)
+    h = rng.integers(10, 80, n_base)
+    base = np.stack([x, y, w, h], axis=1)
+
+    # Jittered copies of existing boxes so that suppression actually happens
+    dup_idx = rng.integers(0, n_base, n - n_base)
+    jitter = rng.integers(-6, 7, (n - n_base, 4))
+    dups = np.clip(base[dup_idx] + jitter, 1, None)
+
+    boxes = np.concatenate([base, dups])
+    n_tables = max(n // 1000, 1)
+    boxes[:n_tables] = [[50, 150, 3000, 1500]] * n_tables
+
+    scores = rng.choice([0.6, 0.7, 0.8, 0.9], size=n)
+    return boxes, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized NMS")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1000, 5000, 10000, 20000, 50000])
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--legacy-limit", type=int, default=5000,
+                        help="Largest size to also run (and cross-check) the original loop on")
+    args = parser.parse_args()
+
+    print(f"{'boxes':>8} {'kept':>8} {'vectorized (s)':>15} {'legacy (s)':>12} {'speedup':>9} {'same keep':>10}")
+    print("-" * 68)
+
+    for n in args.sizes:
+        boxes, scores = synthetic_boxes(n)
+
+        start = time.perf_counter()
+        keep = nms_keep_indices(boxes, scores, args.threshold)
+        vectorized_time = time.perf_counter() - start
+
+        legacy_time, same = None, None
+        if n <= args.legacy_limit:
+            start = time.perf_counter()
+            legacy_keep = legacy_keep_indices(boxes.tolist(), scores.tolist(), args.threshold)
+            legacy_time = time.perf_counter() - start
+            same = list(keep) == legacy_keep
+
+        legacy_col = f"{legacy_time:12.3f}" if legacy_time is not None else f"{'-':>12}"
+        speedup_col = f"{legacy_time / vectorized_time:8.1f}x" if legacy_time is not None else f"{'-':>9}"
+        same_col = str(same) if same is not None else '-'
+        print(f"{n:8d} {len(keep):8d} {vectorized_time:15.3f} {legacy_col} {speedup_col} {same_col:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# bench_startup.py
+# Cold-start budget for the Segmentation Studio entry points: every backend
+# request launches a fresh interpreter, so import time and time to first
+# inference are paid per upload. Exits non-zero when a budget is exceeded.
+#
+# Usage: python benchmarks/bench_startup.py [--image page.jpg --segment-model model.pt --workflow-models models/]
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+STUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Segmentation_Studio')
+ENTRY_POINTS = ('segment', 'workflow')
+
+# Modules that must stay out of the import path of an entry point
+HEAVY_MODULES = ('ultralytics', 'torch', 'pandas', 'openpyxl', 'PIL', 'pytesseract', 'matplotlib', 'pypdfium2')
+
+# Run the entry point's own model loader on one image, as the first request would
+INFERENCE_SNIPPET = """
+import sys
+sys.path.insert(0, {studio!r})
+import {module} as entry
+model = entry.load_model({model!r})
+model({image!r}, verbose=False)
+"""
+
+
+def run_python(args: List[str]) -> Tuple[float, str]:
+    """Run a fresh interpreter and return (wall time in ms, stderr)."""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable] + args, cwd=STUDIO_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                           f"exit code {completed.returncode}")
+    return elapsed, completed.stderr
+
+
+def import_snippet(module: str) -> str:
+    return f"import sys; sys.path.insert(0, {STUDIO_DIR!r}); import {module}"
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse `python -X importtime` output into {module: (cumulative us, depth)}.
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports[name.strip()] = (int(cumulative), depth)
+    return imports
+
+
+def measure_import(module: str, repeat: int) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Best-of-repeat wall time of `import module` in a fresh interpreter, plus its import tree."""
+    wall = min(run_python(['-c', import_snippet(module)])[0] for _ in range(repeat))
+    _, stderr = run_python(['-X', 'importtime', '-c', import_snippet(module)])
+    return wall, parse_importtime(stderr)
+
+
+def measure_first_inference(module: str, model: str, image: str) -> float:
+    """Wall time from interpreter start to the end of the first model call."""
+    snippet = INFERENCE_SNIPPET.format(studio=STUDIO_DIR, module=module, model=model, image=image)
+    return run_python(['-c', snippet])[0]
+
+
+def heaviest_imports(imports: Dict[str, Tuple[int, int]], module: str, top: int) -> List[Tuple[str, int]]:
+    """The slowest direct imports of the entry point module."""
+    _, module_depth = imports.get(module, (0, 0))
+    children = [(name, us) for name, (us, depth) in imports.items()
+                if depth == module_depth + 1 and name != module]
+    return sorted(children, key=lambda item: -item[1])[:top]
+
+
+def model_for(module: str, args) -> Optional[str]:
+    if module == 'segment':
+        return args.segment_model
+    if args.workflow_models:
+        return os.path.join(args.workflow_models, 'column_detect.pt')
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and first-inference budget for segment.py and workflow.py")
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0)
+    parser.add_argument("--inference-budget-ms", type=float, default=15000.0)
+    parser.add_argument("--image", help="page image for the first-inference measurement")
+    parser.add_argument("--segment-model", help="layout model (.pt) used by segment.py")
+    parser.add_argument("--workflow-models", help="models directory used by workflow.py (column_detect.pt)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"\n📊 STARTUP (import budget {args.import_budget_ms:.0f} ms, "
+          f"first-inference budget {args.inference_budget_ms:.0f} ms)")
+    print("=" * 72)
+
+    for module in ENTRY_POINTS:
+        try:
+            wall, imports = measure_import(module, args.repeat)
+        except RuntimeError as e:
+            print(f"❌ {module}.py: import failed: {e}")
+            failures.append(f"{module}: import failed")
+            continue
+
+        own_us = imports.get(module, (0, 0))[0]
+        print(f"\n{module}.py")
+        print(f"  import wall time:   {wall:8.1f} ms (interpreter start included)")
+        print(f"  import cumulative:  {own_us / 1000:8.1f} ms (-X importtime)")
+        for name, us in heaviest_imports(imports, module, args.top):
+            print(f"    {name:<28} {us / 1000:8.1f} ms")
+
+        if wall > args.import_budget_ms:
+            failures.append(f"{module}: import {wall:.0f} ms > {args.import_budget_ms:.0f} ms")
+        eager = [name for name in HEAVY_MODULES if name in imports]
+        if eager:
+            failures.append(f"{module}: imports {', '.join(eager)} at startup")
+
+        model = model_for(module, args)
+        if not (model and args.image):
+            print("  first inference:    skipped (pass --image and a model)")
+            continue
+        try:
+            first = measure_first_inference(module, model, args.image)
+        except RuntimeError as e:
+            print(f"  ❌ first inference failed: {e}")
+            failures.append(f"{module}: first inference failed")
+            continue
+        print(f"  first inference:    {first:8.1f} ms")
+        if first > args.inference_budget_ms:
+            failures.append(f"{module}: first inference {first:.0f} ms > {args.inference_budget_ms:.0f} ms")
+
+    print("\n" + "=" * 72)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ All entry points within budget")
+
+
+if __name__ == "__main__":
+    main()
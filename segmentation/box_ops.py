@@ -0,0 +1,141 @@
+# box_ops.py
+# Vectorized bounding-box operations for the segmentation pipelines
+
+import numpy as np
+
+
+def xywh_to_xyxy(boxes) -> np.ndarray:
+    """Convert an (n, 4) array-like of (x, y, w, h) boxes to float64 (x1, y1, x2, y2)."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    xyxy = boxes.copy()
+    xyxy[:, 2] += xyxy[:, 0]
+    xyxy[:, 3] += xyxy[:, 1]
+    return xyxy
+
+
+def overlapping_pairs(xyxy: np.ndarray, threshold: float, chunk_size: int = 64,
+                      max_block_elements: int = 4_000_000) -> np.ndarray:
+    """
+    Find all box pairs whose IoU is above threshold (threshold >= 0).
+
+    The page is cut into horizontal bands and every box is listed in each band
+    it spans. Within a band, boxes are sorted by x1 so that only the following
+    boxes that start before a box's right edge can intersect it. IoU blocks are
+    computed over that window only, in chunks kept under max_block_elements,
+    so the work tracks the number of nearby boxes rather than n^2.
+
+    A pair is reported from the one band holding the top of its intersection,
+    so each pair is listed exactly once.
+
+    Returns:
+        (k, 2) int array of index pairs into xyxy.
+    """
+    n = len(xyxy)
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    heights = xyxy[:, 3] - xyxy[:, 1]
+    band_height = max(float(np.median(heights)) * 2, 1.0)
+
+    # Expand every box into one entry per band it spans
+    first_band = np.floor(xyxy[:, 1] / band_height).astype(np.int64)
+    last_band = np.maximum(np.floor(xyxy[:, 3] / band_height).astype(np.int64), first_band)
+    counts = last_band - first_band + 1
+    box_of = np.repeat(np.arange(n), counts)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    band_of = first_band[box_of] + (np.arange(len(box_of)) - offsets)
+
+    entry_order = np.lexsort((xyxy[box_of, 0], band_of))
+    box_of = box_of[entry_order]
+    band_of = band_of[entry_order]
+    boxes = xyxy[box_of]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    # Candidates for entry i are entries i+1 .. ends[i]-1: same band, starting left of its right edge
+    span = float(max(np.abs(xyxy[:, [0, 2]]).max(), 1.0)) * 2 + 1
+    band_base = (band_of - band_of[0]) * span
+    ends = np.searchsorted(band_base + boxes[:, 0], band_base + boxes[:, 2], side='left')
+
+    pairs = []
+    total = len(boxes)
+    start = 0
+    while start < total:
+        # Grow the chunk while rows x window stays within the element budget
+        window_ends = np.maximum.accumulate(ends[start:start + chunk_size])
+        rows = np.arange(1, len(window_ends) + 1)
+        fits = rows * np.maximum(window_ends - start, 1) <= max_block_elements
+        stop = start + max(int(np.count_nonzero(fits)), 1)
+        end = int(window_ends[stop - start - 1])
+
+        if end > start + 1:
+            block = boxes[start:stop]
+            cols = boxes[start:end]
+
+            inter_w = np.minimum(block[:, None, 2], cols[None, :, 2]) - np.maximum(block[:, None, 0], cols[None, :, 0])
+            inter_h = np.minimum(block[:, None, 3], cols[None, :, 3]) - np.maximum(block[:, None, 1], cols[None, :, 1])
+            intersection = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+            union = areas[start:stop, None] + areas[None, start:end] - intersection
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                iou = np.where(union > 0, intersection / union, 0.0)
+
+            block_rows, block_cols = np.nonzero(iou > threshold)
+            i = block_rows + start
+            j = block_cols + start
+            top_band = np.floor(np.maximum(boxes[i, 1], boxes[j, 1]) / band_height).astype(np.int64)
+            valid = (j > i) & (band_of[i] == band_of[j]) & (band_of[i] == top_band)
+            if valid.any():
+                pairs.append(np.stack([box_of[i[valid]], box_of[j[valid]]], axis=1))
+
+        start = stop
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(pairs)
+
+
+def nms_keep_indices(boxes_xywh, scores, threshold: float = 0.5, chunk_size: int = 64) -> np.ndarray:
+    """
+    Greedy non-maximum suppression over (x, y, w, h) boxes.
+
+    Keep semantics match the original pairwise loop: boxes are visited by
+    descending score (stable for ties) and a box is kept unless its IoU with
+    an already kept box is above threshold.
+
+    Returns:
+        Indices of kept boxes, in visiting order.
+    """
+    xyxy = xywh_to_xyxy(boxes_xywh)
+    n = len(xyxy)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    scores = np.asarray(scores, dtype=np.float64)
+    # Stable descending order, identical to list.sort(key=..., reverse=True)
+    visit_order = np.argsort(-scores, kind='stable')
+
+    if threshold < 0:
+        # Every pair, even a disjoint one, is above a negative threshold
+        return visit_order[:1]
+
+    pairs = overlapping_pairs(xyxy, threshold, chunk_size)
+    if len(pairs) == 0:
+        return visit_order
+
+    # Adjacency lists in CSR form: neighbours of box b are nbrs[starts[b]:starts[b + 1]]
+    src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    by_src = np.argsort(src, kind='stable')
+    nbrs = dst[by_src]
+    starts = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=starts[1:])
+
+    suppressed = np.zeros(n, dtype=bool)
+    keep = []
+    for idx in visit_order:
+        if suppressed[idx]:
+            continue
+        keep.append(idx)
+        suppressed[nbrs[starts[idx]:starts[idx + 1]]] = True
+
+    return np.asarray(keep, dtype=np.int64)
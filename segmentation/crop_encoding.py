@@ -0,0 +1,94 @@
+# crop_encoding.py
+# Configurable image encoding for the crops written by the Segmentation
+# Studio (segments, column and row crops): format and compression level in
+# one spec string, e.g. "png", "png:6", "jpeg:90", "webp" (lossless),
+# "webp:80" or "raw" (uncompressed BMP). See benchmarks/bench_encode.py for
+# encode time vs bytes on the sample sheets.
+
+from typing import List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+# format -> file extension; every format is readable by cv2, PIL and Tesseract
+# (Leptonica), and all but raw are compressed
+EXTENSIONS = {
+    'png': '.png',
+    'jpeg': '.jpg',
+    'webp': '.webp',
+    'raw': '.bmp',
+}
+CROP_EXTENSIONS = tuple(EXTENSIONS.values()) + ('.jpeg',)
+
+# cv2 treats WebP quality above 100 as lossless
+WEBP_LOSSLESS = 101
+
+
+class CropEncoding(NamedTuple):
+    """
+    An image format plus its level: PNG compression 0-9, JPEG/WebP quality
+    1-100. level None keeps OpenCV's default (for WebP: lossless).
+    """
+    format: str = 'png'
+    level: Optional[int] = None
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.format]
+
+    @property
+    def lossless(self) -> bool:
+        return self.format in ('png', 'raw') or (self.format == 'webp' and self.level is None)
+
+    @property
+    def params(self) -> List[int]:
+        """cv2.imwrite / cv2.imencode parameters."""
+        if self.format == 'png' and self.level is not None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.level]
+        if self.format == 'jpeg' and self.level is not None:
+            return [cv2.IMWRITE_JPEG_QUALITY, self.level]
+        if self.format == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, WEBP_LOSSLESS if self.level is None else self.level]
+        return []
+
+    def filename(self, stem: str) -> str:
+        return f"{stem}{self.extension}"
+
+    def encode(self, image: np.ndarray) -> bytes:
+        ok, buffer = cv2.imencode(self.extension, image, self.params)
+        if not ok:
+            raise ValueError(f"Could not encode image as {self}")
+        return buffer.tobytes()
+
+    def write(self, path: str, image: np.ndarray) -> bool:
+        """cv2.imwrite with this encoding; path should end in self.extension."""
+        return cv2.imwrite(str(path), image, self.params)
+
+    def __str__(self) -> str:
+        return self.format if self.level is None else f"{self.format}:{self.level}"
+
+
+def parse_encoding(spec: str) -> CropEncoding:
+    """
+    Parse "format[:level]" (e.g. "png:1", "jpeg:90", "webp", "raw").
+
+    "jpg" is accepted for "jpeg" and "bmp" for "raw".
+    """
+    if isinstance(spec, CropEncoding):
+        return spec
+    name, _, level = str(spec).strip().lower().partition(':')
+    name = {'jpg': 'jpeg', 'bmp': 'raw'}.get(name, name)
+    if name not in EXTENSIONS:
+        raise ValueError(f"Unknown crop encoding '{spec}', expected one of {sorted(EXTENSIONS)}")
+    if not level:
+        return CropEncoding(name)
+    if name == 'raw':
+        raise ValueError("The raw crop encoding takes no level")
+    try:
+        value = int(level)
+    except ValueError:
+        raise ValueError(f"Invalid level in crop encoding '{spec}'")
+    low, high = (0, 9) if name == 'png' else (1, 100)
+    if not low <= value <= high:
+        raise ValueError(f"{name} level must be between {low} and {high}, got {value}")
+    return CropEncoding(name, value)
@@ -4,11 +4,16 @@
 
 import cv2
 import numpy as np
-from PIL import Image
 import json
 import os
 from typing import List, Dict, Tuple, Optional
 import pytesseract
+from page_source import load_image
+from parallel_ocr import ocr_sections_parallel
+from section_templates import SectionTemplate, template_path as bundled_template_path
+from visualization import VISUALIZE_MODES, build_spec, submit as submit_visualization
+from document_alignment import (DETECTION_MAX_SIDE, WARP_MODES, AlignmentCache, downscale_for_detection,
+                                page_homography, refine_corners, to_full_resolution, warp_section)
 
 class DocumentSectionExtractor:
     """
@@ -20,7 +25,10 @@ class DocumentSectionExtractor:
     - Performs OCR on each section
     """
     
-    def __init__(self, standard_width: int = 1200, standard_height: int = 900):
+    def __init__(self, standard_width: int = 1200, standard_height: int = 900,
+                 detection_max_side: Optional[int] = DETECTION_MAX_SIDE, warp_mode: str = 'page',
+                 reuse_alignment: bool = False, ocr_workers: Optional[int] = None, table_bands: int = 1,
+                 template_path: Optional[str] = None, visualize: str = 'off'):
         print("🔧 Initializing Document Section Extractor...")
         
         # Setup Tesseract OCR
@@ -30,48 +38,37 @@ class DocumentSectionExtractor:
         self.standard_width = standard_width
         self.standard_height = standard_height
         
-        # Define the 9 sections using relative coordinates (0.0 to 1.0)
-        # These ratios work for any document size after alignment
-        self.sections_template = {
-            'package_info': {
-                'bbox_ratio': (0.85, 0.055, 0.15, 0.067),
-                'description': 'Package information (top right)'
-            },
-            'date_section': {
-                'bbox_ratio': (0.85, 0.128, 0.15, 0.044),
-                'description': 'Date information'
-            },
-            'main_data_table': {
-                'bbox_ratio': (0.042, 0.167, 0.916, 0.611),
-                'description': 'Main operational data table'
-            },
-            'daily_running_hours': {
-                'bbox_ratio': (0.042, 0.8, 0.317, 0.133),
-                'description': 'Daily running hours and cumulative hours'
-            },
-            'petroleum_status': {
-                'bbox_ratio': (0.042, 0.944, 0.317, 0.111),
-                'description': 'Petroleum oil lubricants daily status'
-            },
-            'pkg_trip_details': {
-                'bbox_ratio': (0.375, 0.8, 0.292, 0.089),
-                'description': 'PKG Trip & Change over details'
-            },
-            'shift_incharge': {
-                'bbox_ratio': (0.683, 0.8, 0.317, 0.089),
-                'description': 'Day/Night shift incharge'
-            },
-            'remarks_section': {
-                'bbox_ratio': (0.375, 0.9, 0.458, 0.089),
-                'description': 'Remarks section'
-            },
-            'signatures': {
-                'bbox_ratio': (0.683, 0.9, 0.317, 0.156),
-                'description': 'Signatures and approvals'
-            }
-        }
-        
-        print(f"✓ Template loaded with {len(self.sections_template)} sections")
+        # Boundary detection runs on a copy with this long edge (None = full resolution)
+        self.detection_max_side = detection_max_side
+        
+        # 'page' warps the full page (saved as aligned_document.jpg); 'sections'
+        # warps each section straight from the photo and never builds the page
+        if warp_mode not in WARP_MODES:
+            raise ValueError(f"Unknown warp mode '{warp_mode}', expected one of {WARP_MODES}")
+        self.warp_mode = warp_mode
+        
+        # For fixed-mount capture: try the previous page's corners before
+        # running boundary detection (see start_capture_session). One cache
+        # per capture source, so pages of different sources never serve as
+        # each other's previous page (see select_capture_source)
+        self.alignment_caches = {} if reuse_alignment else None
+        self.alignment_cache = AlignmentCache() if reuse_alignment else None
+        
+        # Sections are OCR'd on a thread pool (None = one thread per core); the
+        # main table can additionally be split into table_bands horizontal bands
+        self.ocr_workers = ocr_workers
+        self.table_bands = table_bands
+        
+        # Section overlay figure: 'off', or rendered 'sync', on a background
+        # 'thread', or in a separate 'process' from a bbox JSON spec
+        if visualize not in VISUALIZE_MODES:
+            raise ValueError(f"Unknown visualize mode '{visualize}', expected one of {VISUALIZE_MODES}")
+        self.visualize = visualize
+        
+        # Section layout, OCR configs and preprocessing come from a template file
+        self.template = SectionTemplate.from_file(template_path or bundled_template_path('operational_log_fixed.json'))
+        
+        print(f"✓ Template {self.template.name} loaded with {len(self.template)} sections")
     
     def setup_tesseract(self):
         """Setup Tesseract OCR path for Windows"""
@@ -95,11 +92,14 @@ class DocumentSectionExtractor:
         """
         Detect the outer boundary of the document.
         Returns the four corner points of the document boundary.
+        
+        Detection runs on a downscaled copy; the corners are then refined
+        at full resolution with cornerSubPix.
         """
         print("🔍 Detecting document boundary...")
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        # Grayscale, downscaled copy
+        gray, scale = downscale_for_detection(image, self.detection_max_side)
         
         # Apply Gaussian blur
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
@@ -118,7 +118,7 @@ class DocumentSectionExtractor:
         # Find the largest rectangular contour
         document_contour = None
         max_area = 0
-        min_area = image.shape[0] * image.shape[1] * 0.1  # At least 10% of image
+        min_area = gray.shape[0] * gray.shape[1] * 0.1  # At least 10% of image
         
         for contour in contours:
             # Approximate contour to polygon
@@ -134,7 +134,8 @@ class DocumentSectionExtractor:
         
         if document_contour is not None:
             print("✓ Document boundary detected automatically")
-            return self.order_corner_points(document_contour.reshape(4, 2))
+            corners = self.order_corner_points(to_full_resolution(document_contour.reshape(4, 2), scale))
+            return refine_corners(image, corners, scale)
         
         # Fallback: use image boundaries with margin
         print("⚠️ Auto-detection failed, using image boundaries")
@@ -163,27 +164,50 @@ class DocumentSectionExtractor:
         
         return rect
     
-    def align_and_normalize_document(self, image: np.ndarray) -> Tuple[np.ndarray, bool]:
+    def compute_alignment(self, image: np.ndarray) -> Optional[np.ndarray]:
         """
-        Detect document boundary, correct perspective, and scale to standard size.
+        Detect the document boundary and return the homography onto the
+        standard-size page, or None if no boundary was found.
         """
-        # Detect document corners
-        corners = self.detect_document_boundary(image)
+        # Reuse the previous corners if the page has not moved, else detect
+        corners = self.alignment_cache.lookup(image) if self.alignment_cache else None
+        
+        if corners is not None:
+            print(f"♻️ Reusing previous alignment (edge score {self.alignment_cache.last_score:.2f})")
+        else:
+            corners = self.detect_document_boundary(image)
+            if corners is not None and self.alignment_cache:
+                self.alignment_cache.store(corners, image)
         
         if corners is None:
             print("❌ Could not detect document boundary")
-            return image, False
+            return None
         
-        # Define destination points (standard document size)
-        dst_points = np.array([
-            [0, 0],                                      # top-left
-            [self.standard_width, 0],                    # top-right
-            [self.standard_width, self.standard_height], # bottom-right
-            [0, self.standard_height]                    # bottom-left
-        ], dtype="float32")
+        # Perspective transformation onto the standard document size
+        return page_homography(corners, self.standard_width, self.standard_height)
+    
+    def start_capture_session(self):
+        """Forget cached alignment and reset hit statistics, e.g. when the stand is moved."""
+        if self.alignment_cache:
+            self.alignment_cache.reset()
+    
+    def select_capture_source(self, source: str):
+        """
+        Switch to the alignment cache of one capture source (e.g. a document
+        or a directory of captures), for callers interleaving pages of
+        several sources.
+        """
+        if self.alignment_caches is not None:
+            self.alignment_cache = self.alignment_caches.setdefault(source, AlignmentCache())
+    
+    def align_and_normalize_document(self, image: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """
+        Detect document boundary, correct perspective, and scale to standard size.
+        """
+        transformation_matrix = self.compute_alignment(image)
         
-        # Calculate perspective transformation matrix
-        transformation_matrix = cv2.getPerspectiveTransform(corners, dst_points)
+        if transformation_matrix is None:
+            return image, False
         
         # Apply perspective transformation
         aligned_image = cv2.warpPerspective(
@@ -196,41 +220,43 @@ class DocumentSectionExtractor:
         print(f"✓ Document aligned and scaled to {self.standard_width}x{self.standard_height}")
         return aligned_image, True
     
-    def extract_sections(self, aligned_image: np.ndarray) -> List[Dict]:
+    def section_regions(self, width: int, height: int) -> List[Tuple[str, Dict, Tuple[int, int, int, int]]]:
+        """
+        Pixel bboxes of the template sections on a width x height aligned page.
+        
+        The ROIs are compiled once per page size by the template.
+        """
+        return [(section['id'], section, bbox) for section, bbox in self.template.compile(width, height)]
+    
+    def extract_sections(self, aligned_image: np.ndarray, homography: Optional[np.ndarray] = None) -> List[Dict]:
         """
         Extract all 9 sections from the aligned document using relative coordinates.
+        
+        If a homography is given, aligned_image is the unaligned photo and each
+        section is warped straight from it onto the standard-size page.
         """
         print("📋 Extracting sections using template...")
         
-        height, width = aligned_image.shape[:2]
+        if homography is None:
+            height, width = aligned_image.shape[:2]
+        else:
+            width, height = self.standard_width, self.standard_height
         extracted_sections = []
         
-        for section_name, section_info in self.sections_template.items():
-            # Convert relative coordinates to absolute pixels
-            x_ratio, y_ratio, w_ratio, h_ratio = section_info['bbox_ratio']
-            
-            x = int(x_ratio * width)
-            y = int(y_ratio * height)
-            w = int(w_ratio * width)
-            h = int(h_ratio * height)
-            
-            # Ensure coordinates are within image bounds
-            x = max(0, min(x, width - 1))
-            y = max(0, min(y, height - 1))
-            w = min(w, width - x)
-            h = min(h, height - y)
-            
+        for section_name, section_info, (x, y, w, h) in self.section_regions(width, height):
             # Extract section image
-            if w > 0 and h > 0:
+            if homography is None:
                 section_image = aligned_image[y:y+h, x:x+w]
-                
-                extracted_sections.append({
-                    'id': section_name,
-                    'description': section_info['description'],
-                    'bbox': (x, y, w, h),
-                    'image': section_image,
-                    'relative_coords': section_info['bbox_ratio']
-                })
+            else:
+                section_image = warp_section(aligned_image, homography, (x, y, w, h))
+            
+            extracted_sections.append({
+                'id': section_name,
+                'description': section_info['description'],
+                'bbox': (x, y, w, h),
+                'image': section_image,
+                'relative_coords': section_info['bbox_ratio']
+            })
         
         print(f"✓ Extracted {len(extracted_sections)} sections")
         return extracted_sections
@@ -241,56 +267,52 @@ class DocumentSectionExtractor:
         """
         print("🔍 Performing OCR on extracted sections...")
         
-        for i, section in enumerate(sections):
-            print(f"  Processing {section['id']} ({i+1}/{len(sections)})...")
+        # Submit all sections (and table bands) at once; results come back in template order
+        jobs = [
+            (section['image'], self.get_ocr_config(section['id']), self.get_ocr_bands(section['id']))
+            for section in sections
+        ]
+        results = ocr_sections_parallel(jobs, max_workers=self.ocr_workers)
+        
+        for i, (section, text) in enumerate(zip(sections, results)):
+            print(f"  Processed {section['id']} ({i+1}/{len(sections)})")
             
-            try:
-                # Convert image for OCR
-                section_img = section['image']
-                if len(section_img.shape) == 3:
-                    section_img = cv2.cvtColor(section_img, cv2.COLOR_BGR2RGB)
-                
-                pil_image = Image.fromarray(section_img)
-                
-                # Perform OCR with appropriate settings
-                ocr_config = self.get_ocr_config(section['id'])
-                text = pytesseract.image_to_string(pil_image, config=ocr_config)
-                
-                # Store results
-                section['ocr_text'] = text.strip()
-                section['ocr_length'] = len(section['ocr_text'])
-                section['has_text'] = section['ocr_length'] > 0
-                
-            except Exception as e:
-                print(f"    ⚠️ OCR failed for {section['id']}: {e}")
+            if isinstance(text, Exception):
+                print(f"    ⚠️ OCR failed for {section['id']}: {text}")
                 section['ocr_text'] = ""
                 section['ocr_length'] = 0
                 section['has_text'] = False
+                continue
+            
+            # Store results
+            section['ocr_text'] = text.strip()
+            section['ocr_length'] = len(section['ocr_text'])
+            section['has_text'] = section['ocr_length'] > 0
         
         print("✓ OCR processing completed")
         return sections
     
+    def get_ocr_bands(self, section_name: str) -> int:
+        """Number of horizontal bands a section is split into for parallel OCR."""
+        return self.table_bands if self.template.section(section_name)['split_bands'] else 1
+    
     def get_ocr_config(self, section_name: str) -> str:
-        """Get appropriate OCR configuration based on section type."""
-        if 'table' in section_name.lower():
-            return '--psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz.,-:/ '
-        elif 'date' in section_name.lower() or 'package' in section_name.lower():
-            return '--psm 7'  # Single text line
-        elif 'signature' in section_name.lower():
-            return '--psm 11'  # Sparse text
-        else:
-            return '--psm 6'   # Uniform block of text
+        """Get the OCR configuration the template assigns to a section."""
+        return self.template.ocr_config(section_name)
     
-    def save_results(self, sections: List[Dict], aligned_image: np.ndarray, original_path: str, output_dir: str):
+    def save_results(self, sections: List[Dict], aligned_image: Optional[np.ndarray], original_path: str, output_dir: str):
         """
         Save all extracted sections and create summary.
+        
+        aligned_image may be None when sections were warped individually.
         """
         os.makedirs(output_dir, exist_ok=True)
         print(f"💾 Saving results to: {output_dir}")
         
         # Save aligned document image
-        aligned_path = os.path.join(output_dir, "aligned_document.jpg")
-        cv2.imwrite(aligned_path, aligned_image)
+        if aligned_image is not None:
+            aligned_path = os.path.join(output_dir, "aligned_document.jpg")
+            cv2.imwrite(aligned_path, aligned_image)
         
         # Save each section
         for section in sections:
@@ -336,56 +358,25 @@ class DocumentSectionExtractor:
         print("✓ All results saved successfully")
         return summary
     
+    def visualization_spec(self, image_path: str, sections: List[Dict], output_path: str) -> Dict:
+        """
+        Compact description of the section overlay figure for the renderer.
+        """
+        return build_spec(
+            image_path,
+            [{'bbox': section['bbox'], 'label': f"{i+1}. {section['id']}"} for i, section in enumerate(sections)],
+            output_path,
+            f"Document Sections Extraction - {len(sections)} sections found",
+            figsize=(16, 12),
+            label_box=True
+        )
+    
     def create_visualization(self, aligned_image: np.ndarray, sections: List[Dict], output_path: str):
         """
         Create visualization showing extracted sections.
         """
-        try:
-            import matplotlib.pyplot as plt
-            import matplotlib.patches as patches
-        except ImportError:
-            print("⚠️ Matplotlib not available for visualization")
-            return
-        
-        # Convert image for matplotlib
-        if len(aligned_image.shape) == 3:
-            display_img = cv2.cvtColor(aligned_image, cv2.COLOR_BGR2RGB)
-        else:
-            display_img = aligned_image
-        
-        # Create figure
-        fig, ax = plt.subplots(1, 1, figsize=(16, 12))
-        ax.imshow(display_img)
-        
-        # Define colors for different sections
-        colors = [
-            'red', 'blue', 'green', 'orange', 'purple', 
-            'cyan', 'magenta', 'yellow', 'pink'
-        ]
-        
-        # Draw bounding boxes for each section
-        for i, section in enumerate(sections):
-            x, y, w, h = section['bbox']
-            color = colors[i % len(colors)]
-            
-            # Draw rectangle
-            rect = patches.Rectangle((x, y), w, h, linewidth=2, 
-                                   edgecolor=color, facecolor='none')
-            ax.add_patch(rect)
-            
-            # Add label
-            ax.text(x, y-5, f"{i+1}. {section['id']}", 
-                   color=color, fontsize=10, fontweight='bold',
-                   bbox=dict(boxstyle="round,pad=0.3", facecolor='white', alpha=0.8))
-        
-        ax.set_title(f"Document Sections Extraction - {len(sections)} sections found")
-        ax.axis('off')
-        
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✓ Visualization saved: {output_path}")
+        spec = self.visualization_spec(None, sections, output_path)
+        submit_visualization(spec, 'sync', image=aligned_image)
     
     def print_summary(self, sections: List[Dict]):
         """Print extraction summary to console."""
@@ -410,9 +401,15 @@ class DocumentSectionExtractor:
                     print(f"     Preview: {preview}...")
             print()
     
-    def process_document(self, input_file: str, output_dir: str = "extracted_sections") -> Dict:
+    def process_document(self, input_file: str, output_dir: str = "extracted_sections",
+                         image: Optional[np.ndarray] = None, capture_source: Optional[str] = None) -> Dict:
         """
         Main processing function - processes doc1.jpg and extracts all sections.
+        
+        image: an already decoded page (e.g. from page_source.iter_pages); input_file
+        is then only used as its name in the results.
+        capture_source: with reuse_alignment, the page is aligned against the
+        previous page of this source only (see select_capture_source).
         """
         print(f"🚀 Starting document processing...")
         print(f"📁 Input file: {input_file}")
@@ -420,27 +417,37 @@ class DocumentSectionExtractor:
         print("=" * 60)
         
         # Check if input file exists
-        if not os.path.exists(input_file):
+        if image is None and not os.path.exists(input_file):
             raise FileNotFoundError(f"Input file not found: {input_file}")
         
         # Load image
         print("📷 Loading image...")
-        original_image = cv2.imread(input_file)
-        if original_image is None:
-            raise ValueError(f"Could not load image: {input_file}")
+        original_image = load_image(input_file if image is None else image)
         
         h, w = original_image.shape[:2]
         print(f"✓ Image loaded: {w}x{h} pixels")
         
         # Step 1: Detect boundary and align document
-        aligned_image, alignment_success = self.align_and_normalize_document(original_image)
+        if capture_source is not None:
+            self.select_capture_source(capture_source)
+        hits_before = self.alignment_cache.hits if self.alignment_cache else 0
+        if self.warp_mode == 'sections':
+            homography = self.compute_alignment(original_image)
+            alignment_success = homography is not None
+            aligned_image = None if alignment_success else original_image
+        else:
+            homography = None
+            aligned_image, alignment_success = self.align_and_normalize_document(original_image)
         
         if not alignment_success:
             print("⚠️ Using original image without alignment")
             aligned_image = original_image
         
-        # Step 2: Extract sections
-        sections = self.extract_sections(aligned_image)
+        # Step 2: Extract sections (warped individually in 'sections' mode)
+        if aligned_image is None:
+            sections = self.extract_sections(original_image, homography)
+        else:
+            sections = self.extract_sections(aligned_image)
         
         # Step 3: Perform OCR
         sections = self.perform_ocr_on_sections(sections)
@@ -448,9 +455,13 @@ class DocumentSectionExtractor:
         # Step 4: Save results
         summary = self.save_results(sections, aligned_image, input_file, output_dir)
         
-        # Step 5: Create visualization
+        # Step 5: Create visualization (opt-in, from the saved aligned page)
         viz_path = os.path.join(output_dir, "sections_visualization.png")
-        self.create_visualization(aligned_image, sections, viz_path)
+        if self.visualize != 'off' and aligned_image is not None:
+            spec = self.visualization_spec(os.path.join(output_dir, "aligned_document.jpg"), sections, viz_path)
+            submit_visualization(spec, self.visualize, image=aligned_image)
+        elif self.visualize != 'off':
+            print("ℹ️ Section warp mode: aligned page not materialized, skipping visualization")
         
         # Step 6: Print summary
         self.print_summary(sections)
@@ -458,12 +469,19 @@ class DocumentSectionExtractor:
         print("=" * 60)
         print("✅ PROCESSING COMPLETED SUCCESSFULLY!")
         print(f"📁 All results saved in: {output_dir}/")
-        print(f"🖼️ Visualization: {viz_path}")
+        if self.visualize != 'off' and aligned_image is not None:
+            print(f"🖼️ Visualization: {viz_path}")
+        if self.alignment_cache:
+            cache_stats = self.alignment_cache.stats()
+            print(f"♻️ Alignment reuse: {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']} "
+                  f"pages this session ({cache_stats['hit_rate']:.0%} hit rate)")
         
         return {
             'input_file': input_file,
             'output_directory': output_dir,
             'alignment_success': alignment_success,
+            'alignment_reused': bool(self.alignment_cache) and self.alignment_cache.hits > hits_before,
+            'alignment_cache': self.alignment_cache.stats() if self.alignment_cache else None,
             'total_sections': len(sections),
             'sections': sections,
             'summary': summary
@@ -486,7 +504,8 @@ def main():
         # Initialize extractor
         extractor = DocumentSectionExtractor(
             standard_width=1200, 
-            standard_height=900
+            standard_height=900,
+            visualize='thread'
         )
         
         # Process the document
@@ -1,11 +1,17 @@
 import cv2
 import numpy as np
-from PIL import Image
 import json
 import os
-from typing import List, Dict, Tuple
-import matplotlib.pyplot as plt
+from typing import List, Dict, Tuple, Optional, Union
 import pytesseract
+from array_ocr import ocr_array
+from box_ops import nms_keep_indices
+from denoise import denoise, denoise_regions
+from layout_features import analyze_contours
+from lazy_sections import LazySection
+from page_source import load_image
+from template_registry import TemplateRegistry
+from visualization import build_spec, submit as submit_visualization, wait_for_pending
 
 
 # Windows-specific Tesseract path fix
@@ -19,15 +25,6 @@ except:
     print("✗ Still not working - try alternative path")
     pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe'
 
-
-# Make matplotlib optional
-try:
-    import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    print("Warning: matplotlib not available. Visualization functions will be disabled.")
-
 class DocumentSegmentationSystem:
     """
     A comprehensive document segmentation system for operational logs and forms.
@@ -38,11 +35,27 @@ class DocumentSegmentationSystem:
         self.config = self.load_config(config_path) if config_path else self.default_config()
         self.templates = {}
         
+        # Optional persistent registry; templates stored there survive across runs
+        template_config = self.config.get('templates', {})
+        self.template_registry = None
+        if template_config.get('registry_dir'):
+            self.template_registry = TemplateRegistry(
+                template_config['registry_dir'],
+                feature_type=template_config.get('feature_type', 'orb'),
+                max_features=template_config.get('max_features', 2000),
+                min_inliers=template_config.get('min_inliers', 15)
+            )
+        
     def default_config(self) -> Dict:
         """Default configuration for the segmentation system."""
         return {
             'preprocessing': {
                 'denoise': True,
+                # One of: nlmeans, nlmeans_downscaled, bilateral, median, none
+                'denoise_mode': 'nlmeans',
+                # 'page' denoises the whole page before detection,
+                # 'regions' denoises only the section crops sent to OCR
+                'denoise_scope': 'page',
                 'enhance_contrast': True,
                 'binarize': True
             },
@@ -50,7 +63,23 @@ class DocumentSegmentationSystem:
                 'min_contour_area': 1000,
                 'table_min_width': 100,
                 'table_min_height': 50,
-                'line_thickness_threshold': 2
+                'line_thickness_threshold': 2,
+                'line_kernel_length': 40,
+                'form_field_area': (100, 10000),
+                # Pyramid mode: run layout detection at detection_dpi and map boxes back.
+                # Pixel sizes above are specified at reference_dpi; the scan DPI is
+                # estimated from the long edge and page_size_inches.
+                'pyramid': False,
+                'detection_dpi': 100,
+                'reference_dpi': 300,
+                'page_size_inches': (11.69, 8.27)
+            },
+            'templates': {
+                # Directory of the on-disk template registry (None keeps templates in memory only)
+                'registry_dir': None,
+                'feature_type': 'orb',
+                'max_features': 2000,
+                'min_inliers': 15
             },
             'ocr': {
                 'engine': 'tesseract',
@@ -63,24 +92,50 @@ class DocumentSegmentationSystem:
         with open(config_path, 'r') as f:
             return json.load(f)
     
-    def preprocess_image(self, image_path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def denoise_mode(self) -> str:
+        """Configured denoise mode; 'denoise': False disables denoising entirely."""
+        preprocessing = self.config['preprocessing']
+        if not preprocessing.get('denoise', True):
+            return 'none'
+        return preprocessing.get('denoise_mode', 'nlmeans')
+    
+    def denoise_scope(self) -> str:
+        """Where denoising runs: 'page' (before detection) or 'regions' (OCR crops only)."""
+        return self.config['preprocessing'].get('denoise_scope', 'page')
+    
+    def prepare_ocr_page(self, original_image: np.ndarray, sections: List[Dict]) -> np.ndarray:
         """
-        Preprocess the input image for better segmentation results.
+        Page the OCR crops are cut from.
+        
+        When denoising is scoped to regions, only the section bboxes of the
+        grayscale page are denoised, in one pass per page with context at
+        the region borders.
+        """
+        if self.denoise_scope() != 'regions' or self.denoise_mode() == 'none':
+            return original_image
+        
+        gray = original_image
+        if len(gray.shape) == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        return denoise_regions(gray, [section['bbox'] for section in sections], self.denoise_mode())
+    
+    def preprocess_image(self, image: Union[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Preprocess the input image (a path or a decoded BGR page) for better
+        segmentation results.
         
         Returns:
             tuple: (binary_image, enhanced_image, original_image)
         """
         # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not load image from {image_path}")
+        img = load_image(image)
         
         # Convert to grayscale
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # Optional denoising
-        if self.config['preprocessing']['denoise']:
-            denoised = cv2.fastNlMeansDenoising(gray)
+        # Optional denoising; with 'regions' scope it is deferred to the OCR crops
+        if self.denoise_scope() == 'page':
+            denoised = denoise(gray, self.denoise_mode())
         else:
             denoised = gray
         
@@ -92,103 +147,185 @@ class DocumentSegmentationSystem:
             enhanced = denoised
         
         # Optional binarization
+        binary = self.binarize(enhanced)
+        
+        return binary, enhanced, img
+    
+    def binarize(self, enhanced: np.ndarray) -> np.ndarray:
+        """Otsu binarization when enabled in the config."""
         if self.config['preprocessing']['binarize']:
             _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return binary
+        return enhanced
+    
+    def estimate_dpi(self, image_shape: Tuple[int, ...]) -> float:
+        """Estimate scan DPI from the page's long edge and the configured paper size."""
+        long_edge_inches = max(self.config['detection'].get('page_size_inches', (11.69, 8.27)))
+        return max(image_shape[:2]) / long_edge_inches
+    
+    def detection_params(self, scale: float) -> Dict:
+        """
+        Detection config with pixel sizes multiplied by scale (areas by scale squared).
+        """
+        params = dict(self.config['detection'])
+        for key in ('table_min_width', 'table_min_height', 'line_kernel_length'):
+            params[key] = params.get(key, 0) * scale
+        params['min_contour_area'] = params['min_contour_area'] * scale ** 2
+        min_area, max_area = params.get('form_field_area', (100, 10000))
+        params['form_field_area'] = (min_area * scale ** 2, max_area * scale ** 2)
+        return params
+    
+    def pyramid_layout(self, enhanced: np.ndarray) -> Tuple[np.ndarray, Dict, float]:
+        """
+        Reduce the page to detection_dpi for layout analysis.
+        
+        Kernel sizes and thresholds are scaled from reference_dpi to the
+        detection scale, so results no longer depend on the scan resolution.
+        
+        Returns:
+            tuple: (reduced binary image, layout features, image scale factor)
+        """
+        detection = self.config['detection']
+        source_dpi = self.estimate_dpi(enhanced.shape)
+        target_dpi = min(detection.get('detection_dpi', 100), source_dpi)
+        image_scale = target_dpi / source_dpi
+        
+        if image_scale < 1.0:
+            h, w = enhanced.shape[:2]
+            size = (max(int(round(w * image_scale)), 1), max(int(round(h * image_scale)), 1))
+            reduced = cv2.resize(enhanced, size, interpolation=cv2.INTER_AREA)
         else:
-            binary = enhanced
+            reduced = enhanced
+            image_scale = 1.0
         
-        return binary, enhanced, img
+        binary = self.binarize(reduced)
+        params = self.detection_params(target_dpi / detection.get('reference_dpi', 300))
+        return binary, self.analyze_layout(binary, params), image_scale
     
-    def detect_tables(self, binary_image: np.ndarray) -> List[Dict]:
+    def rescale_sections(self, sections: List[Dict], image_scale: float, image_shape: Tuple[int, ...]) -> List[Dict]:
+        """Map section bboxes detected at image_scale back to full-resolution pixels."""
+        if image_scale == 1.0:
+            return sections
+        
+        height, width = image_shape[:2]
+        factor = 1.0 / image_scale
+        for section in sections:
+            x, y, w, h = section['bbox']
+            x0 = min(max(int(np.floor(x * factor)), 0), width)
+            y0 = min(max(int(np.floor(y * factor)), 0), height)
+            x1 = min(int(np.ceil((x + w) * factor)), width)
+            y1 = min(int(np.ceil((y + h) * factor)), height)
+            section['bbox'] = (x0, y0, x1 - x0, y1 - y0)
+            if 'area' in section:
+                section['area'] = section['area'] * factor ** 2
+        return sections
+    
+    def analyze_layout(self, binary_image: np.ndarray, params: Dict = None) -> Dict[str, Dict]:
         """
-        Detect table structures in the image using morphological operations.
+        Shared layout analysis stage for all detectors.
+        
+        Each detector keeps its own candidate set, the outer contours of:
+        the ruled-line mask (tables), the binary page (text regions) and the
+        3x3-closed page (form fields). Per-contour features (bbox, area,
+        approx vertex count) are computed as NumPy arrays, so the detectors
+        are masks over them. The detection parameters used are kept under
+        'params' so that the detectors apply thresholds at the same scale.
         """
-        # Create kernels for line detection
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
+        detection = params if params is not None else self.config['detection']
+        line_length = max(int(round(detection.get('line_kernel_length', 40))), 1)
         
-        # Detect horizontal and vertical lines
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (line_length, 1))
+        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length))
         horizontal_lines = cv2.morphologyEx(binary_image, cv2.MORPH_OPEN, horizontal_kernel)
         vertical_lines = cv2.morphologyEx(binary_image, cv2.MORPH_OPEN, vertical_kernel)
+        line_mask = cv2.add(horizontal_lines, vertical_lines)
+        
+        # Close small gaps so that form-field rectangles form whole contours
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        closed = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel)
         
-        # Combine lines
-        table_mask = cv2.add(horizontal_lines, vertical_lines)
-        
-        # Find contours of table structures
-        contours, _ = cv2.findContours(table_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        tables = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            if (w > self.config['detection']['table_min_width'] and 
-                h > self.config['detection']['table_min_height']):
-                tables.append({
-                    'type': 'table',
-                    'bbox': (x, y, w, h),
-                    'area': w * h,
-                    'confidence': 0.8
-                })
-        
-        return tables
+        return {
+            'tables': analyze_contours(line_mask),
+            'text_regions': analyze_contours(binary_image),
+            'form_fields': analyze_contours(closed, detection.get('form_field_area', (100, 10000))),
+            'params': detection
+        }
+    
+    def detect_tables(self, binary_image: np.ndarray, features: Dict = None) -> List[Dict]:
+        """
+        Detect table structures: outer contours of the ruled-line mask of table size.
+        """
+        features = features if features is not None else self.analyze_layout(binary_image)
+        detection = features['params']
+        contours = features['tables']
+        
+        bbox = contours['bbox']
+        w, h = bbox[:, 2], bbox[:, 3]
+        mask = (w > detection['table_min_width']) & (h > detection['table_min_height'])
+        
+        return [
+            {
+                'type': 'table',
+                'bbox': tuple(int(v) for v in bbox[i]),
+                'area': int(w[i] * h[i]),
+                'confidence': 0.8
+            }
+            for i in np.flatnonzero(mask)
+        ]
     
-    def detect_text_regions(self, binary_image: np.ndarray) -> List[Dict]:
+    def detect_text_regions(self, binary_image: np.ndarray, features: Dict = None) -> List[Dict]:
         """
         Detect text regions using contour analysis.
         """
-        # Find contours
-        contours, hierarchy = cv2.findContours(binary_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        text_regions = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > self.config['detection']['min_contour_area']:
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                # Filter based on aspect ratio (typical for text regions)
-                aspect_ratio = w / h if h > 0 else 0
-                if 0.1 < aspect_ratio < 20:  # Reasonable aspect ratio for text
-                    text_regions.append({
-                        'type': 'text_region',
-                        'bbox': (x, y, w, h),
-                        'area': area,
-                        'aspect_ratio': aspect_ratio,
-                        'confidence': 0.6
-                    })
-        
-        return text_regions
+        features = features if features is not None else self.analyze_layout(binary_image)
+        contours = features['text_regions']
+        
+        bbox = contours['bbox']
+        w, h = bbox[:, 2], bbox[:, 3]
+        aspect_ratio = np.divide(w, h, out=np.zeros(len(h), dtype=np.float64), where=h > 0)
+        
+        # Reasonable aspect ratio for text
+        mask = ((contours['area'] > features['params']['min_contour_area']) &
+                (aspect_ratio > 0.1) & (aspect_ratio < 20))
+        
+        return [
+            {
+                'type': 'text_region',
+                'bbox': tuple(int(v) for v in bbox[i]),
+                'area': float(contours['area'][i]),
+                'aspect_ratio': float(aspect_ratio[i]),
+                'confidence': 0.6
+            }
+            for i in np.flatnonzero(mask)
+        ]
     
-    def detect_form_fields(self, binary_image: np.ndarray) -> List[Dict]:
+    def detect_form_fields(self, binary_image: np.ndarray, features: Dict = None) -> List[Dict]:
         """
-        Detect form fields and input areas.
+        Detect form fields and input areas: roughly rectangular (4-corner) outer contours.
         """
-        # Detect rectangular regions that might be form fields
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        closed = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel)
-        
-        # Find contours
-        contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        form_fields = []
-        for contour in contours:
-            # Approximate contour to polygon
-            epsilon = 0.02 * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
-            
-            # If it's roughly rectangular (4 corners)
-            if len(approx) == 4:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                
-                # Filter by size and aspect ratio
-                if 100 < area < 10000 and 0.2 < w/h < 10:
-                    form_fields.append({
-                        'type': 'form_field',
-                        'bbox': (x, y, w, h),
-                        'area': area,
-                        'confidence': 0.7
-                    })
-        
-        return form_fields
+        features = features if features is not None else self.analyze_layout(binary_image)
+        min_area, max_area = features['params'].get('form_field_area', (100, 10000))
+        contours = features['form_fields']
+        
+        bbox = contours['bbox']
+        w, h = bbox[:, 2], bbox[:, 3]
+        area = w * h
+        aspect_ratio = np.divide(w, h, out=np.zeros(len(h), dtype=np.float64), where=h > 0)
+        
+        # Filter by corner count, size and aspect ratio
+        mask = ((contours['vertices'] == 4) &
+                (area > min_area) & (area < max_area) &
+                (aspect_ratio > 0.2) & (aspect_ratio < 10))
+        
+        return [
+            {
+                'type': 'form_field',
+                'bbox': tuple(int(v) for v in bbox[i]),
+                'area': int(area[i]),
+                'confidence': 0.7
+            }
+            for i in np.flatnonzero(mask)
+        ]
     
     def create_template(self, image_path: str, template_name: str, manual_regions: List[Dict]) -> None:
         """
@@ -198,26 +335,84 @@ class DocumentSegmentationSystem:
             image_path: Path to template image
             template_name: Name for the template
             manual_regions: List of manually defined regions with types and bboxes
+        
+        With a template registry configured, the template is also persisted
+        together with the reference image's alignment features.
         """
         self.templates[template_name] = {
             'image_path': image_path,
             'regions': manual_regions
         }
+        
+        if self.template_registry is not None:
+            self.template_registry.register(template_name, image_path, manual_regions)
+    
+    def identify_template(self, image: np.ndarray, top_k: int = 3) -> Dict:
+        """
+        Choose the best registered template for a page.
+        
+        Returns:
+            TemplateRegistry.identify's result: 'template' (None if none
+            verifies) plus the verified 'homography' and 'inliers', which
+            apply_template can reuse instead of aligning the page again
+        """
+        if self.template_registry is None:
+            return {'template': None, 'homography': None, 'inliers': 0, 'candidates': []}
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        result = self.template_registry.identify(gray, top_k=top_k)
+        if result['template'] is not None:
+            print(f"Identified template '{result['template']}' ({result['inliers']} inliers)")
+        else:
+            print(f"No template verified among candidates {[name for name, _ in result['candidates']]}")
+        return result
+    
+    def has_template(self, template_name: str) -> bool:
+        """Whether a template exists in memory or in the registry."""
+        if template_name in self.templates:
+            return True
+        return self.template_registry is not None and template_name in self.template_registry
     
-    def apply_template(self, image: np.ndarray, template_name: str) -> List[Dict]:
+    def apply_template(self, image: np.ndarray, template_name: str,
+                       alignment: Optional[Tuple[np.ndarray, int]] = None) -> List[Dict]:
         """
         Apply a predefined template to extract sections.
+        
+        Registry templates are aligned to the page through a homography from
+        the cached reference features; otherwise (or if alignment fails) the
+        template's fixed bboxes are used. alignment is an already verified
+        (homography, inliers) for this page, e.g. from identify_template.
         """
-        if template_name not in self.templates:
+        if self.template_registry is not None and template_name in self.template_registry:
+            if alignment is not None:
+                homography, inliers = alignment
+            else:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+                homography, inliers = self.template_registry.align(template_name, gray)
+            if homography is not None:
+                return [
+                    {
+                        'type': region['type'],
+                        'bbox': region['bbox'],
+                        'confidence': 0.9,
+                        'source': 'template_aligned',
+                        'alignment_inliers': inliers
+                    }
+                    for region in self.template_registry.project_regions(template_name, homography, image.shape)
+                ]
+            print(f"Template '{template_name}' alignment failed ({inliers} inliers), using fixed regions")
+            template = self.template_registry.get(template_name)
+        elif template_name in self.templates:
+            template = self.templates[template_name]
+        else:
             return []
         
-        template = self.templates[template_name]
         sections = []
         
         for region in template['regions']:
             sections.append({
                 'type': region['type'],
-                'bbox': region['bbox'],
+                'bbox': tuple(region['bbox']),
                 'confidence': 0.9,
                 'source': 'template'
             })
@@ -228,41 +423,25 @@ class DocumentSegmentationSystem:
         """
         Remove overlapping sections, keeping the one with higher confidence.
         """
-        def calculate_iou(box1, box2):
-            x1, y1, w1, h1 = box1
-            x2, y2, w2, h2 = box2
-            
-            # Calculate intersection
-            left = max(x1, x2)
-            top = max(y1, y2)
-            right = min(x1 + w1, x2 + w2)
-            bottom = min(y1 + h1, y2 + h2)
-            
-            if left < right and top < bottom:
-                intersection = (right - left) * (bottom - top)
-                union = w1 * h1 + w2 * h2 - intersection
-                return intersection / union if union > 0 else 0
-            return 0
-        
         # Sort by confidence
         sections.sort(key=lambda x: x.get('confidence', 0), reverse=True)
+        if not sections:
+            return []
         
-        filtered_sections = []
-        for section in sections:
-            is_overlapping = False
-            for existing in filtered_sections:
-                if calculate_iou(section['bbox'], existing['bbox']) > overlap_threshold:
-                    is_overlapping = True
-                    break
-            
-            if not is_overlapping:
-                filtered_sections.append(section)
+        # Vectorized NMS over all boxes at once
+        boxes = np.array([section['bbox'] for section in sections], dtype=np.float64)
+        scores = [section.get('confidence', 0) for section in sections]
+        keep = nms_keep_indices(boxes, scores, overlap_threshold)
         
-        return filtered_sections
+        return [sections[i] for i in keep]
     
     def extract_section_images(self, original_image: np.ndarray, sections: List[Dict]) -> List[Dict]:
         """
-        Extract individual section images for OCR processing.
+        Prepare sections for OCR processing.
+        
+        Sections hold only their bbox and a reference to the page; section['image']
+        is a view materialized on access, and section.release() drops the page
+        reference once the section has been OCR'd and saved.
         """
         extracted_sections = []
         
@@ -275,17 +454,15 @@ class DocumentSegmentationSystem:
             w = min(w, original_image.shape[1] - x)
             h = min(h, original_image.shape[0] - y)
             
-            # Extract section image
-            section_img = original_image[y:y+h, x:x+w]
-            
-            extracted_sections.append({
+            extracted = LazySection({
                 'id': f"section_{i}",
                 'type': section['type'],
                 'bbox': (x, y, w, h),
-                'image': section_img,
                 'confidence': section.get('confidence', 0.5),
                 'ready_for_ocr': True
             })
+            extracted.set_lazy('image', lambda x=x, y=y, w=w, h=h: original_image[y:y+h, x:x+w], memoize=False)
+            extracted_sections.append(extracted)
         
         return extracted_sections
     
@@ -294,55 +471,71 @@ class DocumentSegmentationSystem:
         Perform OCR on a section image.
         """
         try:
-            # Convert to PIL Image if needed
+            # NumPy arrays go straight to the engine without a PIL/temp-file round trip
             if isinstance(section_image, np.ndarray):
-                if len(section_image.shape) == 3:
-                    section_image = cv2.cvtColor(section_image, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(section_image)
-            else:
-                pil_image = section_image
+                return ocr_array(section_image, config=self.config['ocr']['config'])
             
-            # Perform OCR
-            text = pytesseract.image_to_string(pil_image, config=self.config['ocr']['config'])
+            text = pytesseract.image_to_string(section_image, config=self.config['ocr']['config'])
             return text.strip()
         
         except Exception as e:
             print(f"OCR failed: {e}")
             return ""
     
-    def process_document(self, image_path: str, template_name: str = None) -> Dict:
+    def process_document(self, image_path: str, template_name: str = None, output_dir: str = None,
+                         image: Optional[np.ndarray] = None) -> Dict:
         """
         Main processing pipeline for document segmentation.
         
         Args:
             image_path: Path to the document image
-            template_name: Optional template to apply
+            template_name: Optional template to apply; 'auto' picks the best
+                registered template for the page
+            output_dir: If given, each section's image and OCR text are written
+                as soon as it is OCR'd and its page reference is released, so
+                memory stays bounded to one page; summary.json is written at the end
+            image: Optional already decoded page (e.g. from page_source.iter_pages);
+                image_path is then only used as its name
             
         Returns:
             Dictionary containing all extracted sections and their OCR results
         """
         # Preprocess image
-        binary, enhanced, original = self.preprocess_image(image_path)
+        binary, enhanced, original = self.preprocess_image(image_path if image is None else image)
         
         # Detect sections using multiple methods
         all_sections = []
         
         # Method 1: Apply template if available
-        if template_name and template_name in self.templates:
-            template_sections = self.apply_template(enhanced, template_name)
+        alignment = None
+        if template_name == 'auto':
+            # Identification already verified a homography; alignment is not repeated
+            identified = self.identify_template(enhanced)
+            template_name = identified['template']
+            if template_name is not None:
+                alignment = (identified['homography'], identified['inliers'])
+        
+        if template_name and self.has_template(template_name):
+            template_sections = self.apply_template(enhanced, template_name, alignment)
             all_sections.extend(template_sections)
         
+        # Contour features computed once for the three detectors below,
+        # optionally at a reduced DPI-normalized scale
+        if self.config['detection'].get('pyramid', False):
+            layout_binary, features, image_scale = self.pyramid_layout(enhanced)
+        else:
+            layout_binary, features, image_scale = binary, self.analyze_layout(binary), 1.0
+        
         # Method 2: Detect tables
-        table_sections = self.detect_tables(binary)
-        all_sections.extend(table_sections)
+        detected_sections = self.detect_tables(layout_binary, features)
         
         # Method 3: Detect text regions
-        text_sections = self.detect_text_regions(binary)
-        all_sections.extend(text_sections)
+        detected_sections.extend(self.detect_text_regions(layout_binary, features))
         
         # Method 4: Detect form fields
-        form_sections = self.detect_form_fields(binary)
-        all_sections.extend(form_sections)
+        detected_sections.extend(self.detect_form_fields(layout_binary, features))
+        
+        all_sections.extend(self.rescale_sections(detected_sections, image_scale, original.shape))
         
         # Remove overlapping sections
         filtered_sections = self.remove_overlapping_sections(all_sections)
@@ -351,77 +544,68 @@ class DocumentSegmentationSystem:
         extracted_sections = self.extract_section_images(original, filtered_sections)
         
         # Perform OCR on each section
+        ocr_page = self.prepare_ocr_page(original, extracted_sections)
         for section in extracted_sections:
-            section['ocr_text'] = self.perform_ocr(section['image'])
+            x, y, w, h = section['bbox']
+            section['ocr_text'] = self.perform_ocr(ocr_page[y:y+h, x:x+w])
             section['ocr_confidence'] = len(section['ocr_text']) > 0  # Simple confidence metric
+            
+            if output_dir:
+                self.save_section(section, output_dir)
+                section.release()
         
-        return {
+        results = {
             'image_path': image_path,
             'total_sections': len(extracted_sections),
             'sections': extracted_sections,
             'processing_methods': ['template', 'table_detection', 'text_regions', 'form_fields']
         }
+        
+        if output_dir:
+            self.save_summary(results, output_dir)
+        
+        return results
     
-    def visualize_results(self, image_path: str, results: Dict, output_path: str = None):
+    def visualize_results(self, image_path: str, results: Dict, output_path: str = None, mode: str = 'sync'):
         """
         Visualize the segmentation results.
-        """
-        if not MATPLOTLIB_AVAILABLE:
-            print("Visualization not available - matplotlib not installed")
-            print("Install matplotlib with: pip install matplotlib>=3.3.0")
-            return
-
-        # Load original image
-        img = cv2.imread(image_path)
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Create figure
-        fig, ax = plt.subplots(1, 1, figsize=(15, 10))
-        ax.imshow(img_rgb)
         
-        # Draw bounding boxes for each section
-        colors = ['red', 'blue', 'green', 'yellow', 'purple', 'orange', 'cyan', 'magenta']
-        
-        for i, section in enumerate(results['sections']):
-            x, y, w, h = section['bbox']
-            color = colors[i % len(colors)]
-            
-            # Draw rectangle
-            rect = plt.Rectangle((x, y), w, h, linewidth=2, edgecolor=color, facecolor='none')
-            ax.add_patch(rect)
-            
-            # Add label
-            ax.text(x, y-5, f"{section['type']} ({section['id']})", 
-                   color=color, fontsize=10, fontweight='bold')
-        
-        ax.set_title(f"Document Segmentation Results - {len(results['sections'])} sections found")
-        ax.axis('off')
-        
-        if output_path:
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        else:
-            plt.show()
-        
-        plt.close()
+        mode is 'sync', 'thread' or 'process' (see visualization.submit);
+        matplotlib is only imported by the renderer. Without output_path the
+        figure is shown interactively, which requires 'sync'.
+        """
+        spec = build_spec(
+            image_path,
+            [{'bbox': s['bbox'], 'label': f"{s['type']} ({s['id']})"} for s in results['sections']],
+            output_path,
+            f"Document Segmentation Results - {len(results['sections'])} sections found",
+            figsize=(15, 10),
+            colors=['red', 'blue', 'green', 'yellow', 'purple', 'orange', 'cyan', 'magenta']
+        )
+        return submit_visualization(spec, mode)
     
-    def save_extracted_sections(self, results: Dict, output_dir: str):
+    def save_section(self, section: Dict, output_dir: str):
         """
-        Save extracted section images and OCR results.
+        Save one section's image and OCR text.
         """
         os.makedirs(output_dir, exist_ok=True)
         
-        # Save section images
-        for section in results['sections']:
-            # Save image
+        # Save image (skipped if already streamed out and released)
+        if 'image' in section:
             img_path = os.path.join(output_dir, f"{section['id']}.png")
             cv2.imwrite(img_path, section['image'])
-            
-            # Save OCR text
-            txt_path = os.path.join(output_dir, f"{section['id']}.txt")
-            with open(txt_path, 'w', encoding='utf-8') as f:
-                f.write(section['ocr_text'])
         
-        # Save summary
+        # Save OCR text
+        txt_path = os.path.join(output_dir, f"{section['id']}.txt")
+        with open(txt_path, 'w', encoding='utf-8') as f:
+            f.write(section['ocr_text'])
+    
+    def save_summary(self, results: Dict, output_dir: str):
+        """
+        Save the per-section summary.json.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        
         summary_path = os.path.join(output_dir, 'summary.json')
         summary_data = {
             'total_sections': results['total_sections'],
@@ -439,6 +623,15 @@ class DocumentSegmentationSystem:
         
         with open(summary_path, 'w') as f:
             json.dump(summary_data, f, indent=2)
+    
+    def save_extracted_sections(self, results: Dict, output_dir: str):
+        """
+        Save extracted section images and OCR results.
+        """
+        for section in results['sections']:
+            self.save_section(section, output_dir)
+        
+        self.save_summary(results, output_dir)
 
 # Example usage and demonstration
 def main():
@@ -480,11 +673,12 @@ def main():
             print(f"  OCR text preview: {section['ocr_text'][:100]}...")
             print()
         
-        # Visualize results
-        segmentation_system.visualize_results(image_path, results, "segmentation_results_01.png")
+        # Visualize results on a background thread while the sections are saved
+        segmentation_system.visualize_results(image_path, results, "segmentation_results_01.png", mode='thread')
         
         # Save extracted sections
         segmentation_system.save_extracted_sections(results, "extracted_sections_01/")
+        wait_for_pending()
         
         print("Processing complete! Check the output files.")
         
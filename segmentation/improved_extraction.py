@@ -3,11 +3,18 @@
 
 import cv2
 import numpy as np
-from PIL import Image
 import json
 import os
 from typing import List, Dict, Tuple, Optional
 import pytesseract
+from page_source import load_image
+from parallel_ocr import ocr_sections_parallel
+from section_templates import SectionTemplate, run_pipeline, template_path as bundled_template_path
+from visualization import VISUALIZE_MODES, build_spec, submit as submit_visualization
+from denoise import DENOISE_MODES
+from lazy_sections import LazySection
+from document_alignment import (DETECTION_MAX_SIDE, WARP_MODES, downscale_for_detection, page_homography,
+                                refine_corners, to_full_resolution, warp_section)
 
 class ImprovedDocumentExtractor:
     """
@@ -15,7 +22,10 @@ class ImprovedDocumentExtractor:
     based on the actual marked sections in your document.
     """
     
-    def __init__(self, use_original_dimensions: bool = True):
+    def __init__(self, use_original_dimensions: bool = True, denoise_mode: str = 'nlmeans',
+                 detection_max_side: Optional[int] = DETECTION_MAX_SIDE, warp_mode: str = 'page',
+                 ocr_workers: Optional[int] = None, table_bands: int = 1, template_path: Optional[str] = None,
+                 visualize: str = 'off'):
         print("🔧 Initializing Improved Document Section Extractor...")
         
         # Setup Tesseract OCR
@@ -23,51 +33,38 @@ class ImprovedDocumentExtractor:
         
         # Option to use original dimensions or scale
         self.use_original_dimensions = use_original_dimensions
+        
+        # Section denoiser: nlmeans, nlmeans_downscaled, bilateral, median or none
+        if denoise_mode not in DENOISE_MODES:
+            raise ValueError(f"Unknown denoise mode '{denoise_mode}', expected one of {DENOISE_MODES}")
+        self.denoise_mode = denoise_mode
+        
+        # Boundary detection runs on a copy with this long edge (None = full resolution)
+        self.detection_max_side = detection_max_side
+        
+        # 'page' warps the full page (saved as aligned.jpg); 'sections' warps
+        # each section straight from the photo and never builds the page
+        if warp_mode not in WARP_MODES:
+            raise ValueError(f"Unknown warp mode '{warp_mode}', expected one of {WARP_MODES}")
+        self.warp_mode = warp_mode
+        
+        # Sections are OCR'd on a thread pool (None = one thread per core); the
+        # main table can additionally be split into table_bands horizontal bands
+        self.ocr_workers = ocr_workers
+        self.table_bands = table_bands
+        
+        # Section overlay image: 'off', or rendered 'sync', on a background
+        # 'thread', or in a separate 'process' from a bbox JSON spec
+        if visualize not in VISUALIZE_MODES:
+            raise ValueError(f"Unknown visualize mode '{visualize}', expected one of {VISUALIZE_MODES}")
+        self.visualize = visualize
         self.standard_width = 1200
         self.standard_height = 900
         
-        # CORRECTED section coordinates based on your marked.png
-        # These are relative coordinates (0.0 to 1.0) measured from the marked sections
-        self.sections_template = {
-            'package_info': {
-                'bbox_ratio': (0.815, 0.045, 0.165, 0.025),  # Top right - Package C
-                'description': 'Package information (top right)'
-            },
-            'date_section': {
-                'bbox_ratio': (0.815, 0.075, 0.165, 0.025),  # Date below package
-                'description': 'Date information'
-            },
-            'main_data_table': {
-                'bbox_ratio': (0.012, 0.110, 0.976, 0.580),  # Large central table
-                'description': 'Main operational data table'
-            },
-            'daily_running_hours': {
-                'bbox_ratio': (0.025, 0.720, 0.280, 0.120),  # Bottom left
-                'description': 'Daily running hours and cumulative hours'
-            },
-            'petroleum_status': {
-                'bbox_ratio': (0.025, 0.850, 0.280, 0.100),  # Bottom left corner
-                'description': 'Petroleum oil lubricants daily status'
-            },
-            'pkg_trip_details': {
-                'bbox_ratio': (0.320, 0.720, 0.340, 0.120),  # Bottom center
-                'description': 'PKG Trip & Change over details'
-            },
-            'shift_incharge': {
-                'bbox_ratio': (0.680, 0.720, 0.295, 0.055),  # Bottom right - shifts
-                'description': 'Day/Night shift incharge'
-            },
-            'remarks_section': {
-                'bbox_ratio': (0.320, 0.850, 0.655, 0.100),  # Bottom center - remarks
-                'description': 'Remarks section'
-            },
-            'signatures': {
-                'bbox_ratio': (0.680, 0.785, 0.295, 0.165),  # Bottom right corner
-                'description': 'Signatures and approvals'
-            }
-        }
+        # Section layout, OCR configs and preprocessing come from a template file
+        self.template = SectionTemplate.from_file(template_path or bundled_template_path('operational_log_improved.json'))
         
-        print(f"✓ Template loaded with {len(self.sections_template)} sections")
+        print(f"✓ Template {self.template.name} loaded with {len(self.template)} sections")
     
     def setup_tesseract(self):
         """Setup Tesseract OCR path for Windows"""
@@ -105,11 +102,16 @@ class ImprovedDocumentExtractor:
     def detect_document_boundary_improved(self, image: np.ndarray) -> Optional[np.ndarray]:
         """
         Improved document boundary detection with multiple methods
+        
+        Detection runs on a downscaled copy; the corners are then refined
+        at full resolution with cornerSubPix.
         """
         print("🔍 Detecting document boundary (improved method)...")
         
+        small, scale = downscale_for_detection(image, self.detection_max_side)
+        
         # Preprocess
-        preprocessed = self.preprocess_image(image)
+        preprocessed = self.preprocess_image(small)
         
         # Method 1: Adaptive threshold
         adaptive_thresh = cv2.adaptiveThreshold(
@@ -131,7 +133,7 @@ class ImprovedDocumentExtractor:
         contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         # Find the largest rectangular contour
-        min_area = image.shape[0] * image.shape[1] * 0.3  # At least 30% of image
+        min_area = small.shape[0] * small.shape[1] * 0.3  # At least 30% of image
         best_contour = None
         max_area = 0
         
@@ -151,7 +153,8 @@ class ImprovedDocumentExtractor:
         
         if best_contour is not None:
             print("✓ Document boundary detected")
-            return self.order_corner_points(best_contour.reshape(4, 2))
+            corners = self.order_corner_points(to_full_resolution(best_contour.reshape(4, 2), scale))
+            return refine_corners(image, corners, scale)
         
         # Fallback: use image edges
         print("⚠️ Using image boundaries as fallback")
@@ -174,15 +177,16 @@ class ImprovedDocumentExtractor:
         
         return rect
     
-    def align_document(self, image: np.ndarray) -> Tuple[np.ndarray, bool]:
+    def compute_alignment(self, image: np.ndarray) -> Tuple[Optional[np.ndarray], Tuple[int, int]]:
         """
-        Align document with option to keep original dimensions
+        Detect the document boundary and return the homography onto the
+        aligned page together with the page's (width, height).
         """
         # Detect boundary
         corners = self.detect_document_boundary_improved(image)
         
         if corners is None:
-            return image, False
+            return None, (image.shape[1], image.shape[0])
         
         # Calculate output dimensions
         if self.use_original_dimensions:
@@ -199,153 +203,148 @@ class ImprovedDocumentExtractor:
             width = self.standard_width
             height = self.standard_height
         
-        # Define destination points
-        dst_points = np.array([
-            [0, 0], [width, 0], 
-            [width, height], [0, height]
-        ], dtype="float32")
+        return page_homography(corners, width, height), (width, height)
+    
+    def align_document(self, image: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """
+        Align document with option to keep original dimensions
+        """
+        M, (width, height) = self.compute_alignment(image)
+        
+        if M is None:
+            return image, False
         
         # Apply perspective transform
-        M = cv2.getPerspectiveTransform(corners, dst_points)
         aligned = cv2.warpPerspective(image, M, (width, height))
         
         print(f"✓ Document aligned to {width}x{height}")
         return aligned, True
     
-    def extract_sections_accurate(self, image: np.ndarray) -> List[Dict]:
+    def section_regions(self, width: int, height: int) -> List[Tuple[str, Dict, Tuple[int, int, int, int]]]:
+        """
+        Padded pixel bboxes of the template sections on a width x height aligned page
+        
+        The ROIs are compiled once per page size by the template.
+        """
+        return [(section['id'], section, bbox) for section, bbox in self.template.compile(width, height)]
+    
+    def extract_sections_accurate(self, image: np.ndarray, homography: Optional[np.ndarray] = None,
+                                  size: Optional[Tuple[int, int]] = None) -> List[Dict]:
         """
         Extract sections with accurate coordinates
+        
+        If a homography is given, image is the unaligned photo and each section
+        is warped straight from it onto an aligned page of the given (width, height).
+        
+        Section 'image' and 'processed_image' are computed lazily on first
+        access and memoized, so sections nobody OCRs or exports cost nothing.
         """
         print("📋 Extracting sections with corrected coordinates...")
         
-        height, width = image.shape[:2]
+        if homography is None:
+            height, width = image.shape[:2]
+        else:
+            width, height = size
         extracted_sections = []
         
-        for section_name, section_info in self.sections_template.items():
-            # Convert relative to absolute coordinates
-            x_ratio, y_ratio, w_ratio, h_ratio = section_info['bbox_ratio']
+        for section_name, section_info, (x, y, w, h) in self.section_regions(width, height):
+            section = LazySection({
+                'id': section_name,
+                'description': section_info['description'],
+                'bbox': (x, y, w, h),
+                'relative_coords': section_info['bbox_ratio']
+            })
             
-            x = int(x_ratio * width)
-            y = int(y_ratio * height)
-            w = int(w_ratio * width)
-            h = int(h_ratio * height)
+            # Section pixels: a view onto the aligned page, or warped from the photo on first use
+            if homography is None:
+                section.set_lazy('image', lambda x=x, y=y, w=w, h=h: image[y:y+h, x:x+w])
+            else:
+                section.set_lazy('image', lambda bbox=(x, y, w, h): warp_section(image, homography, bbox))
             
-            # Add small padding for better extraction (optional)
-            padding = 2
-            x = max(0, x - padding)
-            y = max(0, y - padding)
-            w = min(width - x, w + 2 * padding)
-            h = min(height - y, h + 2 * padding)
+            # Template preprocessing chain for OCR, run and memoized only when OCR or export asks for it
+            section.set_lazy('processed_image', lambda section=section, steps=section_info['preprocess']: run_pipeline(
+                section['image'], steps, defaults={'denoise': {'mode': self.denoise_mode}}))
             
-            # Extract section
-            if w > 10 and h > 10:  # Minimum size check
-                section_image = image[y:y+h, x:x+w].copy()
-                
-                # Enhance section for better OCR
-                if len(section_image.shape) == 3:
-                    section_gray = cv2.cvtColor(section_image, cv2.COLOR_BGR2GRAY)
-                else:
-                    section_gray = section_image
-                
-                # Apply denoising
-                section_denoised = cv2.fastNlMeansDenoising(section_gray)
-                
-                extracted_sections.append({
-                    'id': section_name,
-                    'description': section_info['description'],
-                    'bbox': (x, y, w, h),
-                    'image': section_image,
-                    'processed_image': section_denoised,
-                    'relative_coords': section_info['bbox_ratio']
-                })
-                
-                print(f"  ✓ {section_name}: {w}x{h} at ({x},{y})")
+            extracted_sections.append(section)
+            
+            print(f"  ✓ {section_name}: {w}x{h} at ({x},{y})")
         
         return extracted_sections
     
+    def prepare_ocr_image(self, section: Dict) -> np.ndarray:
+        """
+        Preprocessed section image for OCR (the template's chain, applied at extraction)
+        """
+        return section.get('processed_image', section['image'])
+    
+    def get_ocr_bands(self, section_name: str) -> int:
+        """Number of horizontal bands a section is split into for parallel OCR"""
+        return self.table_bands if self.template.section(section_name)['split_bands'] else 1
+    
     def perform_ocr_enhanced(self, sections: List[Dict]) -> List[Dict]:
         """
         Enhanced OCR with preprocessing for each section type
+        
+        Preprocessing and OCR of all sections run on a thread pool; results
+        are merged back in template order.
         """
         print("🔍 Performing enhanced OCR...")
         
-        for section in sections:
-            try:
-                # Use processed image for OCR
-                img_for_ocr = section.get('processed_image', section['image'])
-                
-                # Section-specific preprocessing
-                if 'table' in section['id']:
-                    # For tables, increase contrast
-                    img_for_ocr = cv2.convertScaleAbs(img_for_ocr, alpha=1.5, beta=0)
-                elif 'signature' in section['id']:
-                    # For signatures, apply threshold
-                    _, img_for_ocr = cv2.threshold(img_for_ocr, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                
-                # Convert to PIL
-                pil_image = Image.fromarray(img_for_ocr)
-                
-                # Perform OCR with appropriate config
-                config = self.get_ocr_config(section['id'])
-                text = pytesseract.image_to_string(pil_image, config=config)
-                
-                section['ocr_text'] = text.strip()
-                section['ocr_length'] = len(section['ocr_text'])
-                section['has_text'] = section['ocr_length'] > 0
-                
-                if section['has_text']:
-                    print(f"  ✓ {section['id']}: {section['ocr_length']} chars extracted")
-                
-            except Exception as e:
-                print(f"  ⚠️ OCR failed for {section['id']}: {e}")
+        jobs = [
+            (lambda section=section: self.prepare_ocr_image(section),
+             self.get_ocr_config(section['id']), self.get_ocr_bands(section['id']))
+            for section in sections
+        ]
+        results = ocr_sections_parallel(jobs, max_workers=self.ocr_workers)
+        
+        for section, text in zip(sections, results):
+            if isinstance(text, Exception):
+                print(f"  ⚠️ OCR failed for {section['id']}: {text}")
                 section['ocr_text'] = ""
                 section['ocr_length'] = 0
                 section['has_text'] = False
+                continue
+            
+            section['ocr_text'] = text.strip()
+            section['ocr_length'] = len(section['ocr_text'])
+            section['has_text'] = section['ocr_length'] > 0
+            
+            if section['has_text']:
+                print(f"  ✓ {section['id']}: {section['ocr_length']} chars extracted")
         
         return sections
     
     def get_ocr_config(self, section_name: str) -> str:
-        """OCR configuration optimized for each section type"""
-        configs = {
-            'main_data_table': '--psm 6 --oem 3',  # Uniform block
-            'date_section': '--psm 8 --oem 3',     # Single word/line
-            'package_info': '--psm 8 --oem 3',     # Single word/line
-            'signatures': '--psm 11 --oem 3',      # Sparse text
-            'default': '--psm 6 --oem 3'           # Default
-        }
-        return configs.get(section_name, configs['default'])
+        """OCR configuration the template assigns to each section type"""
+        return self.template.ocr_config(section_name)
+    
+    def visualization_spec(self, image_path: str, sections: List[Dict], save_path: str) -> Dict:
+        """
+        Compact description of the section overlay image for the renderer
+        """
+        return build_spec(
+            image_path,
+            [{'bbox': section['bbox'], 'label': f"{i+1}. {section['id']}"} for i, section in enumerate(sections)],
+            save_path,
+            f"{len(sections)} sections",
+            renderer='opencv'
+        )
     
     def visualize_extraction(self, image: np.ndarray, sections: List[Dict], save_path: str):
         """
         Create visualization with section overlays
         """
-        vis_image = image.copy()
-        
-        # Define colors for each section
-        colors = [
-            (255, 0, 0), (0, 255, 0), (0, 0, 255), 
-            (255, 255, 0), (255, 0, 255), (0, 255, 255),
-            (128, 0, 128), (255, 128, 0), (0, 128, 255)
-        ]
-        
-        for i, section in enumerate(sections):
-            x, y, w, h = section['bbox']
-            color = colors[i % len(colors)]
-            
-            # Draw rectangle
-            cv2.rectangle(vis_image, (x, y), (x+w, y+h), color, 2)
-            
-            # Add label
-            label = f"{i+1}. {section['id']}"
-            cv2.putText(vis_image, label, (x, y-5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-        
-        cv2.imwrite(save_path, vis_image)
-        print(f"✓ Visualization saved: {save_path}")
+        submit_visualization(self.visualization_spec(None, sections, save_path), 'sync', image=image)
     
-    def process_document(self, input_path: str, output_dir: str) -> Dict:
+    def process_document(self, input_path: str, output_dir: str, save_processed: bool = False,
+                         image: Optional[np.ndarray] = None) -> Dict:
         """
         Main processing pipeline with improved extraction
+        
+        save_processed additionally writes each section's preprocessed OCR input
+        as <id>_processed.png (reusing the image computed for OCR). image is an
+        already decoded page (e.g. from page_source.iter_pages); input_path is
+        then only used as its name.
         """
         print(f"🚀 Processing document: {input_path}")
         
@@ -353,24 +352,32 @@ class ImprovedDocumentExtractor:
         os.makedirs(output_dir, exist_ok=True)
         
         # Load image
-        image = cv2.imread(input_path)
-        if image is None:
-            raise ValueError(f"Could not load image: {input_path}")
+        image = load_image(input_path if image is None else image)
         
         print(f"✓ Image loaded: {image.shape[1]}x{image.shape[0]}")
         
-        # Align document
-        aligned, success = self.align_document(image)
+        # Align document; in 'sections' mode only the homography is computed
+        # and each section is warped straight from the photo
+        if self.warp_mode == 'sections':
+            M, size = self.compute_alignment(image)
+            success = M is not None
+            aligned = None if success else image
+        else:
+            aligned, success = self.align_document(image)
         
         # Extract sections with corrected coordinates
-        sections = self.extract_sections_accurate(aligned)
+        if aligned is None:
+            sections = self.extract_sections_accurate(image, M, size)
+        else:
+            sections = self.extract_sections_accurate(aligned)
         
         # Perform OCR
         sections = self.perform_ocr_enhanced(sections)
         
         # Save aligned image
-        aligned_path = os.path.join(output_dir, "aligned.jpg")
-        cv2.imwrite(aligned_path, aligned)
+        if aligned is not None:
+            aligned_path = os.path.join(output_dir, "aligned.jpg")
+            cv2.imwrite(aligned_path, aligned)
         
         # Save individual sections
         for section in sections:
@@ -378,14 +385,20 @@ class ImprovedDocumentExtractor:
             section_path = os.path.join(output_dir, f"{section['id']}.jpg")
             cv2.imwrite(section_path, section['image'])
             
+            if save_processed:
+                processed_path = os.path.join(output_dir, f"{section['id']}_processed.png")
+                cv2.imwrite(processed_path, section['processed_image'])
+            
             # Save OCR text
             text_path = os.path.join(output_dir, f"{section['id']}.txt")
             with open(text_path, 'w', encoding='utf-8') as f:
                 f.write(section['ocr_text'])
         
-        # Create visualization
-        vis_path = os.path.join(output_dir, "visualization.jpg")
-        self.visualize_extraction(aligned, sections, vis_path)
+        # Create visualization (opt-in, needs the full aligned page)
+        if self.visualize != 'off' and aligned is not None:
+            vis_path = os.path.join(output_dir, "visualization.jpg")
+            spec = self.visualization_spec(aligned_path, sections, vis_path)
+            submit_visualization(spec, self.visualize, image=aligned)
         
         # Create summary
         summary = {
@@ -421,7 +434,7 @@ def main():
     OUTPUT_DIR = "extracted_sections_03"
     
     # Create extractor with original dimensions (better for accuracy)
-    extractor = ImprovedDocumentExtractor(use_original_dimensions=True)
+    extractor = ImprovedDocumentExtractor(use_original_dimensions=True, visualize='thread')
     
     try:
         # Process document
@@ -0,0 +1,94 @@
+# layout_features.py
+# Vectorized contour analysis for the layout detectors: the outer contours
+# of a mask and their per-contour features as NumPy arrays
+
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def contour_features(contours: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Compute bbox, area and perimeter for every contour without a Python loop.
+
+    All contour points are concatenated once and reduced per contour with
+    np.*.reduceat, matching cv2.boundingRect, cv2.contourArea and
+    cv2.arcLength(closed=True).
+    """
+    n = len(contours)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return {
+            'bbox': np.empty((0, 4), dtype=np.int64),
+            'area': np.empty(0, dtype=np.float64),
+            'perimeter': np.empty(0, dtype=np.float64),
+            'num_points': empty,
+        }
+
+    counts = np.fromiter((len(c) for c in contours), dtype=np.int64, count=n)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    x, y = points[:, 0], points[:, 1]
+
+    x_min = np.minimum.reduceat(x, offsets)
+    y_min = np.minimum.reduceat(y, offsets)
+    x_max = np.maximum.reduceat(x, offsets)
+    y_max = np.maximum.reduceat(y, offsets)
+    bbox = np.stack([x_min, y_min, x_max - x_min + 1, y_max - y_min + 1], axis=1)
+
+    # Index of the next point on the same (closed) contour
+    next_idx = np.arange(len(points)) + 1
+    next_idx[offsets + counts - 1] = offsets
+    x_next, y_next = x[next_idx], y[next_idx]
+
+    # Shoelace formula for the enclosed area, segment lengths for the perimeter
+    cross = (x * y_next - x_next * y).astype(np.float64)
+    area = np.abs(np.add.reduceat(cross, offsets)) / 2.0
+    segment_lengths = np.hypot(x_next - x, y_next - y)
+    perimeter = np.add.reduceat(segment_lengths, offsets)
+
+    return {
+        'bbox': bbox,
+        'area': area,
+        'perimeter': perimeter,
+        'num_points': counts,
+    }
+
+
+def approx_vertex_counts(contours: List[np.ndarray], perimeter: np.ndarray,
+                         candidates: np.ndarray, epsilon_ratio: float = 0.02) -> np.ndarray:
+    """
+    Polygon vertex counts from approxPolyDP, computed only for candidate contours.
+
+    Contours outside candidates get -1, so approxPolyDP runs for the few
+    contours a size filter has already let through rather than for all.
+    """
+    vertices = np.full(len(contours), -1, dtype=np.int64)
+    for i in np.flatnonzero(candidates):
+        approx = cv2.approxPolyDP(contours[i], epsilon_ratio * perimeter[i], True)
+        vertices[i] = len(approx)
+    return vertices
+
+
+def analyze_contours(mask: np.ndarray,
+                     vertex_candidate_area: Optional[Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+    """
+    Find the outer contours of mask (RETR_EXTERNAL) and compute their features.
+
+    Returns a dict of equal-length arrays: bbox (x, y, w, h), area, perimeter,
+    num_points and, when vertex_candidate_area is given, vertices
+    (approxPolyDP count for contours whose bbox area is strictly inside the
+    range, -1 otherwise).
+    """
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    features = contour_features(contours)
+
+    if vertex_candidate_area is not None:
+        bbox = features['bbox']
+        bbox_area = bbox[:, 2] * bbox[:, 3]
+        min_area, max_area = vertex_candidate_area
+        candidates = (bbox_area > min_area) & (bbox_area < max_area)
+        features['vertices'] = approx_vertex_counts(contours, features['perimeter'], candidates)
+
+    return features
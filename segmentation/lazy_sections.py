@@ -0,0 +1,52 @@
+# lazy_sections.py
+# Section dicts whose heavy values (crops, preprocessed images) are
+# materialized on demand instead of being held for the whole page
+
+from typing import Any, Callable
+
+
+class LazySection(dict):
+    """
+    A section dict in which selected keys are computed on first access.
+
+    Lazy keys behave like ordinary keys for section['key'], section.get('key')
+    and 'key' in section, but they do not appear in items()/keys() and so stay
+    out of JSON summaries. Memoized values are stored once computed;
+    unmemoized ones (e.g. views onto the page) are rebuilt on every access.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lazy = {}
+
+    def set_lazy(self, key: str, factory: Callable[[], Any], memoize: bool = True) -> None:
+        """Register a factory that produces section[key] when it is first needed."""
+        self._lazy[key] = (factory, memoize)
+        dict.pop(self, key, None)
+
+    def __missing__(self, key):
+        if key not in self._lazy:
+            raise KeyError(key)
+        factory, memoize = self._lazy[key]
+        value = factory()
+        if memoize:
+            self[key] = value
+        return value
+
+    def __contains__(self, key) -> bool:
+        return dict.__contains__(self, key) or key in self._lazy
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def release(self, *keys: str) -> None:
+        """
+        Drop lazy factories and memoized values (all lazy keys if none are given),
+        releasing the page and intermediate images they reference.
+        """
+        for key in keys or list(self._lazy):
+            self._lazy.pop(key, None)
+            dict.pop(self, key, None)
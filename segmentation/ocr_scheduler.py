@@ -0,0 +1,215 @@
+# ocr_scheduler.py
+# asyncio-based scheduler that drives Tesseract as async subprocesses
+# with a concurrency limit, per-cell timeout, retries and cancellation
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import shlex
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from array_ocr import TESSEROCR_AVAILABLE, ocr_array
+
+
+class OCRTimeoutError(Exception):
+    """Raised when a single Tesseract invocation exceeds its timeout."""
+
+
+class AsyncOCRScheduler:
+    """
+    Runs Tesseract invocations concurrently without blocking the event loop.
+
+    A single scheduler can be shared by several jobs: the semaphore bounds the
+    total number of Tesseract processes, so OCR from different exports is
+    interleaved instead of queued behind one long-running page.
+    """
+
+    def __init__(self, tesseract_cmd: str = 'tesseract', max_concurrency: Optional[int] = None,
+                 timeout: float = 10.0, retries: int = 1, lang: Optional[str] = None,
+                 use_array_api: bool = TESSEROCR_AVAILABLE):
+        self.tesseract_cmd = tesseract_cmd
+        # With tesserocr, crops are decoded once and OCR'd in-process on worker
+        # threads instead of spawning one Tesseract process per cell
+        self.use_array_api = use_array_api
+        self._pool = None
+        self.max_concurrency = max_concurrency or os.cpu_count() or 4
+        self.timeout = timeout
+        self.retries = retries
+        self.lang = lang
+        self._semaphore = None
+        self.stats = {'completed': 0, 'failed': 0, 'timeouts': 0, 'retries': 0}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the scheduler can be constructed outside a running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def build_command(self, image_path: str, config: str = '') -> List[str]:
+        """Build the Tesseract command line, mirroring pytesseract's argument order."""
+        cmd = [self.tesseract_cmd, str(image_path), 'stdout']
+        if self.lang:
+            cmd += ['-l', self.lang]
+        cmd += shlex.split(config, posix=not sys.platform.startswith('win'))
+        return cmd
+
+    async def _run_once(self, image_path: str, config: str) -> str:
+        process = await asyncio.create_subprocess_exec(
+            *self.build_command(image_path, config),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise OCRTimeoutError(f"Tesseract timed out after {self.timeout}s on {image_path}")
+        except asyncio.CancelledError:
+            # Never leave orphaned Tesseract processes behind a cancelled job
+            process.kill()
+            await process.wait()
+            raise
+
+        if process.returncode != 0:
+            message = stderr.decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f"Tesseract exited with {process.returncode}: {message}")
+
+        return stdout.decode('utf-8', errors='replace').strip()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """Threads for the raw-buffer API, one per concurrency slot."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='ocr')
+        return self._pool
+
+    def close(self):
+        """Stop the OCR threads; queued calls are cancelled, running ones finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run_in_process(self, image, config: str) -> str:
+        """
+        OCR a path or array on a worker thread through the raw-buffer API.
+
+        The call holds its concurrency slot until the thread finishes, even
+        after a timeout: a running Tesseract call cannot be killed like a
+        subprocess, so the caller stops waiting but the slot stays taken and
+        no more than max_concurrency OCR threads ever run.
+        """
+        def work():
+            array = image
+            if not isinstance(array, np.ndarray):
+                import cv2
+                array = cv2.imread(str(image), cv2.IMREAD_GRAYSCALE)
+                if array is None:
+                    raise RuntimeError(f"Could not read image: {image}")
+            return ocr_array(array, config=config, lang=self.lang or 'eng')
+
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphore
+        await semaphore.acquire()
+        try:
+            future = self.pool.submit(work)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_):
+            # Runs on the OCR thread (or here, if the call was cancelled before it started)
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # event loop already closed
+
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise OCRTimeoutError(f"OCR timed out after {self.timeout}s")
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    async def _limited(self, run) -> str:
+        async with self.semaphore:
+            return await run()
+
+    async def _with_retries(self, label: str, run, retry_run=None) -> str:
+        """
+        Await run() under the concurrency limit, retrying on timeout or failure.
+
+        run takes its own concurrency slot (see _run_in_process). After a
+        timeout, retries use retry_run when given. Returns an empty string once
+        all attempts are exhausted so that one bad cell never aborts the
+        surrounding table.
+        """
+        timed_out = False
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self.stats['retries'] += 1
+            try:
+                text = await (retry_run if timed_out and retry_run else run)()
+                self.stats['completed'] += 1
+                return text
+            except OCRTimeoutError as e:
+                timed_out = True
+                self.stats['timeouts'] += 1
+                print(f"  ⏱️ {e} (attempt {attempt + 1}/{self.retries + 1})", file=sys.stderr)
+            except (OSError, RuntimeError) as e:
+                print(f"  ⚠️ OCR failed on {label}: {e} (attempt {attempt + 1}/{self.retries + 1})",
+                      file=sys.stderr)
+
+        self.stats['failed'] += 1
+        return ""
+
+    async def ocr_image(self, image: np.ndarray, config: str = '') -> str:
+        """OCR a NumPy array under the same concurrency limit and timeout as files."""
+        return await self._with_retries('array', lambda: self._run_in_process(image, config))
+
+    async def ocr_file(self, image_path: str, config: str = '') -> str:
+        """
+        OCR one image file, retrying on timeout or failure.
+
+        With the raw-buffer API, a cell that timed out is retried as a
+        Tesseract subprocess, which is killed if it overruns again.
+        """
+        subprocess_run = lambda: self._limited(lambda: self._run_once(image_path, config))
+        if self.use_array_api:
+            return await self._with_retries(image_path, lambda: self._run_in_process(image_path, config),
+                                            retry_run=subprocess_run)
+        return await self._with_retries(image_path, subprocess_run)
+
+    async def ocr_many(self, jobs: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        OCR many (image_path, config) pairs concurrently.
+
+        Returns a dict mapping image path to text. If the awaiting task is
+        cancelled, all outstanding Tesseract processes are cancelled with it.
+        """
+        jobs = list(jobs)
+        tasks = [asyncio.ensure_future(self.ocr_file(path, config)) for path, config in jobs]
+        try:
+            results = await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return {str(path): text for (path, _), text in zip(jobs, results)}
+
+
+def run_ocr_batch(jobs: Iterable[Tuple[str, str]], **scheduler_kwargs) -> Dict[str, str]:
+    """Synchronous entry point: OCR all jobs on a private event loop."""
+    scheduler = AsyncOCRScheduler(**scheduler_kwargs)
+    try:
+        return asyncio.run(scheduler.ocr_many(jobs))
+    finally:
+        scheduler.close()
@@ -0,0 +1,148 @@
+# page_cache.py
+# Local cache of decoded pages and segment crops shared by the Segmentation
+# Studio stages: segment.py stores raw BGR arrays as .npy files keyed by
+# upload ID, and workflow.py memory-maps them instead of re-decoding the
+# recompressed segment JPEG (no decode time, no JPEG generation loss before OCR).
+#
+# Layout: <root>/<upload_id>/<segment_id>.npy (+ .json with the source file's
+#         signature); pages only when asked for: <root>/<upload_id>/page.npy
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+# Overridable so the backend can put the cache next to its uploads
+CACHE_ROOT_ENV = 'FIELDVIZ_PAGE_CACHE'
+DEFAULT_CACHE_ROOT = os.path.join(tempfile.gettempdir(), 'fieldviz_page_cache')
+
+# Uploads are exported within minutes; older entries are removed on the next store
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def safe_key(key: str) -> str:
+    """
+    A cache key as a single path component. Percent-encoding keeps distinct
+    keys distinct ("a/b" and "a_b" differ) and leaves no "." or "/".
+    """
+    key = str(key)
+    if not key:
+        raise ValueError("Empty cache key")
+    return quote(key, safe='-_').replace('.', '%2E')
+
+
+def split_key(cache_key: str) -> Tuple[str, str]:
+    """Split an "<upload_id>/<name>" key as returned by PageCache.store() into the original parts."""
+    upload_id, sep, name = cache_key.partition('/')
+    if not sep or not upload_id or not name:
+        raise ValueError(f"Invalid cache key: {cache_key}")
+    return unquote(upload_id), unquote(name)
+
+
+def source_signature(path: str) -> Dict:
+    """Identity of a file for cache validation: absolute path, size and mtime."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class PageCache:
+    """
+    Raw page and segment arrays on local disk, opened as read-only memory maps.
+
+    Entries are written to a temporary file and renamed into place, so a
+    reader in another process never sees a partial array. Arrays returned by
+    load() are np.memmap views of the file: nothing is read until pixels are
+    touched, and pages shared by several readers share the OS page cache.
+
+    An entry stored with a source file is only returned while that file is
+    unchanged (same path, size and mtime), so a reused upload ID or an
+    edited file never yields a stale array.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.root = root or os.environ.get(CACHE_ROOT_ENV) or DEFAULT_CACHE_ROOT
+        self.ttl_seconds = ttl_seconds
+
+    def path(self, upload_id: str, name: str) -> str:
+        return os.path.join(self.root, safe_key(upload_id), f"{safe_key(name)}.npy")
+
+    def _write_atomic(self, path: str, write):
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def store(self, upload_id: str, name: str, array: np.ndarray, source: Optional[str] = None) -> str:
+        """
+        Write array under upload_id/name and return its cache key.
+
+        source: file the array was decoded from or written to; load() then
+        checks the file is unchanged.
+        """
+        path = self.path(upload_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta_path = os.path.splitext(path)[0] + '.json'
+        if source is not None:
+            meta = json.dumps(source_signature(source)).encode('utf-8')
+            self._write_atomic(meta_path, lambda f: f.write(meta))
+        elif os.path.exists(meta_path):
+            os.remove(meta_path)
+        self._write_atomic(path, lambda f: np.save(f, np.ascontiguousarray(array)))
+        return f"{safe_key(upload_id)}/{safe_key(name)}"
+
+    def load(self, upload_id: str, name: str, source: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Memory-map a cached array (read-only), or None if it is not cached.
+
+        With source, the entry must have been stored for that file and the
+        file must be unchanged since; otherwise the entry is a miss.
+        """
+        path = self.path(upload_id, name)
+        if not os.path.exists(path):
+            return None
+        if source is not None:
+            try:
+                with open(os.path.splitext(path)[0] + '.json', encoding='utf-8') as f:
+                    if json.load(f) != source_signature(source):
+                        return None
+            except (OSError, ValueError):
+                return None
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            # Truncated or foreign file: treat as a miss
+            return None
+
+    def load_key(self, cache_key: str, source: Optional[str] = None) -> Optional[np.ndarray]:
+        upload_id, name = split_key(cache_key)
+        return self.load(upload_id, name, source)
+
+    def drop(self, upload_id: str):
+        """Remove everything cached for one upload."""
+        shutil.rmtree(os.path.join(self.root, safe_key(upload_id)), ignore_errors=True)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Remove uploads not written to within ttl_seconds; returns how many were removed."""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        for entry in os.scandir(self.root):
+            try:
+                expired = entry.is_dir() and entry.stat().st_mtime < cutoff
+            except OSError:
+                continue
+            if expired:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
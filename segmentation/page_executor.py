@@ -0,0 +1,105 @@
+# page_executor.py
+# Page-parallel scheduling of multi-page documents onto an executor: pages are
+# fanned out round-robin across documents, with an optional per-document limit
+# on pages in flight, and results are handed back in page order
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class DocumentProgress:
+    """Scheduling and reordering state for one document."""
+
+    def __init__(self, document: str, page_count: int):
+        self.document = document
+        self.page_count = page_count
+        self.next_submit = 0      # next page to hand to the executor
+        self.next_emit = 0        # next page to hand back to the caller
+        self.in_flight = 0
+        self.finished: Dict[int, Any] = {}
+
+    @property
+    def pending(self) -> bool:
+        return self.next_submit < self.page_count
+
+    def pop_ready(self) -> List[Tuple[int, Any]]:
+        """Finished pages that continue the document's page order."""
+        ready = []
+        while self.next_emit in self.finished:
+            ready.append((self.next_emit, self.finished.pop(self.next_emit)))
+            self.next_emit += 1
+        return ready
+
+
+class PageExecutor:
+    """
+    Run fn(document, page) for every page of several documents on an executor.
+
+    Pages are submitted round-robin across documents, so a long upload gets
+    no more turns than a short one; max_per_document additionally caps the
+    pages of one document in flight at a time. At most max_in_flight pages
+    are queued on the executor (default: its worker count) so the fairness
+    decisions are made here rather than in the executor's FIFO queue.
+
+    Results come back per document in page order even when pages finish out
+    of order: a page is yielded once all earlier pages of its document are done.
+    """
+
+    def __init__(self, executor: Executor, fn: Callable[[str, int], Any], max_in_flight: int,
+                 max_per_document: Optional[int] = None,
+                 on_error: Optional[Callable[[str, int, Exception], Any]] = None):
+        if max_per_document is not None and max_per_document < 1:
+            # No page could ever be submitted
+            raise ValueError(f"max_per_document must be at least 1, got {max_per_document}")
+        self.executor = executor
+        self.fn = fn
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_per_document = max_per_document
+        # Turns an executor-level failure (e.g. a killed worker) into a result
+        self.on_error = on_error
+
+    def _can_submit(self, progress: DocumentProgress) -> bool:
+        if not progress.pending:
+            return False
+        return self.max_per_document is None or progress.in_flight < self.max_per_document
+
+    def map(self, documents: Sequence[Tuple[str, int]]) -> Iterator[Tuple[str, int, Any]]:
+        """
+        Process (document, page count) pairs, yielding (document, page, result).
+
+        Pages are 0-based; each document's pages are yielded in order.
+        """
+        progress = [DocumentProgress(document, count) for document, count in documents]
+        rotation = deque(p for p in progress if p.pending)
+        futures: Dict[Future, Tuple[DocumentProgress, int]] = {}
+
+        while rotation or futures:
+            # Fill free slots, one page per document per turn
+            blocked = 0
+            while rotation and len(futures) < self.max_in_flight and blocked < len(rotation):
+                doc = rotation[0]
+                rotation.rotate(-1)
+                if not self._can_submit(doc):
+                    blocked += 1
+                    continue
+                blocked = 0
+                page = doc.next_submit
+                doc.next_submit += 1
+                doc.in_flight += 1
+                futures[self.executor.submit(self.fn, doc.document, page)] = (doc, page)
+                if not doc.pending:
+                    rotation.remove(doc)
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                doc, page = futures.pop(future)
+                doc.in_flight -= 1
+                try:
+                    doc.finished[page] = future.result()
+                except Exception as e:
+                    if self.on_error is None:
+                        raise
+                    doc.finished[page] = self.on_error(doc.document, page, e)
+                for ready_page, result in doc.pop_ready():
+                    yield doc.document, ready_page, result
@@ -0,0 +1,319 @@
+# page_source.py
+# Page sources: single images, multi-page TIFFs and PDFs yielded one page at
+# a time as BGR arrays. PDF pages are rasterized lazily with pdfium (pypdfium2,
+# no external service) and the next page is prepared on a background thread
+# while the caller processes the current one, so memory stays at a few pages
+# regardless of document length.
+
+import importlib.util
+import os
+import queue
+import threading
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+# pypdfium2 is imported on the first PDF, keeping it off the entry points' startup path
+PDFIUM_AVAILABLE = importlib.util.find_spec('pypdfium2') is not None
+
+# Rasterization resolution for PDF pages; the scans are ~200 dpi
+DEFAULT_DPI = 200
+PDF_POINTS_PER_INCH = 72
+
+# Reduced decodes keep at least this long side, ample for the detectors (YOLO imgsz 640)
+REDUCED_MIN_SIDE = 1280
+# cv2 decodes JPEGs at 1/2, 1/4 or 1/8 scale directly in the DCT domain
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+# EXIF orientations that swap width and height (cv2.imread applies them)
+EXIF_TRANSPOSED = (5, 6, 7, 8)
+
+PDF_EXTENSIONS = ('.pdf',)
+TIFF_EXTENSIONS = ('.tif', '.tiff')
+DOCUMENT_EXTENSIONS = PDF_EXTENSIONS + TIFF_EXTENSIONS
+
+
+class Page(NamedTuple):
+    """One page of a source document."""
+    index: int          # 0-based page number
+    count: int          # pages in the document
+    image: np.ndarray   # BGR
+    source: str         # path of the document
+
+    @property
+    def name(self) -> str:
+        """File-safe page name: the document stem, with _p0001 etc. for multi-page documents."""
+        stem = os.path.splitext(os.path.basename(self.source))[0]
+        return stem if self.count == 1 else f"{stem}_p{self.index + 1:04d}"
+
+
+class _ProducerError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_DONE = object()
+
+
+def is_pdf(path: str) -> bool:
+    return path.lower().endswith(PDF_EXTENSIONS)
+
+
+def require_pdfium():
+    """The pypdfium2 module, imported on first use."""
+    if not PDFIUM_AVAILABLE:
+        raise ImportError("pypdfium2 is required to read PDF files: pip install pypdfium2")
+    import pypdfium2
+    return pypdfium2
+
+
+def page_count(path: str) -> int:
+    """Number of pages in an image, multi-page TIFF or PDF."""
+    if is_pdf(path):
+        pdf = require_pdfium().PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if path.lower().endswith(TIFF_EXTENSIONS):
+        return max(1, cv2.imcount(path))
+    return 1
+
+
+def load_image(image: Union[str, np.ndarray]) -> np.ndarray:
+    """The page as a BGR array: arrays pass through, paths are decoded."""
+    if isinstance(image, np.ndarray):
+        return image
+    loaded = cv2.imread(str(image))
+    if loaded is None:
+        raise ValueError(f"Could not load image: {image}")
+    return loaded
+
+
+def _render_pdf_pages(path: str, dpi: int, first: int, last: int) -> Iterator[np.ndarray]:
+    """
+    Rasterize PDF pages first..last-1 at dpi. pdfium is not thread-safe, so
+    the document is opened, rendered and closed on the one thread iterating
+    this generator (the prefetch thread when prefetching).
+    """
+    pdf = require_pdfium().PdfDocument(path)
+    try:
+        for index in range(first, last):
+            page = pdf[index]
+            try:
+                bitmap = page.render(scale=dpi / PDF_POINTS_PER_INCH)
+                # Copy out of pdfium's buffer before the bitmap is released
+                image = np.array(bitmap.to_numpy()[:, :, :3])
+                bitmap.close()
+            finally:
+                page.close()
+            yield image
+    finally:
+        pdf.close()
+
+
+def _read_tiff_pages(path: str, first: int, last: int) -> Iterator[np.ndarray]:
+    for index in range(first, last):
+        ok, images = cv2.imreadmulti(path, start=index, count=1)
+        if not ok or not images:
+            raise ValueError(f"Could not read page {index + 1} of {path}")
+        image = images[0]
+        yield cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+
+
+def _prefetched(produce: Callable[[], Iterator[np.ndarray]], prefetch: int) -> Iterator[np.ndarray]:
+    """
+    Run a page generator on a background thread, at most prefetch pages ahead.
+
+    Stopping early (break, exception, close()) signals the producer, which
+    then closes its generator and releases the document.
+    """
+    pages = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        generator = produce()
+        try:
+            for image in generator:
+                if not put(image):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            generator.close()
+
+    thread = threading.Thread(target=run, name='page-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_pages(path: str, dpi: int = DEFAULT_DPI, prefetch: int = 1,
+               first: int = 0, last: Optional[int] = None) -> Iterator[Page]:
+    """
+    Yield the pages of an image, multi-page TIFF or PDF one at a time.
+
+    Args:
+        path: Document or image path
+        dpi: Rasterization resolution for PDF pages
+        prefetch: Pages decoded ahead on a background thread (0 decodes inline)
+        first, last: Optional 0-based page range [first, last)
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file not found: {path}")
+
+    count = page_count(path)
+    last = count if last is None else min(last, count)
+
+    if is_pdf(path):
+        produce = lambda: _render_pdf_pages(path, dpi, first, last)
+    elif path.lower().endswith(TIFF_EXTENSIONS) and count > 1:
+        produce = lambda: _read_tiff_pages(path, first, last)
+    else:
+        produce = lambda: (load_image(path) for _ in range(first, min(last, 1)))
+
+    images = _prefetched(produce, prefetch) if prefetch > 0 else produce()
+    try:
+        for index, image in enumerate(images, first):
+            yield Page(index, count, image, path)
+    finally:
+        images.close()
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """
+    (width, height) of an image file as cv2.imread returns it, read from the
+    header without decoding pixels.
+    """
+    from PIL import Image
+    with Image.open(path) as image:
+        width, height = image.size
+        orientation = image.getexif().get(0x0112, 1)
+    return (height, width) if orientation in EXIF_TRANSPOSED else (width, height)
+
+
+def reduction_factor(width: int, height: int, min_side: int = REDUCED_MIN_SIDE) -> int:
+    """Largest supported decode reduction that keeps the long side at least min_side."""
+    for factor in REDUCED_DECODE_FLAGS:
+        if max(width, height) // factor >= min_side:
+            return factor
+    return 1
+
+
+class DualResolutionImage:
+    """
+    A page with a cheap reduced-resolution view for detection and a
+    full-resolution view that is only decoded when a crop is requested.
+
+    From a file, the reduced view is decoded directly at 1/2, 1/4 or 1/8
+    scale (JPEG DCT scaling via IMREAD_REDUCED_*), keeping the long side at
+    least min_side. The full decode happens once, on the first crop(), and
+    crops are views of it. An already decoded array (e.g. a PDF page) is used
+    as the full view and resized for the reduced one.
+
+    Box coordinates passed to crop() and returned by to_full() are in
+    full-resolution pixels.
+    """
+
+    def __init__(self, source: Union[str, np.ndarray], min_side: int = REDUCED_MIN_SIDE):
+        self.min_side = min_side
+        if isinstance(source, np.ndarray):
+            self.path = None
+            self._full = source
+            height, width = source.shape[:2]
+        else:
+            self.path = str(source)
+            self._full = None
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"Input file not found: {self.path}")
+            try:
+                width, height = image_size(self.path)
+            except Exception:
+                # Not readable by PIL (e.g. an unusual TIFF): decode once at full size
+                self._full = load_image(self.path)
+                height, width = self._full.shape[:2]
+        self.width, self.height = width, height
+        self.factor = reduction_factor(width, height, min_side)
+        self._reduced = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def reduced(self) -> np.ndarray:
+        """The page at 1/factor scale, for detection and previews."""
+        if self._reduced is None:
+            if self.factor == 1:
+                self._reduced = self.full
+            elif self._full is not None:
+                size = (-(-self.width // self.factor), -(-self.height // self.factor))
+                self._reduced = cv2.resize(self._full, size, interpolation=cv2.INTER_AREA)
+            else:
+                self._reduced = cv2.imread(self.path, REDUCED_DECODE_FLAGS[self.factor])
+                if self._reduced is None:
+                    raise ValueError(f"Could not load image: {self.path}")
+        return self._reduced
+
+    @property
+    def full(self) -> np.ndarray:
+        """The page at full resolution, decoded on first use."""
+        if self._full is None:
+            self._full = load_image(self.path)
+        return self._full
+
+    @property
+    def full_loaded(self) -> bool:
+        return self._full is not None
+
+    def scale(self) -> Tuple[float, float]:
+        """(x, y) factors mapping full-resolution pixels to reduced ones."""
+        reduced_h, reduced_w = self.reduced.shape[:2]
+        return reduced_w / self.width, reduced_h / self.height
+
+    def to_full(self, box: Sequence[float]) -> List[int]:
+        """An (x1, y1, x2, y2) box in reduced pixels, in full-resolution pixels."""
+        sx, sy = self.scale()
+        x1, y1, x2, y2 = box
+        return [int(round(x1 / sx)), int(round(y1 / sy)), int(round(x2 / sx)), int(round(y2 / sy))]
+
+    def to_reduced(self, box: Sequence[float]) -> List[int]:
+        """An (x1, y1, x2, y2) box in full-resolution pixels, in reduced pixels."""
+        sx, sy = self.scale()
+        x1, y1, x2, y2 = box
+        return [int(round(x1 * sx)), int(round(y1 * sy)), int(round(x2 * sx)), int(round(y2 * sy))]
+
+    def crop(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """Full-resolution region (a view), clipped to the page."""
+        x1, x2 = max(0, x1), min(self.width, x2)
+        y1, y2 = max(0, y1), min(self.height, y2)
+        return self.full[y1:y2, x1:x2]
+
+    def release(self):
+        """Drop both decoded views; they are decoded again if used."""
+        if self.path is not None:
+            self._full = None
+        self._reduced = None
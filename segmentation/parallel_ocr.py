@@ -0,0 +1,124 @@
+# parallel_ocr.py
+# Thread-pooled OCR of page sections, with optional horizontal band split
+# for tall sections such as the main data table
+
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from array_ocr import ocr_array
+
+# (image or zero-argument callable producing it, tesseract config, number of bands)
+OCRJob = Tuple[Union[np.ndarray, Callable[[], np.ndarray]], str, int]
+
+# One pool per worker count, kept for the life of the process (the resident
+# batch workers OCR page after page on the same threads)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(max_workers: int) -> ThreadPoolExecutor:
+    """The shared OCR thread pool with max_workers threads."""
+    with _pools_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='section-ocr')
+        return pool
+
+
+def shutdown_pools():
+    """Shut down the shared OCR pools (called at interpreter exit)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+atexit.register(shutdown_pools)
+
+
+def materialize(image: Union[np.ndarray, Callable[[], np.ndarray]]) -> np.ndarray:
+    """The job's image, running its preprocessing callable if it has one."""
+    return image() if callable(image) else image
+
+
+def band_cuts(image: np.ndarray, bands: int, search_ratio: float = 0.25) -> List[int]:
+    """
+    Row indices splitting an image into roughly equal horizontal bands.
+
+    Each cut is moved to the row with the least ink within search_ratio of a
+    band height around its nominal position, so cuts fall between text lines
+    rather than through them.
+    """
+    h = image.shape[0]
+    if bands <= 1 or h < bands:
+        return [0, h]
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    ink = (255 - gray.astype(np.float32)).sum(axis=1)
+
+    band_height = h / bands
+    search = max(1, int(band_height * search_ratio))
+    cuts = [0]
+    for i in range(1, bands):
+        nominal = int(round(i * band_height))
+        lo, hi = max(cuts[-1] + 1, nominal - search), min(h - 1, nominal + search)
+        cuts.append(lo + int(np.argmin(ink[lo:hi + 1])) if hi >= lo else nominal)
+    cuts.append(h)
+    return cuts
+
+
+def split_into_bands(image: np.ndarray, bands: int, min_band_height: int = 64) -> List[np.ndarray]:
+    """Horizontal bands of an image (views), no thinner than min_band_height."""
+    bands = max(1, min(bands, image.shape[0] // max(1, min_band_height)))
+    cuts = band_cuts(image, bands)
+    return [image[top:bottom] for top, bottom in zip(cuts[:-1], cuts[1:])]
+
+
+def ocr_sections_parallel(jobs: Sequence[OCRJob], max_workers: Optional[int] = None,
+                          ocr_fn: Callable[..., str] = ocr_array) -> List[Union[str, Exception]]:
+    """
+    OCR a list of section jobs on the shared thread pool, returning results in job order.
+
+    Tesseract runs outside the GIL (as a subprocess for pytesseract, or in
+    native code for tesserocr), so the sections are recognized concurrently.
+    A job's image may be a callable, in which case its preprocessing runs on
+    the pool as well. Jobs with bands > 1 are split into horizontal bands that
+    are OCR'd in parallel and joined in reading order.
+
+    Returns:
+        list with the recognized text, or the exception raised, for each job
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    results: List[Union[str, Exception]] = [""] * len(jobs)
+
+    pool = get_pool(max_workers)
+    prepared = [pool.submit(materialize, image) for image, _, _ in jobs]
+
+    # Second stage: one OCR task per band, submitted once its image is ready
+    band_futures = []
+    for index, ((_, config, bands), future) in enumerate(zip(jobs, prepared)):
+        try:
+            image = future.result()
+        except Exception as e:
+            results[index] = e
+            band_futures.append([])
+            continue
+        parts = split_into_bands(image, bands) if bands > 1 else [image]
+        band_futures.append([pool.submit(ocr_fn, part, config=config) for part in parts])
+
+    for index, futures in enumerate(band_futures):
+        if not futures:
+            continue
+        try:
+            results[index] = "\n".join(f.result().strip() for f in futures)
+        except Exception as e:
+            results[index] = e
+
+    return results
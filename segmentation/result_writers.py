@@ -0,0 +1,209 @@
+# result_writers.py
+# Pluggable writers for extracted table cells: one record per cell with its
+# page, column and row indices, OCR value, the row detector's confidence
+# (row_confidence) and the row bbox. JSON lines
+# are flushed cell by cell; Parquet and Arrow IPC files are written in
+# record batches with pyarrow (optional dependency, imported on first use).
+#
+# Record: {"page": 1, "column": 3, "row": 7, "value": "12.5",
+#          "row_confidence": 0.91, "bbox": [x1, y1, x2, y2]}
+
+import importlib.util
+import json
+import os
+from typing import Dict, Iterable, List, Sequence
+
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+CELL_FIELDS = ('page', 'column', 'row', 'value', 'row_confidence', 'bbox')
+
+
+def require_pyarrow():
+    """The pyarrow module, imported on first use."""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet/Arrow output: pip install pyarrow")
+    import pyarrow
+    return pyarrow
+
+
+def cell_record(cell: Dict) -> Dict:
+    """The writer fields of a cell dict; missing fields are None."""
+    record = {field: cell.get(field) for field in CELL_FIELDS}
+    if record['bbox'] is not None:
+        record['bbox'] = [int(v) for v in record['bbox']]
+    return record
+
+
+class ResultWriter:
+    """
+    Base class: write(cell) appends one cell, close() finishes the file.
+
+    Writers are context managers; the output path is known up front.
+    """
+
+    extension = ''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+
+    def write(self, cell: Dict):
+        raise NotImplementedError
+
+    def write_many(self, cells: Iterable[Dict]):
+        for cell in cells:
+            self.write(cell)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JSONLinesWriter(ResultWriter):
+    """One JSON object per line, flushed per cell so readers can tail the file."""
+
+    extension = '.jsonl'
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, cell: Dict):
+        self._file.write(json.dumps(cell_record(cell), ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ArrowWriter(ResultWriter):
+    """
+    Columnar output: Parquet (format='parquet') or an Arrow IPC file
+    (format='arrow', readable with pyarrow.ipc / pandas.read_feather).
+
+    Cells are buffered and written as record batches of batch_size rows.
+    """
+
+    def __init__(self, path: str, format: str = 'parquet', batch_size: int = 1024):
+        super().__init__(path)
+        pa = require_pyarrow()
+        self.format = format
+        self.batch_size = batch_size
+        self.schema = pa.schema([
+            ('page', pa.int32()),
+            ('column', pa.int32()),
+            ('row', pa.int32()),
+            ('value', pa.string()),
+            ('row_confidence', pa.float32()),
+            ('bbox', pa.list_(pa.int32(), 4)),
+        ])
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema)
+        elif format == 'arrow':
+            import pyarrow.ipc
+            self._writer = pa.ipc.new_file(path, self.schema)
+        else:
+            raise ValueError(f"Unknown columnar format '{format}', expected 'parquet' or 'arrow'")
+        self._rows: List[Dict] = []
+
+    def write(self, cell: Dict):
+        self._rows.append(cell_record(cell))
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        pa = require_pyarrow()
+        batch = pa.RecordBatch.from_pylist(self._rows, schema=self.schema)
+        if self.format == 'parquet':
+            # One row group per batch
+            self._writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+        self._rows = []
+
+    def close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+class ParquetWriter(ArrowWriter):
+    extension = '.parquet'
+
+    def __init__(self, path: str, batch_size: int = 1024):
+        super().__init__(path, 'parquet', batch_size)
+
+
+class ArrowFileWriter(ArrowWriter):
+    extension = '.arrow'
+
+    def __init__(self, path: str, batch_size: int = 1024):
+        super().__init__(path, 'arrow', batch_size)
+
+
+# Format name -> writer class; register additional formats here
+WRITERS = {
+    'jsonl': JSONLinesWriter,
+    'parquet': ParquetWriter,
+    'arrow': ArrowFileWriter,
+}
+
+
+def open_writers(formats: Sequence[str], output_dir: str, name: str = 'table_data') -> Dict[str, ResultWriter]:
+    """
+    Open a writer per format as <output_dir>/<name><extension>.
+
+    Unknown formats raise ValueError before any file is created.
+    """
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown result format(s) {unknown}, expected one of {sorted(WRITERS)}")
+    writers = {}
+    try:
+        for fmt in formats:
+            cls = WRITERS[fmt]
+            writers[fmt] = cls(os.path.join(output_dir, f"{name}{cls.extension}"))
+    except Exception:
+        for writer in writers.values():
+            writer.close()
+        raise
+    return writers
+
+
+def write_cells(cells: Iterable[Dict], formats: Sequence[str], output_dir: str,
+                name: str = 'table_data') -> Dict[str, str]:
+    """Write cells in every format and return {format: path}."""
+    writers = open_writers(formats, output_dir, name)
+    try:
+        for cell in cells:
+            for writer in writers.values():
+                writer.write(cell)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {fmt: writer.path for fmt, writer in writers.items()}
+
+
+def read_cells(path: str) -> List[Dict]:
+    """Read cell records back from a .jsonl, .parquet or .arrow file."""
+    if path.endswith(JSONLinesWriter.extension):
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    pa = require_pyarrow()
+    if path.endswith(ParquetWriter.extension):
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pylist()
+    import pyarrow.ipc
+    return pa.ipc.open_file(path).read_all().to_pylist()
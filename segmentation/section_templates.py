@@ -0,0 +1,202 @@
+# section_templates.py
+# Data-driven section templates: layouts are loaded from JSON/YAML files and
+# compiled once per page size into pixel ROIs, OCR configs and preprocessing chains
+#
+# Template file format (JSON shown; YAML has the same structure):
+#   {
+#     "name": "operational_log",
+#     "padding": 2,                      # pixels added around every section
+#     "min_size": 10,                    # sections must be larger than this (w and h)
+#     "default_ocr_config": "--psm 6",
+#     "sections": [
+#       {"id": "main_data_table", "description": "...", "bbox_ratio": [x, y, w, h],
+#        "ocr_config": "--psm 6", "split_bands": true,
+#        "preprocess": ["grayscale", "denoise", {"op": "contrast", "alpha": 1.5}]}
+#     ]
+#   }
+
+import json
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from denoise import denoise
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Compiled ROIs kept per template, one entry per distinct page size
+MAX_COMPILED_SIZES = 32
+
+
+def to_grayscale(image: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+def stretch_contrast(image: np.ndarray, alpha: float = 1.0, beta: float = 0.0) -> np.ndarray:
+    return cv2.convertScaleAbs(image, alpha=alpha, beta=beta)
+
+
+def otsu_threshold(image: np.ndarray) -> np.ndarray:
+    _, binary = cv2.threshold(to_grayscale(image), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+PREPROCESSING_OPS: Dict[str, Callable[..., np.ndarray]] = {
+    'grayscale': to_grayscale,
+    'denoise': lambda image, mode='nlmeans', **kwargs: denoise(image, mode, **kwargs),
+    'contrast': stretch_contrast,
+    'otsu': otsu_threshold,
+}
+
+# A compiled preprocessing step: (op name, function, parameters from the template)
+PipelineStep = Tuple[str, Callable[..., np.ndarray], Dict]
+
+
+def compile_pipeline(steps: List) -> List[PipelineStep]:
+    """
+    Resolve a template's preprocessing list ("op" or {"op": ..., **params}) to functions.
+    """
+    pipeline = []
+    for step in steps or []:
+        if isinstance(step, str):
+            name, params = step, {}
+        else:
+            params = dict(step)
+            name = params.pop('op', None)
+        if name not in PREPROCESSING_OPS:
+            raise ValueError(f"Unknown preprocessing op '{name}', expected one of {tuple(PREPROCESSING_OPS)}")
+        pipeline.append((name, PREPROCESSING_OPS[name], params))
+    return pipeline
+
+
+def run_pipeline(image: np.ndarray, pipeline: List[PipelineStep],
+                 defaults: Optional[Dict[str, Dict]] = None) -> np.ndarray:
+    """
+    Apply a compiled preprocessing pipeline.
+
+    defaults supplies per-op parameters the template leaves open, e.g.
+    {'denoise': {'mode': 'bilateral'}}; template parameters take precedence.
+    """
+    defaults = defaults or {}
+    for name, fn, params in pipeline:
+        image = fn(image, **{**defaults.get(name, {}), **params})
+    return image
+
+
+def load_template_file(path: str) -> Dict:
+    """Read a template specification from a .json, .yaml or .yml file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            if not YAML_AVAILABLE:
+                raise ImportError("PyYAML is required to load YAML templates: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class CompiledTemplate:
+    """
+    A template resolved for one page size.
+
+    rois is an (n, 4) int array of clipped (x, y, w, h) boxes for the sections
+    that are large enough on this page; sections holds their specifications.
+    """
+
+    def __init__(self, sections: List[Dict], rois: np.ndarray, width: int, height: int):
+        self.sections = sections
+        self.rois = rois
+        self.width = width
+        self.height = height
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def __iter__(self) -> Iterator[Tuple[Dict, Tuple[int, int, int, int]]]:
+        for section, roi in zip(self.sections, self.rois):
+            yield section, tuple(int(v) for v in roi)
+
+
+class SectionTemplate:
+    """
+    A section layout loaded from a template file.
+
+    Ratios are converted to pixel ROIs once per page size and memoized, and
+    OCR configs and preprocessing chains are resolved at load time, so each
+    page only slices.
+    """
+
+    def __init__(self, spec: Dict, source: Optional[str] = None):
+        self.source = source
+        self.name = spec.get('name') or (os.path.splitext(os.path.basename(source))[0] if source else 'template')
+        self.padding = int(spec.get('padding', 0))
+        self.min_size = int(spec.get('min_size', 0))
+        default_config = spec.get('default_ocr_config', '--psm 6')
+
+        self.sections = []
+        for entry in spec.get('sections', []):
+            ratio = tuple(float(v) for v in entry['bbox_ratio'])
+            if len(ratio) != 4:
+                raise ValueError(f"Section '{entry.get('id')}' in {self.name}: bbox_ratio needs 4 values")
+            self.sections.append({
+                'id': entry['id'],
+                'description': entry.get('description', entry['id']),
+                'bbox_ratio': ratio,
+                'ocr_config': entry.get('ocr_config', default_config),
+                'split_bands': bool(entry.get('split_bands', False)),
+                'preprocess': compile_pipeline(entry.get('preprocess', [])),
+            })
+        if not self.sections:
+            raise ValueError(f"Template {self.name} defines no sections")
+
+        self._by_id = {section['id']: section for section in self.sections}
+        self._ratios = np.array([section['bbox_ratio'] for section in self.sections], dtype=np.float64)
+        self._compiled = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> 'SectionTemplate':
+        return cls(load_template_file(path), source=path)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def section(self, section_id: str) -> Dict:
+        return self._by_id[section_id]
+
+    def ocr_config(self, section_id: str) -> str:
+        return self._by_id[section_id]['ocr_config']
+
+    def compile(self, width: int, height: int) -> CompiledTemplate:
+        """Pixel ROIs for a width x height aligned page, computed once per size."""
+        key = (int(width), int(height))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            if len(self._compiled) >= MAX_COMPILED_SIZES:
+                self._compiled.clear()
+            compiled = self._compiled[key] = self._compile(*key)
+        return compiled
+
+    def _compile(self, width: int, height: int) -> CompiledTemplate:
+        pixels = (self._ratios * [width, height, width, height]).astype(np.int64)
+        p = self.padding
+
+        x = np.clip(pixels[:, 0] - p, 0, width - 1)
+        y = np.clip(pixels[:, 1] - p, 0, height - 1)
+        w = np.minimum(width - x, pixels[:, 2] + 2 * p)
+        h = np.minimum(height - y, pixels[:, 3] + 2 * p)
+
+        keep = (w > self.min_size) & (h > self.min_size)
+        rois = np.stack([x, y, w, h], axis=1)[keep]
+        sections = [section for section, kept in zip(self.sections, keep) if kept]
+        return CompiledTemplate(sections, rois, width, height)
+
+
+def template_path(name: str) -> str:
+    """Path of a bundled template in the templates/ directory."""
+    return os.path.join(TEMPLATES_DIR, name)
@@ -0,0 +1,299 @@
+# template_registry.py
+# On-disk template registry with precomputed alignment features
+#
+# Layout of a registry directory:
+#   <root>/<template_name>/template.json    regions, reference size, feature settings
+#   <root>/<template_name>/keypoints.npy    float32 (n, 6): x, y, size, angle, response, octave
+#   <root>/<template_name>/descriptors.npy  uint8 (n, d) binary descriptors
+#   <root>/<template_name>/global.npy       float32 compact global layout descriptor
+#   <root>/global_index.npz                 all global descriptors stacked, for identification
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+FEATURE_TYPES = ('orb', 'akaze')
+
+
+def create_feature_detector(feature_type: str = 'orb', max_features: int = 2000):
+    """Create an ORB or AKAZE detector; both produce binary (Hamming) descriptors."""
+    if feature_type == 'orb':
+        return cv2.ORB_create(nfeatures=max_features)
+    if feature_type == 'akaze':
+        return cv2.AKAZE_create()
+    raise ValueError(f"Unknown feature type '{feature_type}', expected one of {FEATURE_TYPES}")
+
+
+def compute_features(gray: np.ndarray, detector) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Detect keypoints and descriptors on a grayscale image.
+
+    Returns:
+        tuple: (float32 (n, 6) keypoint array, uint8 descriptor array)
+    """
+    keypoints, descriptors = detector.detectAndCompute(gray, None)
+    if descriptors is None or not keypoints:
+        return np.empty((0, 6), dtype=np.float32), np.empty((0, 32), dtype=np.uint8)
+
+    packed = np.array(
+        [(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave) for kp in keypoints],
+        dtype=np.float32
+    )
+    return packed, descriptors
+
+
+def global_descriptor(gray: np.ndarray, thumbnail_size: Tuple[int, int] = (32, 24),
+                      profile_bins: int = 64) -> np.ndarray:
+    """
+    Compact, unit-length descriptor of a page's overall layout.
+
+    Concatenates a small grayscale thumbnail with the row and column ink
+    profiles, each zero-mean and unit-norm, so pages can be compared with a
+    single dot product.
+    """
+    thumbnail = cv2.resize(gray, thumbnail_size, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+
+    ink = 255.0 - cv2.resize(gray, (profile_bins, profile_bins), interpolation=cv2.INTER_AREA).astype(np.float32)
+    row_profile = ink.mean(axis=1)
+    col_profile = ink.mean(axis=0)
+
+    parts = []
+    for part in (thumbnail, row_profile, col_profile):
+        part = part - part.mean()
+        norm = np.linalg.norm(part)
+        parts.append(part / norm if norm > 0 else part)
+
+    descriptor = np.concatenate(parts)
+    norm = np.linalg.norm(descriptor)
+    return (descriptor / norm if norm > 0 else descriptor).astype(np.float32)
+
+
+def match_homography(ref_keypoints: np.ndarray, ref_descriptors: np.ndarray,
+                     keypoints: np.ndarray, descriptors: np.ndarray,
+                     ratio: float = 0.75, min_inliers: int = 15) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Estimate the homography mapping reference coordinates onto the page.
+
+    Uses Hamming k-NN matching with Lowe's ratio test and RANSAC.
+
+    Returns:
+        tuple: (3x3 homography or None, number of RANSAC inliers)
+    """
+    if len(ref_descriptors) < 4 or len(descriptors) < 4:
+        return None, 0
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    knn = matcher.knnMatch(np.ascontiguousarray(ref_descriptors), np.ascontiguousarray(descriptors), k=2)
+    good = [pair[0] for pair in knn if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance]
+    if len(good) < max(4, min_inliers):
+        return None, len(good)
+
+    src = np.float32([ref_keypoints[m.queryIdx, :2] for m in good]).reshape(-1, 1, 2)
+    dst = np.float32([keypoints[m.trainIdx, :2] for m in good]).reshape(-1, 1, 2)
+    homography, inlier_mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    if homography is None:
+        return None, 0
+
+    inliers = int(inlier_mask.sum())
+    if inliers < min_inliers:
+        return None, inliers
+    return homography, inliers
+
+
+def project_bbox(bbox: Tuple[int, int, int, int], homography: np.ndarray,
+                 image_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+    """Project an (x, y, w, h) box through a homography and clip its bounding box to the page."""
+    x, y, w, h = bbox
+    corners = np.float32([[x, y], [x + w, y], [x + w, y + h], [x, y + h]]).reshape(-1, 1, 2)
+    projected = cv2.perspectiveTransform(corners, homography).reshape(-1, 2)
+
+    height, width = image_shape[:2]
+    x0 = int(np.clip(np.floor(projected[:, 0].min()), 0, width))
+    y0 = int(np.clip(np.floor(projected[:, 1].min()), 0, height))
+    x1 = int(np.clip(np.ceil(projected[:, 0].max()), 0, width))
+    y1 = int(np.clip(np.ceil(projected[:, 1].max()), 0, height))
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class TemplateRegistry:
+    """
+    Persistent registry of layout templates.
+
+    Template metadata is read lazily on first use and reference features are
+    memory-mapped from disk, so neither costs anything until a page is
+    actually aligned against that template, and nothing is recomputed per page.
+    """
+
+    def __init__(self, root_dir: str, feature_type: str = 'orb', max_features: int = 2000,
+                 min_inliers: int = 15):
+        self.root_dir = root_dir
+        self.feature_type = feature_type
+        self.max_features = max_features
+        self.min_inliers = min_inliers
+        self._detector = None
+        self._templates = {}
+        self._features = {}
+        self._index = None
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            self._detector = create_feature_detector(self.feature_type, self.max_features)
+        return self._detector
+
+    def template_dir(self, name: str) -> str:
+        return os.path.join(self.root_dir, name)
+
+    def names(self) -> List[str]:
+        """Names of all templates stored in the registry."""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.root_dir)
+            if os.path.isfile(os.path.join(self.root_dir, entry, 'template.json'))
+        )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates or os.path.isfile(os.path.join(self.template_dir(name), 'template.json'))
+
+    def register(self, name: str, image_path: str, regions: List[Dict]) -> Dict:
+        """
+        Store a template's regions and precompute its reference features.
+        """
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Could not load template image from {image_path}")
+
+        keypoints, descriptors = compute_features(image, self.detector)
+
+        template_dir = self.template_dir(name)
+        os.makedirs(template_dir, exist_ok=True)
+        np.save(os.path.join(template_dir, 'keypoints.npy'), keypoints)
+        np.save(os.path.join(template_dir, 'descriptors.npy'), descriptors)
+        np.save(os.path.join(template_dir, 'global.npy'), global_descriptor(image))
+
+        template = {
+            'name': name,
+            'image_path': image_path,
+            'image_size': [int(image.shape[1]), int(image.shape[0])],
+            'feature_type': self.feature_type,
+            'num_features': int(len(keypoints)),
+            'regions': [
+                {**region, 'bbox': [int(v) for v in region['bbox']]}
+                for region in regions
+            ]
+        }
+        with open(os.path.join(template_dir, 'template.json'), 'w') as f:
+            json.dump(template, f, indent=2)
+
+        self._templates[name] = template
+        self._features.pop(name, None)
+        self.rebuild_index()
+        return template
+
+    def get(self, name: str) -> Dict:
+        """Template metadata, loaded from disk on first access."""
+        if name not in self._templates:
+            with open(os.path.join(self.template_dir(name), 'template.json'), 'r') as f:
+                self._templates[name] = json.load(f)
+        return self._templates[name]
+
+    def features(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-mapped (keypoints, descriptors) of the template's reference image."""
+        if name not in self._features:
+            template_dir = self.template_dir(name)
+            self._features[name] = (
+                np.load(os.path.join(template_dir, 'keypoints.npy'), mmap_mode='r'),
+                np.load(os.path.join(template_dir, 'descriptors.npy'), mmap_mode='r')
+            )
+        return self._features[name]
+
+    def page_features(self, gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Keypoints and descriptors of an incoming page, with the registry's detector."""
+        return compute_features(gray, self.detector)
+
+    def align(self, name: str, gray: np.ndarray,
+              page_features: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Homography from the template's reference image onto a grayscale page.
+
+        Returns:
+            tuple: (3x3 homography or None if alignment failed, inlier count)
+        """
+        ref_keypoints, ref_descriptors = self.features(name)
+        keypoints, descriptors = page_features if page_features is not None else self.page_features(gray)
+        return match_homography(ref_keypoints, ref_descriptors, keypoints, descriptors,
+                                min_inliers=self.min_inliers)
+
+    def project_regions(self, name: str, homography: np.ndarray, image_shape: Tuple[int, ...]) -> List[Dict]:
+        """Template regions mapped onto the page through the homography."""
+        return [
+            {**region, 'bbox': project_bbox(tuple(region['bbox']), homography, image_shape)}
+            for region in self.get(name)['regions']
+        ]
+
+    def rebuild_index(self) -> Tuple[List[str], np.ndarray]:
+        """Stack every template's global descriptor into global_index.npz."""
+        names = self.names()
+        vectors = [np.load(os.path.join(self.template_dir(name), 'global.npy')) for name in names]
+        matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        np.savez(os.path.join(self.root_dir, 'global_index.npz'), names=np.array(names), vectors=matrix)
+        self._index = (names, matrix)
+        return self._index
+
+    def index(self) -> Tuple[List[str], np.ndarray]:
+        """
+        (names, descriptor matrix) of all templates, loaded once from global_index.npz.
+
+        The index is rebuilt if templates were added to the directory by another process.
+        """
+        if self._index is None:
+            index_path = os.path.join(self.root_dir, 'global_index.npz')
+            if os.path.isfile(index_path):
+                with np.load(index_path) as data:
+                    self._index = ([str(n) for n in data['names']], data['vectors'])
+            if self._index is None or self._index[0] != self.names():
+                self.rebuild_index()
+        return self._index
+
+    def candidates(self, gray: np.ndarray, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Templates ranked by global-descriptor similarity, best first."""
+        names, matrix = self.index()
+        if not names:
+            return []
+
+        scores = matrix @ global_descriptor(gray)
+        top_k = min(top_k, len(names))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(names[i], float(scores[i])) for i in best]
+
+    def identify(self, gray: np.ndarray, top_k: int = 3) -> Dict:
+        """
+        Pick the registered template that best matches a page.
+
+        All templates are ranked with one matrix-vector product over the
+        global index; only the top_k candidates are verified with feature
+        matching, so the cost grows very slowly with the number of templates.
+
+        Returns:
+            dict with 'template' (None if no candidate verified), 'homography',
+            'inliers' and the ranked 'candidates'
+        """
+        ranked = self.candidates(gray, top_k)
+        result = {'template': None, 'homography': None, 'inliers': 0, 'candidates': ranked}
+        if not ranked:
+            return result
+
+        page_features = self.page_features(gray)
+        for name, _ in ranked:
+            homography, inliers = self.align(name, gray, page_features)
+            if homography is not None and inliers > result['inliers']:
+                result.update({'template': name, 'homography': homography, 'inliers': inliers})
+
+        return result
@@ -0,0 +1,7 @@
+# conftest.py
+# The pipeline modules are flat imports from segmentation/, as the entry points use them
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
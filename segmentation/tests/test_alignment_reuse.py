@@ -0,0 +1,46 @@
+# test_alignment_reuse.py
+
+import os
+
+import cv2
+import numpy as np
+
+from batch_process import capture_source
+from fixed_template_segmentation import DocumentSectionExtractor
+
+
+def sheet(corners: np.ndarray) -> np.ndarray:
+    """A bright sheet with the given corners on a dark background."""
+    image = np.full((600, 800, 3), 40, np.uint8)
+    cv2.fillPoly(image, [corners.astype(np.int32)], (235, 235, 235))
+    return image
+
+
+def test_interleaved_sources_reuse_their_own_alignment(monkeypatch):
+    extractor = DocumentSectionExtractor(reuse_alignment=True)
+    corners = {
+        'a': np.float32([[50, 40], [700, 60], [720, 560], [40, 540]]),
+        'b': np.float32([[150, 100], [650, 90], [640, 500], [160, 520]]),
+    }
+    detected = []
+    monkeypatch.setattr(extractor, 'detect_document_boundary',
+                        lambda image: detected.append(image.source) or corners[image.source])
+
+    class Page(np.ndarray):
+        pass
+
+    for source in ('a', 'b', 'a', 'b', 'a'):
+        page = sheet(corners[source]).view(Page)
+        page.source = source
+        extractor.select_capture_source(source)
+        assert extractor.compute_alignment(page) is not None
+
+    assert detected == ['a', 'b']
+    assert extractor.alignment_caches['a'].hits == 2
+    assert extractor.alignment_caches['b'].hits == 1
+
+
+def test_capture_source_is_the_document_or_the_image_directory(tmp_path):
+    assert capture_source(str(tmp_path / 'scan.pdf')) == str(tmp_path / 'scan.pdf')
+    assert capture_source(str(tmp_path / 'a.jpg')) == capture_source(str(tmp_path / 'b.jpg')) == str(tmp_path)
+    assert capture_source(os.path.join('one', 'a.jpg')) != capture_source(os.path.join('two', 'a.jpg'))
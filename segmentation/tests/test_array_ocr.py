@@ -0,0 +1,59 @@
+# test_array_ocr.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import array_ocr
+import parallel_ocr
+
+
+class FakeAPI:
+    created = 0
+    ended = 0
+
+    def __init__(self, **kwargs):
+        FakeAPI.created += 1
+        self.in_use = threading.Lock()
+
+    def SetVariable(self, name, value):
+        pass
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        # A pooled API must never be shared by two callers at once
+        assert self.in_use.acquire(blocking=False)
+
+    def GetUTF8Text(self):
+        self.in_use.release()
+        return "7\n"
+
+    def End(self):
+        FakeAPI.ended += 1
+
+
+def test_apis_are_reused_across_thread_pools_and_released(monkeypatch):
+    monkeypatch.setattr(array_ocr, 'TESSEROCR_AVAILABLE', True)
+    monkeypatch.setattr(array_ocr, 'tesserocr', type('tesserocr', (), {'PyTessBaseAPI': FakeAPI}), raising=False)
+    FakeAPI.created = FakeAPI.ended = 0
+    image = np.zeros((8, 8), np.uint8)
+
+    # Fresh, short-lived pools as a per-page caller would create them
+    for _ in range(3):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            texts = list(pool.map(lambda _: array_ocr.ocr_array(image, config='--psm 7'), range(8)))
+        assert texts == ["7"] * 8
+
+    assert FakeAPI.created <= 2
+    array_ocr.release_apis()
+    assert FakeAPI.ended == FakeAPI.created
+
+
+def test_section_pool_is_shared_between_calls():
+    ocr = lambda image, config='': str(image.shape[0])
+    jobs = [(np.zeros((10, 4), np.uint8), '', 1), (lambda: np.zeros((20, 4), np.uint8), '', 1)]
+
+    assert parallel_ocr.ocr_sections_parallel(jobs, max_workers=2, ocr_fn=ocr) == ["10", "20"]
+    pool = parallel_ocr.get_pool(2)
+    parallel_ocr.ocr_sections_parallel(jobs, max_workers=2, ocr_fn=ocr)
+    assert parallel_ocr.get_pool(2) is pool
@@ -0,0 +1,33 @@
+# test_batch_process.py
+
+import os
+
+import batch_process
+from batch_process import output_name, process_input_page
+
+
+def test_output_names_differ_for_same_stem_and_same_name(tmp_path):
+    paths = [str(tmp_path / 'a.jpg'), str(tmp_path / 'a.png'),
+             str(tmp_path / 'one' / 'scan.jpg'), str(tmp_path / 'two' / 'scan.jpg')]
+
+    names = [output_name(path) for path in paths]
+
+    assert len(set(names)) == len(names)
+    assert all(name.startswith(('a_', 'scan_')) for name in names)
+
+
+def test_output_name_is_stable_for_relative_and_absolute_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert output_name('a.jpg') == output_name(str(tmp_path / 'a.jpg'))
+
+
+def test_image_inputs_get_distinct_output_dirs(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(batch_process, 'process_page', lambda path, output_dir, *args: calls.append(output_dir))
+
+    for path in ('in/a.jpg', 'in/a.png', 'other/a.jpg'):
+        process_input_page(path, 0, str(tmp_path))
+
+    assert len(set(calls)) == 3
+    assert all(os.path.dirname(output_dir) == str(tmp_path) for output_dir in calls)
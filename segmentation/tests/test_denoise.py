@@ -0,0 +1,41 @@
+# test_denoise.py
+
+import numpy as np
+
+from denoise import denoise, denoise_regions
+from generic_doc_segmentataion import DocumentSegmentationSystem
+
+
+def noisy_page(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (120, 160), dtype=np.uint8)
+
+
+def test_denoise_regions_leaves_the_rest_of_the_page_untouched():
+    page = noisy_page()
+    result = denoise_regions(page, [(10, 20, 30, 40)], 'median')
+
+    outside = np.ones(page.shape, bool)
+    outside[20:60, 10:40] = False
+    assert np.array_equal(result[outside], page[outside])
+    # Away from the margin the region matches a full-page filter
+    assert np.array_equal(result[25:55, 15:35], denoise(page, 'median')[25:55, 15:35])
+
+
+def test_region_scope_ocr_page_denoises_only_section_bboxes():
+    system = DocumentSegmentationSystem()
+    system.config['preprocessing'].update({'denoise_scope': 'regions', 'denoise_mode': 'median'})
+    page = np.dstack([noisy_page()] * 3)
+    sections = [{'bbox': (10, 20, 30, 40)}, {'bbox': (100, 0, 50, 50)}]
+
+    ocr_page = system.prepare_ocr_page(page, sections)
+
+    expected = denoise_regions(page[:, :, 0], [s['bbox'] for s in sections], 'median')
+    assert np.array_equal(ocr_page, expected)
+
+
+def test_page_scope_ocr_page_is_the_original():
+    system = DocumentSegmentationSystem()
+    page = np.dstack([noisy_page()] * 3)
+
+    assert system.prepare_ocr_page(page, [{'bbox': (0, 0, 10, 10)}]) is page
@@ -0,0 +1,73 @@
+# test_layout_detectors.py
+# The vectorized detectors must return the same candidates as the
+# per-contour cv2 loops they replaced
+
+import cv2
+import numpy as np
+import pytest
+
+from generic_doc_segmentataion import DocumentSegmentationSystem
+
+
+def reference_tables(binary, config):
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1)))
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40)))
+    contours, _ = cv2.findContours(cv2.add(horizontal, vertical), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = [cv2.boundingRect(c) for c in contours]
+    return sorted(b for b in boxes if b[2] > config['table_min_width'] and b[3] > config['table_min_height'])
+
+
+def reference_text_regions(binary, config):
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if cv2.contourArea(contour) > config['min_contour_area'] and 0.1 < (w / h if h else 0) < 20:
+            boxes.append((x, y, w, h))
+    return sorted(boxes)
+
+
+def reference_form_fields(binary):
+    closed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        x, y, w, h = cv2.boundingRect(contour)
+        if len(approx) == 4 and 100 < w * h < 10000 and 0.2 < w / h < 10:
+            boxes.append((x, y, w, h))
+    return sorted(boxes)
+
+
+def synthetic_page(border: bool) -> np.ndarray:
+    """Binary page (white on black) with a ruled table, text lines, boxes and optionally a scan border."""
+    page = np.zeros((900, 700), np.uint8)
+    if border:
+        cv2.rectangle(page, (5, 5), (694, 894), 255, 3)
+    for y in range(100, 401, 50):
+        cv2.line(page, (60, y), (640, y), 255, 2)
+    for x in range(60, 641, 145):
+        cv2.line(page, (x, 100), (x, 400), 255, 2)
+    for i in range(6):
+        cv2.putText(page, "Reading %d" % i, (80, 140 + 50 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 255, 2)
+        cv2.rectangle(page, (80 + 90 * i, 480), (150 + 90 * i, 510), 255, 2)
+    cv2.rectangle(page, (60, 600), (640, 700), 255, -1)
+    return page
+
+
+@pytest.mark.parametrize('border', [False, True])
+def test_detectors_match_per_contour_reference(border):
+    system = DocumentSegmentationSystem()
+    config = system.config['detection']
+    binary = synthetic_page(border)
+    features = system.analyze_layout(binary)
+
+    tables = sorted(s['bbox'] for s in system.detect_tables(binary, features))
+    text_regions = sorted(s['bbox'] for s in system.detect_text_regions(binary, features))
+    form_fields = sorted(s['bbox'] for s in system.detect_form_fields(binary, features))
+
+    assert tables == reference_tables(binary, config)
+    assert text_regions == reference_text_regions(binary, config)
+    assert form_fields == reference_form_fields(binary)
+    assert tables and text_regions
+
@@ -0,0 +1,52 @@
+# test_ocr_scheduler.py
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+import ocr_scheduler
+from ocr_scheduler import AsyncOCRScheduler
+
+
+def test_timed_out_thread_keeps_its_slot(monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_ocr(image, config='', lang='eng'):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.2)
+        with lock:
+            running.pop()
+        return "1"
+
+    monkeypatch.setattr(ocr_scheduler, 'ocr_array', slow_ocr)
+    scheduler = AsyncOCRScheduler(max_concurrency=2, timeout=0.05, retries=1, use_array_api=True)
+    image = np.zeros((8, 8), np.uint8)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.ocr_image(image) for _ in range(4)))
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        scheduler.close()
+
+    # Every call times out; retries wait for a slot instead of adding threads
+    assert results == [""] * 4
+    assert max(peak) <= 2
+    assert scheduler.stats['timeouts'] == 8
+
+
+def test_array_api_returns_text(monkeypatch):
+    monkeypatch.setattr(ocr_scheduler, 'ocr_array', lambda image, config='', lang='eng': "42")
+    scheduler = AsyncOCRScheduler(max_concurrency=1, use_array_api=True)
+    try:
+        assert asyncio.run(scheduler.ocr_image(np.zeros((8, 8), np.uint8))) == "42"
+    finally:
+        scheduler.close()
+    assert scheduler.stats['completed'] == 1
@@ -0,0 +1,58 @@
+# test_page_cache.py
+
+import os
+
+import numpy as np
+import pytest
+
+from page_cache import PageCache, safe_key, split_key
+
+
+def test_store_and_load_round_trip(tmp_path):
+    cache = PageCache(str(tmp_path))
+    array = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+
+    key = cache.store('upload-1', 'table_1_0_0', array)
+    loaded = cache.load_key(key)
+
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, array)
+    assert cache.load('upload-1', 'missing') is None
+
+
+def test_distinct_ids_do_not_collide(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.store('a/b', 'x', np.zeros(1, np.uint8))
+    cache.store('a_b', 'x', np.ones(1, np.uint8))
+
+    assert safe_key('a/b') != safe_key('a_b')
+    assert cache.load('a/b', 'x')[0] == 0
+    assert cache.load('a_b', 'x')[0] == 1
+    assert split_key(cache.store('../up', 'p.1', np.zeros(1, np.uint8))) == ('../up', 'p.1')
+    assert sorted(os.listdir(tmp_path)) == sorted([safe_key('a/b'), safe_key('a_b'), safe_key('../up')])
+
+
+def test_entry_is_invalidated_when_source_changes(tmp_path):
+    cache = PageCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'segment.jpg'
+    source.write_bytes(b'first')
+    key = cache.store('upload', 'segment', np.zeros((2, 2), np.uint8), source=str(source))
+
+    assert cache.load_key(key, source=str(source)) is not None
+
+    source.write_bytes(b'second version')
+    assert cache.load_key(key, source=str(source)) is None
+
+
+def test_entry_without_source_is_not_trusted_for_a_source(tmp_path):
+    cache = PageCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'page.jpg'
+    source.write_bytes(b'page')
+    cache.store('upload', 'page', np.zeros(1, np.uint8))
+
+    assert cache.load('upload', 'page', source=str(source)) is None
+
+
+def test_empty_key_is_rejected():
+    with pytest.raises(ValueError):
+        safe_key('')
@@ -0,0 +1,91 @@
+# test_page_executor.py
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from page_executor import PageExecutor
+
+
+def run(documents, fn, workers=4, **kwargs):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(PageExecutor(pool, fn, max_in_flight=workers, **kwargs).map(documents))
+
+
+def test_pages_are_yielded_in_order_per_document():
+    def fn(document, page):
+        # Later pages tend to finish first
+        time.sleep(random.uniform(0, 0.01))
+        return f"{document}:{page}"
+
+    results = run([('a', 5), ('b', 3), ('c', 1)], fn)
+
+    assert len(results) == 9
+    for document, count in (('a', 5), ('b', 3), ('c', 1)):
+        pages = [(page, result) for doc, page, result in results if doc == document]
+        assert pages == [(page, f"{document}:{page}") for page in range(count)]
+
+
+def test_documents_are_interleaved_round_robin():
+    submitted = []
+    lock = threading.Lock()
+
+    def fn(document, page):
+        with lock:
+            submitted.append(document)
+
+    run([('a', 3), ('b', 3)], fn, workers=1)
+
+    assert submitted == ['a', 'b', 'a', 'b', 'a', 'b']
+
+
+def test_max_per_document_caps_pages_in_flight():
+    in_flight = {'a': 0, 'b': 0}
+    peak = {'a': 0, 'b': 0}
+    lock = threading.Lock()
+
+    def fn(document, page):
+        with lock:
+            in_flight[document] += 1
+            peak[document] = max(peak[document], in_flight[document])
+        time.sleep(0.01)
+        with lock:
+            in_flight[document] -= 1
+
+    results = run([('a', 6), ('b', 2)], fn, workers=4, max_per_document=2)
+
+    assert len(results) == 8
+    assert peak['a'] <= 2 and peak['b'] <= 2
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_max_per_document_below_one_is_rejected(limit):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with pytest.raises(ValueError):
+            PageExecutor(pool, lambda document, page: None, max_in_flight=1, max_per_document=limit)
+
+
+def test_on_error_turns_failures_into_results():
+    def fn(document, page):
+        if page == 1:
+            raise RuntimeError("bad page")
+        return 'ok'
+
+    results = run([('a', 3)], fn, on_error=lambda document, page, error: f"error: {error}")
+
+    assert [result for _, _, result in results] == ['ok', 'error: bad page', 'ok']
+
+
+def test_failures_propagate_without_on_error():
+    def fn(document, page):
+        raise RuntimeError("bad page")
+
+    with pytest.raises(RuntimeError):
+        run([('a', 1)], fn)
+
+
+def test_empty_documents_yield_nothing():
+    assert run([('a', 0)], lambda document, page: None) == []
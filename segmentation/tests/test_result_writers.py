@@ -0,0 +1,26 @@
+# test_result_writers.py
+
+import os
+import sys
+
+from result_writers import CELL_FIELDS, read_cells, write_cells
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Segmentation_Studio'))
+import workflow  # noqa: E402
+
+
+def test_cells_carry_the_row_detector_confidence(tmp_path):
+    cells = [{'column': 1, 'row': 2, 'column_name': 'c_01', 'row_name': 'r_02', 'ocr_text': '12.5'}]
+    geometry = {('c_01', 'r_02'): {'bbox': [1, 2, 3, 4], 'row_confidence': 0.75}}
+
+    workflow.attach_cell_fields(cells, geometry, page_number=3)
+    paths = write_cells(cells, ['jsonl'], str(tmp_path))
+    records = list(read_cells(paths['jsonl']))
+
+    assert records == [{'page': 3, 'column': 1, 'row': 2, 'value': '12.5', 'row_confidence': 0.75,
+                        'bbox': [1, 2, 3, 4]}]
+    assert 'confidence' not in CELL_FIELDS
+
+
+def test_per_cell_formats_are_opt_in():
+    assert workflow.RESULT_FORMATS == (workflow.EXCEL_FORMAT,)
@@ -0,0 +1,44 @@
+# test_template_alignment.py
+
+import cv2
+import numpy as np
+
+from generic_doc_segmentataion import DocumentSegmentationSystem
+from template_registry import TemplateRegistry
+
+
+def synthetic_form(seed: int = 0) -> np.ndarray:
+    """A page with enough distinct structure for ORB matching."""
+    rng = np.random.default_rng(seed)
+    page = np.full((600, 800), 255, np.uint8)
+    for _ in range(60):
+        x, y = rng.integers(0, 740), rng.integers(0, 560)
+        cv2.rectangle(page, (int(x), int(y)), (int(x + rng.integers(10, 60)), int(y + rng.integers(10, 40))), 0, 2)
+        cv2.putText(page, str(rng.integers(0, 999)), (int(x), int(y)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 2)
+    return page
+
+
+def test_auto_template_reuses_identification_homography(tmp_path):
+    reference = synthetic_form()
+    reference_path = str(tmp_path / 'reference.png')
+    cv2.imwrite(reference_path, reference)
+
+    system = DocumentSegmentationSystem()
+    system.template_registry = TemplateRegistry(str(tmp_path / 'registry'))
+    system.create_template(reference_path, 'form', [{'type': 'header', 'bbox': [100, 50, 300, 80]}])
+
+    page = cv2.warpAffine(reference, np.float32([[1, 0, 12], [0, 1, 8]]), (800, 600), borderValue=255)
+    calls = []
+    align = system.template_registry.align
+    system.template_registry.align = lambda *args, **kwargs: calls.append(args[0]) or align(*args, **kwargs)
+
+    identified = system.identify_template(page)
+    assert identified['template'] == 'form'
+    aligned_calls = len(calls)
+
+    sections = system.apply_template(page, 'form', (identified['homography'], identified['inliers']))
+
+    assert len(calls) == aligned_calls  # no second RANSAC
+    assert sections[0]['source'] == 'template_aligned'
+    x, y, w, h = sections[0]['bbox']
+    assert abs(x - 112) <= 3 and abs(y - 58) <= 3
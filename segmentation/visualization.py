@@ -0,0 +1,192 @@
+# visualization.py
+# Section overlays rendered off the extraction path: extractors describe a
+# figure as a compact bbox JSON spec, which is rendered synchronously, on a
+# background thread, or in a separate worker process. matplotlib is only
+# imported by the renderer.
+#
+# Usage (worker process / manual re-render):
+#   python visualization.py output_dir/sections_visualization.json
+
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+VISUALIZE_MODES = ('off', 'sync', 'thread', 'process')
+
+MATPLOTLIB_COLORS = ['red', 'blue', 'green', 'orange', 'purple', 'cyan', 'magenta', 'yellow', 'pink']
+OPENCV_COLORS = [
+    (255, 0, 0), (0, 255, 0), (0, 0, 255),
+    (255, 255, 0), (255, 0, 255), (0, 255, 255),
+    (128, 0, 128), (255, 128, 0), (0, 128, 255)
+]
+
+# One background renderer thread, created on first use; renders in flight
+_executor = None
+_pending: List[Union[Future, subprocess.Popen]] = []
+
+
+def build_spec(image_path: str, boxes: List[Dict], output_path: Optional[str], title: str,
+               renderer: str = 'matplotlib', **style) -> Dict:
+    """
+    Describe an overlay figure: the page image on disk plus labelled boxes.
+
+    boxes are {'bbox': (x, y, w, h), 'label': str}; style keys (figsize, dpi,
+    colors, label_box) override the renderer defaults.
+    """
+    return {
+        'image_path': image_path,
+        'output_path': output_path,
+        'title': title,
+        'renderer': renderer,
+        'boxes': [{'bbox': [int(v) for v in box['bbox']], 'label': box['label']} for box in boxes],
+        **style
+    }
+
+
+def write_spec(spec: Dict, spec_path: Optional[str] = None) -> str:
+    """Save a spec as JSON (next to its output image by default) and return the path."""
+    spec_path = spec_path or os.path.splitext(spec['output_path'])[0] + '.json'
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, indent=2)
+    return spec_path
+
+
+def render(spec: Dict, image: Optional[np.ndarray] = None):
+    """
+    Render a spec, reading the page from spec['image_path'] unless image is given.
+    """
+    if image is None:
+        image = cv2.imread(spec['image_path'])
+        if image is None:
+            print(f"⚠️ Visualization skipped, could not load {spec['image_path']}")
+            return
+
+    if spec.get('renderer', 'matplotlib') == 'opencv':
+        render_opencv(spec, image)
+    else:
+        render_matplotlib(spec, image)
+
+
+def render_opencv(spec: Dict, image: np.ndarray):
+    vis_image = image.copy()
+    colors = [tuple(c) for c in spec.get('colors', OPENCV_COLORS)]
+
+    for i, box in enumerate(spec['boxes']):
+        x, y, w, h = box['bbox']
+        color = colors[i % len(colors)]
+        cv2.rectangle(vis_image, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(vis_image, box['label'], (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+    cv2.imwrite(spec['output_path'], vis_image)
+    print(f"✓ Visualization saved: {spec['output_path']}")
+
+
+def render_matplotlib(spec: Dict, image: np.ndarray):
+    # Files are drawn on a standalone Figure (no pyplot global state, safe on
+    # a background thread); pyplot is only used to show a window interactively
+    try:
+        import matplotlib.patches as patches
+        if spec.get('output_path'):
+            from matplotlib.figure import Figure
+            fig = Figure(figsize=tuple(spec.get('figsize', (16, 12))))
+            ax = fig.subplots()
+        else:
+            import matplotlib.pyplot as plt
+            fig, ax = plt.subplots(1, 1, figsize=tuple(spec.get('figsize', (16, 12))))
+    except ImportError:
+        print("⚠️ Matplotlib not available for visualization")
+        print("Install matplotlib with: pip install matplotlib>=3.3.0")
+        return
+
+    display_img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if image.ndim == 3 else image
+    colors = spec.get('colors', MATPLOTLIB_COLORS)
+    ax.imshow(display_img)
+
+    for i, box in enumerate(spec['boxes']):
+        x, y, w, h = box['bbox']
+        color = colors[i % len(colors)]
+        ax.add_patch(patches.Rectangle((x, y), w, h, linewidth=2, edgecolor=color, facecolor='none'))
+        label_box = dict(boxstyle="round,pad=0.3", facecolor='white', alpha=0.8) if spec.get('label_box') else None
+        ax.text(x, y - 5, box['label'], color=color, fontsize=10, fontweight='bold', bbox=label_box)
+
+    ax.set_title(spec['title'])
+    ax.axis('off')
+
+    if spec.get('output_path'):
+        fig.tight_layout()
+        fig.savefig(spec['output_path'], dpi=spec.get('dpi', 300), bbox_inches='tight')
+        print(f"✓ Visualization saved: {spec['output_path']}")
+    else:
+        plt.show()
+        plt.close(fig)
+
+
+def submit(spec: Dict, mode: str = 'thread', image: Optional[np.ndarray] = None):
+    """
+    Render a spec according to mode.
+
+    'sync' renders now; 'thread' queues it on a background thread (see
+    wait_for_pending); 'process' writes the spec JSON and renders it in a
+    separate Python process so plotting never touches the caller's memory.
+    The spec JSON is written for every mode except 'off'.
+
+    Returns:
+        Future for 'thread', Popen for 'process', None otherwise
+    """
+    global _executor
+
+    if mode not in VISUALIZE_MODES:
+        raise ValueError(f"Unknown visualize mode '{mode}', expected one of {VISUALIZE_MODES}")
+    if mode == 'off':
+        return None
+    if mode != 'sync' and not spec.get('output_path'):
+        raise ValueError("Background visualization needs an output_path")
+
+    spec_path = write_spec(spec) if spec.get('output_path') else None
+
+    if mode == 'sync':
+        render(spec, image)
+        return None
+
+    if mode == 'process':
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), spec_path])
+        _pending.append(process)
+        return process
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='visualization')
+    future = _executor.submit(render, spec)
+    _pending.append(future)
+    return future
+
+
+def wait_for_pending():
+    """Block until all background renders (threads and processes) have finished."""
+    while _pending:
+        job = _pending.pop(0)
+        if isinstance(job, subprocess.Popen):
+            if job.wait() != 0:
+                print(f"⚠️ Visualization process failed with exit code {job.returncode}")
+            continue
+        try:
+            job.result()
+        except Exception as e:
+            print(f"⚠️ Visualization failed: {e}")
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python visualization.py <spec.json>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        render(json.load(f))
+
+
+if __name__ == "__main__":
+    main()